@@ -0,0 +1,34 @@
+import argparse, fnmatch, sys
+
+import torch
+import benchmarks.cases
+from benchmarks.harness import CASES, run_cases, compare, load_baseline, save_baseline
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Benchmarks')
+    parser.add_argument('--cases', type=str, nargs='*', default=['*'], help='Glob patterns of the cases to run')
+    parser.add_argument('--list', action='store_true', help='List the cases and exit')
+    parser.add_argument('--device', type=str, default='cpu')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', type=str, default=None, help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown against the baseline')
+    parser.add_argument('--save-baseline', type=str, default=None, help='Write the results as a new baseline JSON')
+    args = parser.parse_args()
+
+    names = [n for n in CASES if any(fnmatch.fnmatch(n, p) for p in args.cases)]
+    if args.list:
+        print('\n'.join(names))
+        sys.exit(0)
+
+    device = torch.device(args.device)
+    results = run_cases(names, device, args.repeat)
+
+    if args.save_baseline is not None:
+        save_baseline(results, device, args.save_baseline)
+        print(f'Baseline saved to {args.save_baseline}')
+
+    if args.baseline is not None:
+        regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+        if len(regressions) > 0:
+            print(f'{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}: {", ".join(regressions)}')
+            sys.exit(1)
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from functools import lru_cache
+
+import numpy as np
+import torch
+
+import langs.imp as imp
+import langs.minimp as minimp
+from benchmarks.fixtures import MINIMP_DEPTHS, IMP_WIDTHS, minimp_programs, imp_programs
+from benchmarks.harness import case, Skip
+from diffusion.dumb import DumbDecorruptor, DumbDecorruptorConfig, DumbTerminalGenerator
+from diffusion.linearized.diffusion_transformer import DiffusionTransformer, FusedDiffusionTransformer, padding_mask
+from diffusion.linearized.inference import generate_ids
+from diffusion.linearized.io import save_model_checkpoint, export_model_for_inference, load_model_checkpoint_for_inference
+from diffusion.linearized.membership import MembershipIndex
+from diffusion.linearized.preserved_tokens import PreservedTokens
+from diffusion.linearized.program_tokenizer import ProgramTokenizer
+from diffusion.linearized.structured_diffusion_loss import StructuredDiffusionLoss
+from diffusion.linearized.token_parser import TokenParser
+from diffusion.linearized.training import train_one_batch
+from diffusion.neural import NeuralDecorruptor
+from mast.grammar import Grammar
+from mast.stats import StatsCollector
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MINIMP_COUNT = 500
+IMP_COUNT = 8
+BATCH_SIZE = 64
+
+
+@lru_cache
+def fixture(name: str) -> tuple[list, list[list[str]], ProgramTokenizer, torch.Tensor]:
+    lang, size = name.split('-')
+    if lang == 'minimp':
+        programs = minimp_programs(MINIMP_COUNT, int(size[1:]))
+    else:
+        programs = imp_programs(IMP_COUNT, int(size[1:]))
+    tokens = [p.to_tokens() for p in programs]
+    tokenizer = ProgramTokenizer.from_programs(tokens)
+    encoded = torch.tensor([tokenizer.encode(t) for t in tokens])
+    return programs, tokens, tokenizer, encoded
+
+
+def fixture_names() -> list[str]:
+    return [f'minimp-d{d}' for d in MINIMP_DEPTHS] + [f'imp-w{w}' for w in IMP_WIDTHS]
+
+
+def root_type(name: str):
+    return minimp.Program if name.startswith('minimp') else imp.Program
+
+
+def _register(name: str):
+    @case(f'mast/to_tokens/{name}')
+    def to_tokens(_: torch.device):
+        programs, tokens, _, _ = fixture(name)
+        def run():
+            for p in programs:
+                p.to_tokens()
+        return run, {'programs': len(programs), 'tokens': sum(len(t) for t in tokens)}
+
+    @case(f'tokenize/encode/{name}')
+    def encode(_: torch.device):
+        _, tokens, tokenizer, _ = fixture(name)
+        def run():
+            for t in tokens:
+                tokenizer.encode(t)
+        return run, {'programs': len(tokens), 'tokens': sum(len(t) for t in tokens)}
+
+    @case(f'tokenize/decode/{name}')
+    def decode(_: torch.device):
+        _, tokens, tokenizer, encoded = fixture(name)
+        def run():
+            for row in encoded:
+                tokenizer.decode(row.tolist())
+        return run, {'programs': len(tokens), 'tokens': encoded.numel()}
+
+    @case(f'tokenize/encode_batch/{name}')
+    def encode_batch(_: torch.device):
+        _, tokens, tokenizer, _ = fixture(name)
+        def run():
+            tokenizer.encode_batch(tokens)
+        return run, {'programs': len(tokens), 'tokens': sum(len(t) for t in tokens)}
+
+    @case(f'tokenize/decode_batch/{name}')
+    def decode_batch(_: torch.device):
+        _, tokens, tokenizer, encoded = fixture(name)
+        def run():
+            tokenizer.decode_batch(encoded, join=True)
+        return run, {'programs': len(tokens), 'tokens': encoded.numel()}
+
+    @case(f'parse/token/{name}')
+    def parse_token(_: torch.device):
+        _, tokens, tokenizer, encoded = fixture(name)
+        tp = TokenParser(Grammar(root_type(name)), tokenizer)
+        rows = encoded.tolist()
+        def run():
+            for ids in rows:
+                tp.parse(ids)
+        return run, {'programs': len(rows), 'tokens': sum(len(t) for t in tokens)}
+
+    @case(f'parse/tree-sitter/{name}')
+    def parse_tree_sitter(_: torch.device):
+        try:
+            from tree_sitter import Parser, Language
+            if name.startswith('minimp'):
+                from parsers import tree_sitter_minimp as binding
+            else:
+                from parsers import tree_sitter_imp as binding
+        except ImportError as e:
+            raise Skip(f'parser binding not built ({e})')
+        parser = Parser(Language(binding.language()))
+        _, tokens, _, _ = fixture(name)
+        sources = [bytes(' '.join(t), 'utf-8') for t in tokens]
+        rt = root_type(name)
+        def run():
+            for s in sources:
+                rt.from_tree_sitter(parser.parse(s))
+        return run, {'programs': len(sources), 'tokens': sum(len(t) for t in tokens)}
+
+    @case(f'assess/membership/{name}')
+    def membership(_: torch.device):
+        _, _, tokenizer, encoded = fixture(name)
+        index = MembershipIndex.build(encoded[::2], tokenizer)
+        def run():
+            index.contains(encoded, tokenizer)
+        return run, {'programs': encoded.size(0)}
+
+    @case(f'assess/stats/{name}')
+    def stats(_: torch.device):
+        programs, tokens, _, _ = fixture(name)
+        collector = StatsCollector()
+        def run():
+            for p in programs:
+                collector.collect(p)
+        return run, {'programs': len(programs), 'tokens': sum(len(t) for t in tokens)}
+
+
+for _name in fixture_names():
+    _register(_name)
+
+
+def _minimp_config(lang=minimp) -> DumbDecorruptorConfig:
+    def non_terminal(d: int) -> float:
+        return 1 - math.tanh(d * 0.15)
+    def terminal(d: int) -> float:
+        return math.tanh(d * 0.15)
+    return DumbDecorruptorConfig({
+        lang.AExprMask: {
+            lang.AddExprMask: non_terminal,
+            lang.DivExprMask: non_terminal,
+            lang.BracketedAExprMask: lambda _: 0,
+            lang.IdentifierMask: terminal,
+            lang.IntLiteralMask: terminal
+        }
+    })
+
+
+def _sample(dd: DumbDecorruptor, n: int, lang=minimp):
+    for _ in range(n):
+        body = lang.AExprMask()
+        lang.Program(body)
+        dd.decorrupt(body)
+
+
+@case('sample/minimp')
+def sample_minimp(_: torch.device):
+    dd = DumbDecorruptor(_minimp_config(), DumbTerminalGenerator())
+    n = 1000
+    def run():
+        random.seed(0)
+        _sample(dd, n)
+    return run, {'programs': n}
+
+
+@case('sample/minimp-tables')
+def sample_minimp_tables(_: torch.device):
+    n = 1000
+    def run():
+        rng = np.random.default_rng(0)
+        _sample(DumbDecorruptor(_minimp_config(), DumbTerminalGenerator(rng=rng), rng), n)
+    return run, {'programs': n}
+
+
+@case('sample/minimp-flat')
+def sample_minimp_flat(_: torch.device):
+    import langs.minimp.flat as flat
+    n = 1000
+    def run():
+        rng = np.random.default_rng(0)
+        _sample(DumbDecorruptor(_minimp_config(flat), DumbTerminalGenerator(rng=rng), rng), n, flat)
+    return run, {'programs': n}
+
+
+def _model(tokenizer: ProgramTokenizer, device: torch.device, fused: bool = False) -> DiffusionTransformer:
+    torch.manual_seed(0)
+    model = DiffusionTransformer(tokenizer.vocab_size, tokenizer.max_len, embed_dim=128, num_heads=4, num_layers=4)
+    if fused:
+        # the same weights in the fused layers
+        state = model.state_dict()
+        model = FusedDiffusionTransformer(tokenizer.vocab_size, tokenizer.max_len, 128, 4, 4)
+        model.load_state_dict(state)
+    return model.to(device)
+
+
+def _register_train(name: str, fused: bool):
+    @case(f'train/step/{name}/minimp-d8')
+    def train_step(device: torch.device):
+        _, _, tokenizer, encoded = fixture('minimp-d8')
+        model = _model(tokenizer, device, fused)
+        optimizer = torch.optim.AdamW(model.parameters(), lr=1e-3)
+        criterion = StructuredDiffusionLoss(
+            eos_id=tokenizer.token_to_index[PreservedTokens.EOS],
+            pad_id=tokenizer.token_to_index[PreservedTokens.PAD]
+        ).to(device)
+        batch = encoded[:BATCH_SIZE]
+        def run():
+            train_one_batch(model, batch, tokenizer, criterion, optimizer, device)
+        return run, {'steps': 1, 'programs': batch.size(0), 'tokens': batch.numel()}
+
+
+_register_train('dense', False)
+_register_train('fused', True)
+
+
+def _register_forward(name: str, fused: bool):
+    @case(f'forward/{name}/minimp-d8')
+    def forward(device: torch.device):
+        _, _, tokenizer, encoded = fixture('minimp-d8')
+        model = _model(tokenizer, device, fused)
+        model.eval()
+        x = encoded[:BATCH_SIZE].to(device)
+        pad_mask = padding_mask(x, tokenizer.pad_id)
+        t = torch.zeros(x.size(0), 1, device=device)
+        def run():
+            with torch.no_grad():
+                model(x, t, pad_mask=pad_mask)
+        return run, {'programs': x.size(0), 'tokens': int((~pad_mask).sum())}
+
+
+_register_forward('dense', False)
+_register_forward('fused', True)
+
+
+def _register_generate(name: str, fused: bool):
+    @case(f'generate/{name}/minimp-d8')
+    def generate(device: torch.device):
+        _, _, tokenizer, _ = fixture('minimp-d8')
+        model = _model(tokenizer, device, fused)
+        def run():
+            torch.manual_seed(0)
+            generate_ids(model, tokenizer, device, steps=10, batch_size=BATCH_SIZE)
+        return run, {'programs': BATCH_SIZE, 'tokens': BATCH_SIZE * tokenizer.max_len}
+
+
+_register_generate('dense', False)
+_register_generate('fused', True)
+
+
+@case('generate/tree/minimp-d8')
+def generate_tree(device: torch.device):
+    _, _, tokenizer, _ = fixture('minimp-d8')
+    decorruptor = NeuralDecorruptor(
+        _model(tokenizer, device), tokenizer, Grammar(minimp.Program), device, DumbTerminalGenerator(), max_depth=8
+    )
+    def run():
+        torch.manual_seed(0)
+        decorruptor.generate(BATCH_SIZE)
+    return run, {'programs': BATCH_SIZE}
+
+
+@lru_cache
+def _checkpoints() -> tuple[str, str]:
+    """A training checkpoint of the minimp-d8 model and its inference-only export."""
+    _, _, tokenizer, _ = fixture('minimp-d8')
+    model = _model(tokenizer, torch.device('cpu'))
+    directory = tempfile.mkdtemp()
+    checkpoint = os.path.join(directory, 'model.pt')
+    export = os.path.join(directory, 'export')
+    with redirect_stdout(None):
+        save_model_checkpoint(model, torch.optim.AdamW(model.parameters()), tokenizer, 0, checkpoint)
+        export_model_for_inference(checkpoint, export)
+    return checkpoint, export
+
+
+def _register_load(name: str, index: int):
+    @case(f'load/{name}/minimp-d8')
+    def load(device: torch.device):
+        path = _checkpoints()[index]
+        def run():
+            with redirect_stdout(None):
+                load_model_checkpoint_for_inference(path, device)
+        return run, {'loads': 1}
+
+
+_register_load('checkpoint', 0)
+_register_load('export', 1)
+
+
+def _register_startup(name: str, argv: list[str]):
+    @case(f'startup/{name}')
+    def startup(_: torch.device):
+        def run():
+            subprocess.run([sys.executable, *argv], cwd=ROOT, check=True, capture_output=True)
+        return run, {'starts': 1}
+
+
+_register_startup('cli', ['cli.py', '--help'])
+for _command in ['sample', 'train', 'infer', 'view', 'assess', 'assess-batch']:
+    _register_startup(f'{_command}-help', ['cli.py', _command, '--help'])
+_register_startup('import/mast.utils', ['-c', 'import mast.utils'])
+_register_startup('import/diffusion.linearized', ['-c', 'import diffusion.linearized'])
+_register_startup('import/program_tokenizer', ['-c', 'import diffusion.linearized.program_tokenizer'])
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import random
+import string
+
+import langs.imp as imp
+import langs.minimp as minimp
+
+
+MINIMP_DEPTHS = [3, 8, 15]
+IMP_WIDTHS = [16, 64, 256]
+
+
+def minimp_expr(rng: random.Random, depth: int):
+    """A random minimp expression of exactly the given depth."""
+    if depth <= 1:
+        if rng.random() < 0.5:
+            return minimp.Identifier(rng.choice(string.ascii_lowercase))
+        return minimp.IntLiteral(rng.randint(0, 10))
+    kind = rng.choice([minimp.AddExpr, minimp.DivExpr, minimp.BracketedAExpr])
+    if kind is minimp.BracketedAExpr:
+        return kind(minimp_expr(rng, depth - 1))
+    deep = minimp_expr(rng, depth - 1)
+    shallow = minimp_expr(rng, rng.randint(1, depth - 1))
+    return kind(deep, shallow) if rng.random() < 0.5 else kind(shallow, deep)
+
+
+def minimp_programs(n: int, depth: int, seed: int = 0) -> list[minimp.Program]:
+    rng = random.Random(seed)
+    return [minimp.Program(minimp_expr(rng, depth)) for _ in range(n)]
+
+
+def imp_aexpr(rng: random.Random, depth: int):
+    if depth <= 1:
+        if rng.random() < 0.5:
+            return imp.Identifier(rng.choice(string.ascii_lowercase))
+        return imp.IntLiteral(rng.randint(0, 10))
+    kind = rng.choice([imp.AddExpr, imp.DivExpr, imp.BracketedAExpr])
+    if kind is imp.BracketedAExpr:
+        return kind(imp_aexpr(rng, depth - 1))
+    return kind(imp_aexpr(rng, depth - 1), imp_aexpr(rng, rng.randint(1, depth - 1)))
+
+
+def imp_bexpr(rng: random.Random, depth: int):
+    if depth <= 2:
+        return imp.LeqExpr(imp_aexpr(rng, 1), imp_aexpr(rng, 1))
+    kind = rng.choice([imp.LeqExpr, imp.NotExpr, imp.LandExpr, imp.BracketedBExpr])
+    if kind is imp.LeqExpr:
+        return kind(imp_aexpr(rng, depth - 1), imp_aexpr(rng, rng.randint(1, depth - 1)))
+    if kind is imp.LandExpr:
+        return kind(imp_bexpr(rng, depth - 1), imp_bexpr(rng, rng.randint(2, depth - 1)))
+    return kind(imp_bexpr(rng, depth - 1))
+
+
+def imp_stmt(rng: random.Random, width: int, nesting: int):
+    if nesting <= 0 or rng.random() < 0.8:
+        return imp.AsnStmt(imp.Identifier(rng.choice(string.ascii_lowercase)), imp_aexpr(rng, rng.randint(1, 4)))
+    inner = max(1, width // 8)
+    if rng.random() < 0.5:
+        return imp.WhileStmt(imp_bexpr(rng, 3), imp_block(rng, inner, nesting - 1))
+    return imp.IfStmt(imp_bexpr(rng, 3), imp_block(rng, inner, nesting - 1), imp_block(rng, inner, nesting - 1))
+
+
+def imp_block(rng: random.Random, width: int, nesting: int):
+    return imp.Block([imp_stmt(rng, width, nesting) for _ in range(width)])
+
+
+def imp_programs(n: int, width: int, seed: int = 0, nesting: int = 1) -> list[imp.Program]:
+    """Random imp programs whose top-level block has `width` statements."""
+    rng = random.Random(seed)
+    return [imp.Program(imp_block(rng, width, nesting)) for _ in range(n)]
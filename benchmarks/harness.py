@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Callable
+
+import torch
+
+# a case is set up once and returns the function to time plus the amount of work one call does,
+# e.g. {'programs': 1000, 'tokens': 25000}; throughput is reported per unit of work
+Setup = Callable[[torch.device], tuple[Callable[[], None], dict[str, int]]]
+
+CASES: dict[str, Setup] = {}
+
+
+def case(name: str) -> Callable[[Setup], Setup]:
+    def decorator(setup: Setup) -> Setup:
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+class Skip(Exception):
+    pass
+
+
+def _sync(device: torch.device):
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+
+def measure(setup: Setup, device: torch.device, repeat: int = 5) -> dict:
+    run, work = setup(device)
+    run()
+    _sync(device)
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        _sync(device)
+        times.append(time.perf_counter() - start)
+    seconds = statistics.median(times)
+
+    # memory is profiled in a separate call, tracing allocations skews the timings
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+    tracemalloc.start()
+    run()
+    _sync(device)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'seconds': seconds,
+        'min_seconds': min(times),
+        'peak_py_mem': peak,
+        'throughput': {f'{unit}/s': n / seconds for unit, n in work.items()}
+    }
+    if device.type == 'cuda':
+        result['peak_device_mem'] = torch.cuda.max_memory_allocated(device)
+    return result
+
+
+def run_cases(names: list[str], device: torch.device, repeat: int = 5) -> dict[str, dict]:
+    results = {}
+    for name in names:
+        try:
+            results[name] = measure(CASES[name], device, repeat)
+        except Skip as e:
+            print(f'{name:<40} skipped: {e}')
+            continue
+        r = results[name]
+        rates = ', '.join(f'{v:,.1f} {u}' for u, v in r['throughput'].items())
+        print(f'{name:<40} {r["seconds"] * 1000:10.2f} ms  {r["peak_py_mem"] / 2 ** 20:8.2f} MiB  {rates}')
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Names of the cases that got slower than the baseline by more than `tolerance` (a fraction)."""
+    regressions = []
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]['seconds']
+        change = r['seconds'] / base - 1
+        flag = 'REGRESSION' if change > tolerance else ''
+        print(f'{name:<40} {base * 1000:10.2f} ms -> {r["seconds"] * 1000:10.2f} ms  {change:+8.1%}  {flag}')
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def load_baseline(path: str) -> dict[str, dict]:
+    with open(path) as f:
+        return json.load(f)['cases']
+
+
+def save_baseline(results: dict[str, dict], device: torch.device, path: str):
+    with open(path, 'w') as f:
+        f.write(json.dumps({'device': str(device), 'cases': results}, indent=4))
@@ -0,0 +1,31 @@
+import argparse
+import os
+import runpy
+import sys
+
+# subcommand -> (script it runs, help); scripts are only imported when their subcommand is run,
+# so `--help` and a mistyped command never pay for torch
+COMMANDS = {
+    'sample': ('dataset_sampler', 'Sample a dataset of random programs'),
+    'train': ('train', 'Train a diffusion model on a dataset'),
+    'infer': ('inference', 'Generate programs from a model checkpoint'),
+    'export': ('export', 'Export a model checkpoint for inference only'),
+    'assess': ('model_assessor', 'Assess one dataset or model checkpoint'),
+    'assess-batch': ('model_assessor_batch', 'Assess every dataset and model under an artifacts directory'),
+    'view': ('dataset_viewer', 'Browse the programs of a dataset'),
+    'bench': ('benchmark', 'Run the benchmark suite'),
+    'specialize': ('specialize', 'Generate the flat module of a language package'),
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='\n'.join(f'  {name:<14} {description}' for name, (_, description) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='Arguments of the command, see <command> --help')
+    args = parser.parse_args()
+
+    module, _ = COMMANDS[args.command]
+    sys.argv = [f'{os.path.basename(sys.argv[0])} {args.command}'] + args.args
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
@@ -1,10 +1,20 @@
 from __future__ import annotations
 
-import string, math, argparse
+import string, math, argparse, random
+
+import numpy as np
 
 import diffusion.linearized as dl
 from diffusion.dumb import DumbTerminalGenerator, DumbDecorruptorConfig, DumbDecorruptor
-from langs import minimp
+from diffusion.linearized.metadata import SampleMetadata
+from diffusion.linearized.program_tokenizer import ProgramTokenizer
+from diffusion.sketches import BloomFilter, ExactSet, fingerprint
+from diffusion.uniform import UniformSampler
+# the specialized module of `langs.minimp`, the same classes with their metadata written out as constants;
+# programs are grown and measured about twice as fast with it
+from langs.minimp import flat as minimp
+from mast.grammar import Grammar
+from mast.stats import StatsCollector, TreeStats
 
 
 k = 0.15
@@ -22,44 +32,77 @@ def terminal_dist(_depth: int) -> float:
     return math.tanh(_depth * k)
 
 
-def fix(n: minimp.Program | minimp.base.AExprBase):
+def fix(n: minimp.Program | minimp.AExprBase):
     if isinstance(n, minimp.Program):
         fix(n.body())
         return
     if isinstance(n, minimp.AddExpr):
         fix(n.left())
         fix(n.right())
+        if isinstance(n.right(), minimp.AddExpr):
+            n.subtrees.replace(n.right(), minimp.BracketedAExpr(n.right()))
         return
     if isinstance(n, minimp.DivExpr):
         fix(n.left())
         fix(n.right())
         if isinstance(n.left(), minimp.AddExpr):
             n.subtrees.replace(n.left(), minimp.BracketedAExpr(n.left()))
-        elif isinstance(n.right(), minimp.AddExpr) or isinstance(n.right(), minimp.DivExpr):
+        if isinstance(n.right(), minimp.AddExpr) or isinstance(n.right(), minimp.DivExpr):
             n.subtrees.replace(n.right(), minimp.BracketedAExpr(n.right()))
         return
 
 
-def depth(n: minimp.Program | minimp.base.AExprBase) -> int:
-    if isinstance(n, minimp.Program):
-        return depth(n.body())
-    if isinstance(n, minimp.AddExpr) or isinstance(n, minimp.DivExpr):
-        return max(depth(n.left()), depth(n.right())) + 1
-    if isinstance(n, minimp.BracketedAExpr):
-        return depth(n.expr()) + 1
-    return 1
+def print_duplicate_stats(depth_stats: dict[int, list[int]], filter_bytes: int):
+    print(f'{"Depth":>5} {"Unique":>10} {"Duplicates":>10} {"Dup. rate":>9}')
+    for depth, (unique, duplicates) in sorted(depth_stats.items()):
+        print(f'{depth:>5} {unique:>10} {duplicates:>10} {duplicates / (unique + duplicates):>9.2%}')
+    unique = sum(u for u, _ in depth_stats.values())
+    duplicates = sum(d for _, d in depth_stats.values())
+    total = unique + duplicates
+    print(f'{"All":>5} {unique:>10} {duplicates:>10} {duplicates / total if total > 0 else 0:>9.2%}')
+    print(f'Duplicate filter memory: {filter_bytes / 2 ** 20:.2f} MiB')
 
 
 def sample_dataset(
         dataset_size: int,
         depth_lim: tuple[int, int] = (1, -1),
         alphabet: str = string.ascii_lowercase,
-        max_int: int = 10
+        max_int: int = 10,
+        max_len: int | None = None,
+        spelled: bool = False,
+        dedup: str = 'none',
+        bloom_error: float = 1e-3,
+        max_attempts: int | None = None,
+        uniform: str | None = None,
+        size_lim: tuple[int, int] = (1, -1),
+        seed: int | None = None
 ) -> dl.LinearizedDataset:
+    """
+    With `uniform` set to `depth`, programs are drawn uniformly from all programs with a depth within
+    `depth_lim`, with no rejection; with `size`, uniformly from all programs with a number of nodes within
+    `size_lim`. Otherwise programs are grown by the weights of `non_terminal_dist` and `terminal_dist`, bracketed
+    by `fix` where precedence would read them as another tree, and rejected unless their depth is within
+    `depth_lim`. Uniform programs are drawn among those written without brackets, so either way every sample
+    parses back to the tree it was sampled as.
+    Choices and terminals are drawn in blocks from a NumPy generator seeded with `seed`.
+
+    With `max_len`, the vocabulary is derived from the grammar and the terminal generator up front, every
+    program is encoded as soon as it is accepted, and programs of `max_len` tokens or more are rejected.
+    With `spelled`, numbers and identifiers are encoded character by character.
+
+    With `dedup` set to `exact` or `bloom`, programs already sampled are dropped as they are generated, so
+    `dataset_size` becomes a number of unique programs; sampling gives up after `max_attempts` programs.
+    `exact` keeps a 64-bit fingerprint per unique program, `bloom` a filter of fixed size sized for
+    `dataset_size` programs at a false positive rate of `bloom_error`, which may drop a few unique programs.
+
+    The depth, size and node type counts of every sample, collected once as it is accepted, and the length of
+    its row are kept as the `SampleMetadata` of the dataset.
+    """
 
     min_depth, max_depth = depth_lim
 
-    dtg = DumbTerminalGenerator(alphabet, (0, max_int))
+    rng = np.random.default_rng(seed)
+    dtg = DumbTerminalGenerator(alphabet, (0, max_int), rng)
 
     ddc = DumbDecorruptorConfig({
         minimp.AExprMask: {
@@ -71,22 +114,75 @@ def sample_dataset(
         }
     })
 
-    dd = DumbDecorruptor(ddc, dtg)
-
-    raw_programs: list[minimp.Program] = []
+    dd = DumbDecorruptor(ddc, dtg, rng)
+    collector = StatsCollector()
+    # stats of every accepted program, as it was sampled
+    accepted: list[TreeStats] = []
+
+    raw_programs: list[list[str]] = []
+    grammar = Grammar(minimp.Program)
+    sampler = UniformSampler(grammar, dtg, [minimp.BracketedAExpr], random.Random(seed)) if uniform is not None else None
+    if uniform == 'depth' and max_depth < 0:
+        raise ValueError('Sampling uniformly by depth requires a maximum depth')
+    if uniform == 'size' and size_lim[1] < 0:
+        raise ValueError('Sampling uniformly by size requires a maximum size')
+    tokenizer = ProgramTokenizer.from_language(grammar, dtg, max_len, spelled) if max_len is not None else None
+    samples: list[list[int]] = []
+    seen = ExactSet() if dedup == 'exact' else BloomFilter(dataset_size, bloom_error) if dedup == 'bloom' else None
+    # depth -> [unique programs, duplicates]
+    depth_stats: dict[int, list[int]] = {}
+    attempts = 0
 
     while True:
-        if len(raw_programs) >= dataset_size:
+        if len(raw_programs) + len(samples) >= dataset_size:
             break
-        body = minimp.AExprMask()
-        program = minimp.Program(body)
-        dd.decorrupt(body)
-        # fix(program)
-        if min_depth > depth(program) or depth(program) > max_depth:
+        if max_attempts is not None and attempts >= max_attempts:
+            print(f'Gave up after {attempts} programs with {len(raw_programs) + len(samples)} accepted')
+            break
+        attempts += 1
+        if uniform == 'depth':
+            program = sampler.sample_by_depth(min_depth, max_depth)
+        elif uniform == 'size':
+            program = sampler.sample_by_size(*size_lim)
+        else:
+            body = minimp.AExprMask()
+            program = minimp.Program(body)
+            dd.decorrupt(body)
+            fix(program)
+        stats = collector.collect(program)
+        depth = stats.depth
+        if min_depth > depth or 0 <= max_depth < depth:
             continue
-        raw_programs.append(program)
-
-    return dl.LinearizedDataset.from_raw_samples([p.to_tokens() for p in raw_programs])
+        tokens = program.to_tokens()
+        # too long programs are rejected before the duplicate filter sees them
+        if tokenizer is not None and len(tokenizer.spell(tokens)) >= max_len:
+            continue
+        if seen is not None:
+            counts = depth_stats.setdefault(depth, [0, 0])
+            if seen.add(fingerprint(tokens)):
+                counts[1] += 1
+                continue
+            counts[0] += 1
+        accepted.append(stats)
+        if tokenizer is None:
+            raw_programs.append(tokens)
+        else:
+            samples.append(tokenizer.encode(tokens))
+
+    if seen is not None:
+        print_duplicate_stats(depth_stats, seen.nbytes())
+
+    if tokenizer is not None:
+        import torch
+        dataset = dl.LinearizedDataset(tokenizer, list(torch.tensor(samples)))
+    else:
+        keywords = ProgramTokenizer.keywords_of(grammar) if spelled else None
+        dataset = dl.LinearizedDataset.from_raw_samples(raw_programs, keywords)
+    # the sampled trees are the ones their rows parse back to, so these agree with `SampleMetadata.for_dataset`
+    dataset.metadata = SampleMetadata.build(
+        accepted, (SampleMetadata.length_of(row.tolist(), dataset.tokenizer) for row in dataset.samples)
+    )
+    return dataset
 
 
 if __name__ == '__main__':
@@ -96,8 +192,22 @@ if __name__ == '__main__':
     parser.add_argument('--max-depth', type=int, default=-1)
     parser.add_argument('--alphabet', type=str, default=string.ascii_lowercase)
     parser.add_argument('--max-int', type=int, default=10)
+    parser.add_argument('--max-len', type=int, default=None,
+                        help='Use the vocabulary of the grammar and encode while sampling, keeping programs shorter than this')
+    parser.add_argument('--spelled', action='store_true',
+                        help='Spell numbers and identifiers character by character, keeping the vocabulary small')
+    parser.add_argument('--dedup', type=str, choices=['none', 'exact', 'bloom'], default='none',
+                        help='Drop duplicate programs while sampling, so --dataset-size counts unique programs')
+    parser.add_argument('--bloom-error', type=float, default=1e-3, help='False positive rate of the bloom filter')
+    parser.add_argument('--max-attempts', type=int, default=None, help='Stop after sampling this many programs')
+    parser.add_argument('--uniform', type=str, choices=['depth', 'size'], default=None,
+                        help='Draw programs uniformly among all programs within the depth or size limits, without rejection')
+    parser.add_argument('--min-size', type=int, default=1)
+    parser.add_argument('--max-size', type=int, default=-1)
+    parser.add_argument('--seed', type=int, default=None)
     parser.add_argument('--output', type=str, default=None)
     args = parser.parse_args()
-    dataset = sample_dataset(args.dataset_size, (args.min_depth, args.max_depth), args.alphabet, args.max_int)
+    dataset = sample_dataset(args.dataset_size, (args.min_depth, args.max_depth), args.alphabet, args.max_int, args.max_len, args.spelled,
+                             args.dedup, args.bloom_error, args.max_attempts, args.uniform, (args.min_size, args.max_size), args.seed)
     if args.output is not None:
         dataset.save_checkpoint(args.output)
\ No newline at end of file
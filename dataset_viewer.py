@@ -1,24 +1,55 @@
 import argparse
-import random
-
-import diffusion.linearized as dl
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--dataset', type=str, required=True)
+    parser.add_argument('--count', type=int, default=10, help='Programs shown at a time')
+    parser.add_argument('--min-depth', type=int, default=None)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--min-len', type=int, default=None)
+    parser.add_argument('--max-len', type=int, default=None)
+    parser.add_argument('--min-size', type=int, default=None)
+    parser.add_argument('--max-size', type=int, default=None)
+    parser.add_argument('--with', dest='with_types', type=str, nargs='*', default=[],
+                        help='Only programs with a node of each of these types, as listed under node types')
+    parser.add_argument('--without', dest='without_types', type=str, nargs='*', default=[],
+                        help='Only programs with no node of any of these types')
+    parser.add_argument('--seed', type=int, default=None)
     args = parser.parse_args()
 
-    dataset = dl.LinearizedDataset.from_checkpoint(args.dataset)
-    samples = dataset.samples
+    import numpy as np
+    import torch
+    import diffusion.linearized as dl
+    from diffusion.linearized.metadata import SampleMetadata
+    from langs import minimp
+    from mast.grammar import Grammar
+
+    # samples are only read from the checkpoint as they are shown
+    dataset = dl.LinearizedDataset.from_checkpoint(args.dataset, mmap=True)
+    metadata = dataset.metadata
+    filtering = any(v is not None for v in (args.min_depth, args.max_depth, args.min_len, args.max_len,
+                                            args.min_size, args.max_size)) or args.with_types or args.without_types
+    if metadata is None and filtering:
+        metadata = SampleMetadata.for_dataset(args.dataset, Grammar(minimp.Program))
 
     print(f'Vocabulary: {dataset.tokenizer.vocab}')
-    while True:
-        random.shuffle(samples)
-        for i in range(10):
-            decoded = dataset.tokenizer.decode(samples[i].tolist())
-            eos_pos = decoded.index('<EOS>')
-            print(str.join(' ', decoded[:eos_pos]))
+    if metadata is not None:
+        print(f'Node types: {", ".join(str(n) for n in metadata.type_names)}')
+        indices = metadata.where((args.min_depth, args.max_depth), (args.min_len, args.max_len),
+                                 (args.min_size, args.max_size), args.with_types, args.without_types)
+        print(f'{len(indices)} of {len(dataset)} programs match')
+    else:
+        indices = np.arange(len(dataset))
+
+    rng = np.random.default_rng(args.seed)
+    while len(indices) > 0:
+        shown = rng.choice(indices, min(args.count, len(indices)), replace=False)
+        for i, src in zip(shown, dataset.tokenizer.decode_batch(torch.stack([dataset.samples[i] for i in shown]), join=True)):
+            if metadata is not None:
+                print(f'[depth {metadata.depth[i]}, len {metadata.length[i]}, size {metadata.size[i]}] {src}')
+            else:
+                print(src)
         inp = input("Press Enter to see more samples or type 'x' to quit: ")
         if inp == 'x':
-            break
\ No newline at end of file
+            break
@@ -1,9 +1,12 @@
 import random
 import string
-from collections.abc import Callable
-from queue import Queue
+from collections import deque
+from collections.abc import Callable, Iterator
+from itertools import chain
 from typing import TypeVar, Type, Any
 
+import numpy as np
+
 from diffusion.decorruptor import Decorruptor
 from diffusion.terminal_generator import TerminalGenerator
 from mast import TransitionKernels as TK
@@ -23,19 +26,89 @@ class DumbDecorruptorConfig:
         self.mask_down_weights = mask_down_weights
 
 
+def uniforms(rng: np.random.Generator, block: int = 1 << 14) -> Iterator[float]:
+    """Endless stream of uniform floats in `[0, 1)`, drawn from a NumPy `Generator` in blocks of `block`."""
+    return chain.from_iterable(iter(lambda: rng.random(block).tolist(), None))
+
+
+class AliasTable:
+    """Walker's alias table of a discrete distribution, drawing an index from a single uniform in O(1)."""
+    def __init__(self, weights: list[float]):
+        n = len(weights)
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError(f'Expected positive weights, got {weights}')
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        # whatever is left is 1 up to rounding
+
+    def draw(self, u: float) -> int:
+        x = u * len(self.prob)
+        i = int(x)
+        return i if x - i < self.prob[i] else self.alias[i]
+
+
+class SamplingTables:
+    """
+    The mask-down choices of a `DumbDecorruptorConfig` as alias tables, one per masked type and depth up to
+    `max_depth`, built the first time a type is met; deeper nodes use the table of `max_depth`. Types the
+    config has no weights for mask down uniformly, as in `DumbDecorruptor.decorrupt_mask_down`.
+    """
+    def __init__(self, config: DumbDecorruptorConfig, max_depth: int = 64):
+        self.config = config
+        self.max_depth = max_depth
+        self._tables: dict[type, tuple[list[type], list[AliasTable]]] = {}
+
+    def _build(self, mask_type: type) -> tuple[list[type], list[AliasTable]]:
+        if mask_type in self.config.mask_down_weights:
+            weights = self.config.mask_down_weights[mask_type]
+            descendants = list(weights)
+            tables = [AliasTable([weights[d](depth) for d in descendants]) for depth in range(self.max_depth + 1)]
+        else:
+            descendants = list(mask_type.get_descendant_mask_types())
+            tables = [AliasTable([1.0] * len(descendants))] * (self.max_depth + 1)
+        self._tables[mask_type] = (descendants, tables)
+        return self._tables[mask_type]
+
+    def draw(self, mask_type: type, depth: int, u: float) -> type:
+        descendants, tables = self._tables.get(mask_type) or self._build(mask_type)
+        return descendants[tables[min(depth, self.max_depth)].draw(u)]
+
+
 class DumbDecorruptor(Decorruptor):
-    def __init__(self, config: DumbDecorruptorConfig, tg: TerminalGenerator):
+    """
+    With `rng`, mask-down choices are drawn from the precomputed `SamplingTables` of the config with uniforms
+    drawn in blocks from `rng`; otherwise the weights are evaluated per node and drawn with `random`.
+    """
+    def __init__(self, config: DumbDecorruptorConfig, tg: TerminalGenerator, rng: np.random.Generator | None = None,
+                 max_depth: int = 64):
         self.config = config
         self.tg = tg
+        self.tables = SamplingTables(config, max_depth) if rng is not None else None
+        self.uniform = uniforms(rng) if rng is not None else None
+        # node type -> its allowed transition kernels
+        self._kernels: dict[type, set[TK]] = {}
 
     def decorrupt(self, tree: AbstractNode):
         if not isinstance(tree, MaskedNode):
             raise ValueError(f'Expected an instance of MaskedNode, got {type(tree)}')
-        q: Queue[tuple[int, MaskedNode]] = Queue()
-        q.put((1, tree))
-        while not q.empty():
-            depth, n = q.get()
-            tks = n.get_supported_transition_kernels().intersection(self.config.allowed_transition_kernels)
+        q: deque[tuple[int, MaskedNode]] = deque()
+        q.append((1, tree))
+        while q:
+            depth, n = q.popleft()
+            tks = self._kernels.get(type(n))
+            if tks is None:
+                tks = n.get_supported_transition_kernels().intersection(self.config.allowed_transition_kernels)
+                self._kernels[type(n)] = tks
             if len(tks) == 0:
                 continue
             if len(tks) > 1:
@@ -45,10 +118,10 @@ class DumbDecorruptor(Decorruptor):
                 concrete_node = self.decorrupt_unmask(n)
                 for _, c in concrete_node.enumerate_nodes():
                     if isinstance(c, MaskedNode):
-                        q.put((depth + 1, c))
+                        q.append((depth + 1, c))
             elif tk == TK.MASK_DOWN:
                 masked_node = self.decorrupt_mask_down(n, depth)
-                q.put((depth, masked_node))
+                q.append((depth, masked_node))
 
     def decorrupt_unmask(self, node: MaskedNode) -> ConcreteNode:
         if not hasattr(type(node), 'unmask') or not hasattr(type(node), 'unmask_target'):
@@ -65,6 +138,8 @@ class DumbDecorruptor(Decorruptor):
     def decorrupt_mask_down(self, node: MaskedNode, depth: int) -> MaskedNode:
         if not hasattr(type(node), 'mask_down') or not hasattr(type(node), 'get_descendant_mask_types'):
             raise ValueError(f'Node type {node.get_type_name()} does not support MASK_DOWN.')
+        if self.tables is not None:
+            return node.mask_down(self.tables.draw(type(node), depth, next(self.uniform)))
         if type(node) in self.config.mask_down_weights:
             weights = self.config.mask_down_weights[type(node)]
         else:
@@ -86,11 +161,19 @@ class DumbDecorruptor(Decorruptor):
 
 
 class DumbTerminalGenerator(TerminalGenerator):
-    def __init__(self, alphabet: str = string.ascii_lowercase, integer_range: tuple[int, int] = (0, 10)):
+    """With `rng`, terminals are drawn in blocks from `rng`, one stream per terminal type, rather than from `random`."""
+    def __init__(self, alphabet: str = string.ascii_lowercase, integer_range: tuple[int, int] = (0, 10),
+                 rng: np.random.Generator | None = None, block: int = 1 << 12):
         self.alphabet = alphabet
         self.integer_range = integer_range
+        self.rng = rng
+        self.block = block
+        self._streams: dict[Terminal, Iterator[Any]] = {}
 
     def generate(self, ctx: Any, task_type: Terminal) -> Any:
+        if self.rng is not None:
+            stream = self._streams.get(task_type) or self._open(task_type)
+            return next(stream)
         if task_type == Terminal.IDENTIFIER:
             return random.choice(self.alphabet)
         if task_type == Terminal.STRING:
@@ -98,4 +181,37 @@ class DumbTerminalGenerator(TerminalGenerator):
         if task_type == Terminal.NUMBER:
             l, u = self.integer_range
             return random.randint(l, u)
-        raise ValueError(f'Unsupported terminal type: {task_type}')
\ No newline at end of file
+        if task_type == Terminal.BOOLEAN:
+            return random.choice([True, False])
+        raise ValueError(f'Unsupported terminal type: {task_type}')
+
+    def _open(self, task_type: Terminal) -> Iterator[Any]:
+        # identifiers are drawn from the alphabet as is, a repeated letter is as likely as with `random.choice`
+        values = list(self.alphabet) if task_type in (Terminal.IDENTIFIER, Terminal.STRING) else self.values(task_type)
+        def block() -> list[Any]:
+            return [values[i] for i in self.rng.integers(0, len(values), self.block).tolist()]
+        self._streams[task_type] = chain.from_iterable(iter(block, None))
+        return self._streams[task_type]
+
+    def values(self, task_type: Terminal) -> list[Any]:
+        """Every value `generate` can return for a terminal type."""
+        if task_type in (Terminal.IDENTIFIER, Terminal.STRING):
+            return list(dict.fromkeys(self.alphabet))
+        if task_type == Terminal.NUMBER:
+            l, u = self.integer_range
+            return list(range(l, u + 1))
+        if task_type == Terminal.BOOLEAN:
+            return [False, True]
+        raise ValueError(f'Unsupported terminal type: {task_type}')
+
+    def characters(self, task_type: Terminal) -> list[str]:
+        """Every character of the tokens of the values `generate` can return for a terminal type."""
+        if task_type in (Terminal.IDENTIFIER, Terminal.STRING):
+            return list(dict.fromkeys(self.alphabet))
+        if task_type == Terminal.NUMBER:
+            l, u = self.integer_range
+            if u - l < 10:
+                return sorted({c for v in range(l, u + 1) for c in str(v)})
+            # ten consecutive integers already end in every digit
+            return sorted(set('0123456789') | ({'-'} if l < 0 else set()))
+        raise ValueError(f'Unsupported terminal type: {task_type}')
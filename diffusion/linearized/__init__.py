@@ -1,5 +1,43 @@
-from .linearized_dataset import LinearizedDataset
-from .diffusion_transformer import DiffusionTransformer
-from .structured_diffusion_loss import StructuredDiffusionLoss
-from .training import train
-from .inference import inference
\ No newline at end of file
+import sys
+from importlib import import_module
+from types import ModuleType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .linearized_dataset import LinearizedDataset
+    from .diffusion_transformer import DiffusionTransformer, FusedDiffusionTransformer
+    from .structured_diffusion_loss import StructuredDiffusionLoss
+    from .training import train
+    from .inference import inference
+
+# the exports pull in torch, so they are imported on first access rather than with the package
+_exports = {
+    'LinearizedDataset': '.linearized_dataset',
+    'DiffusionTransformer': '.diffusion_transformer',
+    'FusedDiffusionTransformer': '.diffusion_transformer',
+    'StructuredDiffusionLoss': '.structured_diffusion_loss',
+    'train': '.training',
+    'inference': '.inference',
+}
+
+__all__ = list(_exports)
+
+
+class _Package(ModuleType):
+    def __setattr__(self, name: str, value):
+        # importing a submodule binds it on the package, which would shadow the export of the same name
+        # (the `inference` function of the `inference` module); the eager imports used to rebind it
+        if name in _exports and isinstance(value, ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
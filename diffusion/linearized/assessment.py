@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from itertools import repeat
+from typing import Any, Generator, Iterable, Iterator, TYPE_CHECKING
+
+import torch
+
+import diffusion.linearized as dl
+import langs.minimp as minimp
+from diffusion import tracing
+from diffusion.metrics import StreamingMetrics
+from diffusion.pipeline import prefetch
+from diffusion.linearized.inference import generate_ids
+from diffusion.linearized.io import load_model_checkpoint_for_inference
+from diffusion.linearized.membership import MembershipIndex
+from diffusion.linearized.neighbors import NeighborIndex
+from diffusion.linearized.program_tokenizer import ProgramTokenizer
+from diffusion.linearized.token_parser import TokenParser
+from mast.grammar import Grammar
+from mast.stats import StatsCollector, StatsSummary
+
+if TYPE_CHECKING:
+    from tree_sitter import Parser
+
+
+def tree_sitter_parser() -> Parser:
+    """A tree-sitter parser of minimp; the binding is only imported when sources are parsed with it."""
+    from tree_sitter import Parser, Language
+    from parsers import tree_sitter_minimp
+    return Parser(Language(tree_sitter_minimp.language()))
+
+
+def sample_from_dataset(path: str) -> Generator[str, Any, None]:
+    ds = dl.LinearizedDataset.from_checkpoint(path)
+    yield from ds.tokenizer.decode_batch(torch.stack(ds.samples), join=True)
+
+
+def parse_sources(samples: Iterator[str], parser: Parser) -> Generator[minimp.Program | None, Any, None]:
+    for s in tracing.iterate(samples, 'assess/sample'):
+        try:
+            with tracing.span('assess/parse'):
+                tree = parser.parse(bytes(s, 'utf-8'))
+            with tracing.span('assess/convert'):
+                program = minimp.Program.from_tree_sitter(tree)
+        except Exception:
+            program = None
+        yield program
+
+
+def parse_rows(x: torch.Tensor, tp: TokenParser) -> Generator[minimp.Program | None, Any, None]:
+    with tracing.span('assess/validate'):
+        valid, _, _ = tp.validator(x)
+    for ids, plausible in zip(x.tolist(), valid.tolist()):
+        if not plausible:
+            yield None
+            continue
+        try:
+            with tracing.span('assess/parse'):
+                program = tp.parse(ids)
+            yield program
+        except SyntaxError:
+            yield None
+
+
+def programs_from_dataset(path: str, parser: Parser | None) -> Generator[minimp.Program | None, Any, None]:
+    """The programs of a dataset checkpoint; with `parser` set to `None`, token IDs are parsed directly."""
+    if parser is not None:
+        yield from parse_sources(sample_from_dataset(path), parser)
+        return
+    ds = dl.LinearizedDataset.from_checkpoint(path)
+    yield from parse_rows(torch.stack(ds.samples), TokenParser(Grammar(minimp.Program), ds.tokenizer))
+
+
+def programs_from_rows(x: torch.Tensor, tokenizer: ProgramTokenizer,
+                       parser: Parser | None) -> Generator[minimp.Program | None, Any, None]:
+    if parser is not None:
+        yield from parse_sources(iter(tokenizer.decode_batch(x, join=True)), parser)
+        return
+    yield from parse_rows(x, TokenParser(Grammar(minimp.Program), tokenizer))
+
+
+def generate_chunks(path: str, steps: int, bs: int, temp: float, quantize: bool = False,
+                    chunk_size: int | None = None,
+                    device: torch.device | None = None) -> tuple[ProgramTokenizer, Iterator[torch.Tensor]]:
+    """
+    Loads a model and returns a lazy iterator of `bs` generated rows, in chunks of `chunk_size` rows, on
+    `device` or the current accelerator; a quantized model runs on the CPU.
+    """
+    device = torch.device('cpu') if quantize else device or torch.accelerator.current_accelerator()
+    tokenizer, model = load_model_checkpoint_for_inference(path, device, quantize=quantize)
+    chunk_size = chunk_size or bs
+    def chunks() -> Iterator[torch.Tensor]:
+        for start in range(0, bs, chunk_size):
+            n = min(chunk_size, bs - start)
+            yield generate_ids(model, tokenizer, device, temperature=temp, steps=steps, batch_size=n).cpu()
+    return tokenizer, chunks()
+
+
+def assess_chunks(
+        tokenizer: ProgramTokenizer,
+        chunks: Iterator[torch.Tensor],
+        parser: Parser | None,
+        index: MembershipIndex | None
+) -> Generator[tuple[minimp.Program | None, bool], Any, None]:
+    """
+    Parses generated chunks as they arrive, with whether each sample is a training program. The chunks are
+    generated on a background thread, one chunk ahead, so the device works on the next chunk while this
+    one is parsed. With `parser` set to `None`, token IDs are parsed directly.
+    """
+    for x in prefetch(chunks, depth=1):
+        seen = repeat(False)
+        if index is not None:
+            with tracing.span('assess/membership'):
+                seen = index.contains(x, tokenizer).tolist()
+        yield from zip(programs_from_rows(x, tokenizer, parser), seen)
+
+
+def assess_dataset(cp_path: str, parser: Parser | None, error: float | None = None) -> dict:
+    """
+    Assess a dataset checkpoint; with `parser` set to `None`, token IDs are parsed directly.
+    With an `error`, distinct programs are counted approximately, see `StreamingMetrics`.
+    """
+    samples = programs_from_dataset(cp_path, parser)
+
+    collector = StatsCollector()
+    summary = StatsSummary()
+    metrics = StreamingMetrics(error)
+    for program in samples:
+        if program is None:
+            raise SyntaxError(f'Failed to parse a sample of dataset {cp_path}')
+        with tracing.span('assess/stats'):
+            stats = collector.collect(program)
+            summary.add(stats)
+            metrics.add(program, stats)
+
+    logs = dict()
+    logs['size'] = summary.count
+    logs['diversity'] = metrics.diversity()
+    logs['avg_depth'] = summary.avg_depth()
+    logs['avg_len'] = summary.avg_len()
+    logs['depth_dist'] = summary.depth_dist
+    logs['node_type_dist'] = summary.node_type_dist
+    logs.update(metrics.logs())
+
+    return logs
+
+
+def assess_samples(
+        samples: Iterable[tuple[minimp.Program | None, bool]],
+        membership: bool = False,
+        error: float | None = None,
+        neighbors: NeighborIndex | None = None,
+        near_distance: float = 0.1,
+        chunk_size: int = 256
+) -> dict:
+    """
+    Assess a stream of parsed samples, `None` for those that failed to parse, each with whether it is a
+    training program. With `membership`, these flags are reported as novelty and memorization, and with
+    `neighbors`, how many samples are within `near_distance` of a training program, looked up `chunk_size`
+    programs at a time. With an `error`, distinct programs are counted approximately, see `StreamingMetrics`.
+    Nothing is kept per sample, so memory does not grow with the number of samples.
+    """
+    collector = StatsCollector()
+    summary = StatsSummary()
+    metrics = StreamingMetrics(error)
+    novel = 0
+    copies = 0
+    near = 0
+    pending = []
+
+    def count_near(programs: list[minimp.Program]) -> int:
+        with tracing.span('assess/neighbors', programs=len(programs)):
+            _, distances = neighbors.nearest(programs)
+        return int((distances[:, 0] <= near_distance).sum())
+
+    for program, copied in samples:
+        copies += copied
+        if program is None:
+            summary.add_failure()
+            continue
+        with tracing.span('assess/stats'):
+            stats = collector.collect(program)
+            summary.add(stats)
+            metrics.add(program, stats)
+        novel += not copied
+        if neighbors is not None:
+            pending.append(program)
+            if len(pending) >= chunk_size:
+                near += count_near(pending)
+                pending = []
+    if pending:
+        near += count_near(pending)
+
+    logs = dict()
+    logs['parse_rate'] = summary.parse_rate()
+    logs['diversity'] = metrics.diversity()
+    if membership:
+        # share of parsed samples that are not training programs, and of all samples that are
+        total = summary.count + summary.failed
+        logs['novelty'] = novel / summary.count if summary.count > 0 else 0
+        logs['memorization'] = copies / total if total > 0 else 0
+    if neighbors is not None:
+        logs['near_duplication'] = near / summary.count if summary.count > 0 else 0
+    logs['avg_depth'] = summary.avg_depth()
+    logs['avg_len'] = summary.avg_len()
+    logs['depth_dist'] = summary.depth_dist
+    logs['node_type_dist'] = summary.node_type_dist
+    logs.update(metrics.logs())
+
+    return logs
+
+
+def assess_model(cp_path: str, parser: Parser | None, batch_size: int, steps: int = 20, temperature: float = 1.0,
+                 index: MembershipIndex | None = None, device: torch.device | None = None,
+                 error: float | None = None, neighbors: NeighborIndex | None = None,
+                 near_distance: float = 0.1, chunk_size: int = 256) -> dict:
+    """
+    Assess samples from a model checkpoint with `assess_samples`, generated and parsed `chunk_size` at a time;
+    with `parser` set to `None`, token IDs are parsed directly. With the `index` of the training set, also
+    report how many samples are copies of training programs, and with its `neighbors`, how many are within
+    `near_distance` of one.
+    """
+    tokenizer, chunks = generate_chunks(cp_path, steps, batch_size, temperature, chunk_size=chunk_size, device=device)
+    return assess_samples(assess_chunks(tokenizer, chunks, parser, index), index is not None, error, neighbors,
+                          near_distance, chunk_size)
+
+
+def assess_job(job: dict, device: str) -> dict:
+    """Runs one job of the sweep, in whichever process and on whichever device it was given to."""
+    parser = tree_sitter_parser() if job['parser'] == 'tree-sitter' else None
+    if job['kind'] == 'dataset':
+        with tracing.span('assess/dataset', dataset=job['dataset']):
+            return assess_dataset(job['path'], parser, job['diversity_error'])
+    index = MembershipIndex.load(MembershipIndex.path_for(job['dataset_path']))
+    neighbors = NeighborIndex.load(NeighborIndex.path_for(job['dataset_path']))
+    with tracing.span('assess/model', dataset=job['dataset'], model=job['model'], epoch=job['epoch']):
+        return assess_model(job['path'], parser, job['batch_size'], job['steps'], job['temperature'], index,
+                            torch.device(device), job['diversity_error'], neighbors, job['near_distance'],
+                            job['chunk_size'])
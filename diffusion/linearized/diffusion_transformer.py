@@ -1,13 +1,32 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+from torch.utils.checkpoint import checkpoint
+
+
+def padding_mask(x, pad_id):
+    """
+    The `pad_mask` to run a batch with: every `<PAD>` of a row but the first, which alone tells the model where
+    the row ends at the latest. Every row keeps a position.
+    """
+    pad = x == pad_id
+    return pad & (pad.cumsum(dim=1) > 1)
 
 
 class DiffusionTransformer(nn.Module):
-    def __init__(self, vocab_size, max_len, embed_dim=128, num_heads=4, num_layers=10):
+    """
+    Positions under `pad_mask` are hidden from attention, and their logits put all the mass on the token they
+    hold, a token the model sees is known. See `padding_mask`.
+
+    With `checkpointing`, only the input of every encoder layer is kept for the backward pass in training, the
+    activations inside the layer are recomputed from it, for about a third more compute.
+    """
+    def __init__(self, vocab_size, max_len, embed_dim=128, num_heads=4, num_layers=10, checkpointing=False):
         super().__init__()
         self.embed_dim = embed_dim
         self.num_heads = num_heads
         self.num_layers = num_layers
+        self.checkpointing = checkpointing
 
         self.token_emb = nn.Embedding(vocab_size, embed_dim)
         self.pos_emb = nn.Embedding(max_len, embed_dim)
@@ -38,6 +57,136 @@ class DiffusionTransformer(nn.Module):
         # token embedding + position embedding + time embedding
         h = self.token_emb(x) + self.pos_emb(pos) + self.time_emb(t).unsqueeze(1)
 
-        output = self.transformer(h, src_key_padding_mask=pad_mask)
+        if self.checkpointing and self.training:
+            output = h
+            for layer in self.transformer.layers:
+                output = checkpoint(layer, output, src_key_padding_mask=pad_mask, use_reentrant=False)
+        else:
+            output = self.transformer(h, src_key_padding_mask=pad_mask)
+
+        logits = self.head(output)
+        if pad_mask is not None:
+            logits = torch.where(pad_mask.unsqueeze(-1), self._known_logits(x), logits)
+        return logits
+
+    def _known_logits(self, x):
+        # all the mass on the tokens of `x`, a finite minimum keeps the softmax and its gradient free of NaNs
+        logits = torch.full((*x.shape, self.head.out_features), torch.finfo(torch.float32).min, device=x.device)
+        return logits.scatter_(-1, x.unsqueeze(-1), 0.0)
+
+
+class _FusedEncoderLayer(nn.Module):
+    """
+    Post-norm encoder layer computing the same function as `nn.TransformerEncoderLayer` with its defaults,
+    with one fused QKV projection and `scaled_dot_product_attention`. Runs on `(B, L, D)` batches, or on the
+    `(N, D)` tokens of packed rows given the `(B, L')` mask of the `slots` they fill in rows of length `L'`.
+    """
+    # names of the weights in `nn.TransformerEncoderLayer` -> names here
+    _dense_names = {
+        'self_attn.in_proj_weight': 'qkv.weight',
+        'self_attn.in_proj_bias': 'qkv.bias',
+        'self_attn.out_proj.weight': 'proj.weight',
+        'self_attn.out_proj.bias': 'proj.bias',
+    }
+
+    def __init__(self, embed_dim, num_heads, dim_feedforward=2048, dropout=0.1):
+        super().__init__()
+        self.register_state_dict_post_hook(self._dense_state_dict)
+        self.num_heads = num_heads
+        self.head_dim = embed_dim // num_heads
+        self.dropout_p = dropout
+
+        self.qkv = nn.Linear(embed_dim, 3 * embed_dim)
+        self.proj = nn.Linear(embed_dim, embed_dim)
+        self.linear1 = nn.Linear(embed_dim, dim_feedforward)
+        self.linear2 = nn.Linear(dim_feedforward, embed_dim)
+        self.norm1 = nn.LayerNorm(embed_dim)
+        self.norm2 = nn.LayerNorm(embed_dim)
+        self.dropout = nn.Dropout(dropout)
+        self.dropout1 = nn.Dropout(dropout)
+        self.dropout2 = nn.Dropout(dropout)
+
+    @staticmethod
+    def _dense_state_dict(module, state_dict, prefix, local_metadata):
+        # saved under the names of `DiffusionTransformer`, so either model loads the checkpoints of the other;
+        # the int8 weights of a quantized copy are saved under their own names
+        for dense, fused in module._dense_names.items():
+            if prefix + fused in state_dict:
+                state_dict[prefix + dense] = state_dict.pop(prefix + fused)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # weight-mapping shim, reads the weights of checkpoints of `DiffusionTransformer`
+        for dense, fused in self._dense_names.items():
+            if prefix + dense in state_dict:
+                state_dict[prefix + fused] = state_dict.pop(prefix + dense)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def _attention(self, x, slots):
+        qkv = self.qkv(x)
+        if slots is not None:
+            # packed tokens back into rows, padded only up to the longest row
+            packed, qkv = qkv, qkv.new_zeros(*slots.shape, qkv.size(-1))
+            qkv[slots] = packed
+        q, k, v = (e.unflatten(-1, (self.num_heads, self.head_dim)).transpose(1, 2) for e in qkv.chunk(3, dim=-1))
+        mask = slots[:, None, None, :] if slots is not None else None
+        a = F.scaled_dot_product_attention(q, k, v, attn_mask=mask, dropout_p=self.dropout_p if self.training else 0.0)
+        a = a.transpose(1, 2).flatten(-2)
+        if slots is not None:
+            a = a[slots]
+        return self.proj(a)
+
+    def forward(self, x, slots=None):
+        x = self.norm1(x + self.dropout1(self._attention(x, slots)))
+        return self.norm2(x + self.dropout2(self.linear2(self.dropout(F.relu(self.linear1(x))))))
+
+
+class _FusedEncoder(nn.Module):
+    def __init__(self, embed_dim, num_heads, num_layers, checkpointing=False):
+        super().__init__()
+        self.checkpointing = checkpointing
+        self.layers = nn.ModuleList([_FusedEncoderLayer(embed_dim, num_heads) for _ in range(num_layers)])
+
+    def forward(self, x, slots=None):
+        for layer in self.layers:
+            if self.checkpointing and self.training:
+                x = checkpoint(layer, x, slots, use_reentrant=False)
+            else:
+                x = layer(x, slots)
+        return x
+
+
+class FusedDiffusionTransformer(DiffusionTransformer):
+    """
+    `DiffusionTransformer` with fused attention, saving and loading the same checkpoints. Positions under
+    `pad_mask` are dropped before the encoder: the remaining tokens are packed into one `(N, D)` tensor for the
+    projections and the feed-forward layers, and attention runs on rows padded only to the longest one, so the
+    cost of a forward follows the positions kept rather than `max_len`.
+
+    The result is that of `DiffusionTransformer` given the same `pad_mask`.
+    """
+    def __init__(self, vocab_size, max_len, embed_dim=128, num_heads=4, num_layers=10, checkpointing=False):
+        super().__init__(vocab_size, max_len, embed_dim, num_heads, 0, checkpointing)
+        self.num_layers = num_layers
+        self.transformer = _FusedEncoder(embed_dim, num_heads, num_layers, checkpointing)
+        self.transformer.apply(self._init_weights)
+
+    def forward(self, x, t, pad_mask=None):
+        seq_len = x.size(1)
+        pos = torch.arange(seq_len, device=x.device).unsqueeze(0)
+
+        if t.dim() == 1:
+            t = t.unsqueeze(1)
+
+        h = self.token_emb(x) + self.pos_emb(pos) + self.time_emb(t).unsqueeze(1)
+
+        if pad_mask is None:
+            return self.head(self.transformer(h))
+
+        keep = ~pad_mask
+        lengths = keep.sum(dim=1)
+        slots = torch.arange(int(lengths.max()), device=x.device) < lengths.unsqueeze(1)
+        output = self.transformer(h[keep], slots)
 
-        return self.head(output)
\ No newline at end of file
+        logits = self._known_logits(x)
+        logits[keep] = self.head(output)
+        return logits
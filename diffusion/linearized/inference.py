@@ -1,19 +1,21 @@
 import torch
 from torch import nn
 
+from diffusion import tracing
+from diffusion.linearized.diffusion_transformer import padding_mask
 from diffusion.linearized.io import load_model_checkpoint_for_inference
 from diffusion.linearized.preserved_tokens import PreservedTokens
 from diffusion.linearized.program_tokenizer import ProgramTokenizer
 
 
 @torch.no_grad()
-def generate(
+def generate_ids(
         model: nn.Module,
         tokenizer: ProgramTokenizer,
         device: torch.device,
         temperature: float = 1,
         steps: int = 10, batch_size: int = 1
-) -> list[list[str]]:
+) -> torch.Tensor:
     model.eval()
     L = tokenizer.max_len
     pad_id = tokenizer.token_to_index[PreservedTokens.PAD]
@@ -24,32 +26,50 @@ def generate(
 
     # denoise iteratively
     for step in range(steps):
-        # time step t from 1.0 to 0.0
-        t_val = 1.0 - (step / steps)
-        t = torch.full((batch_size, 1), t_val, device=device)
+        with tracing.span('generate/step', step=step):
+            # time step t from 1.0 to 0.0
+            t_val = 1.0 - (step / steps)
+            t = torch.full((batch_size, 1), t_val, device=device)
+
+            # prediction, padding kept from the previous steps past the first of a row is left out and stays
+            with tracing.span('generate/forward'):
+                logits = model(x_t, t, pad_mask=padding_mask(x_t, pad_id))
 
-        # prediction
-        logits = model(x_t, t, pad_mask=None)
-        logits = logits / temperature
-        probs = torch.softmax(logits, dim=-1)
+            with tracing.span('generate/sample'):
+                logits = logits / temperature
+                probs = torch.softmax(logits, dim=-1)
 
-        sample_ids = torch.multinomial(probs.view(-1, tokenizer.vocab_size), num_samples=1)  # (1, L)
-        sample_ids = sample_ids.view(batch_size, L)
-        confidences = probs.gather(2, sample_ids.unsqueeze(-1)).squeeze(-1)
+                sample_ids = torch.multinomial(probs.view(-1, tokenizer.vocab_size), num_samples=1)  # (1, L)
+                sample_ids = sample_ids.view(batch_size, L)
+                confidences = probs.gather(2, sample_ids.unsqueeze(-1)).squeeze(-1)
 
-        num_to_keep = int(L * (step + 1) / steps)
+            num_to_keep = int(L * (step + 1) / steps)
 
-        if step < steps - 1:
-            threshold_index = torch.topk(confidences, num_to_keep).indices
-            mask_indices = torch.ones_like(x_t, dtype=torch.bool)
-            mask_indices.scatter_(1, threshold_index, False)
+            with tracing.span('generate/remask'):
+                if step < steps - 1:
+                    threshold_index = torch.topk(confidences, num_to_keep).indices
+                    mask_indices = torch.ones_like(x_t, dtype=torch.bool)
+                    mask_indices.scatter_(1, threshold_index, False)
 
-            x_t = sample_ids.clone()
-            x_t[mask_indices] = mask_id
-        else:
-            x_t = sample_ids
+                    x_t = sample_ids.clone()
+                    x_t[mask_indices] = mask_id
+                else:
+                    x_t = sample_ids
+        tracing.count('generate/tokens', batch_size * L)
 
-    return [tokenizer.decode(x.tolist()) for x in x_t]
+    return x_t
+
+
+def generate(
+        model: nn.Module,
+        tokenizer: ProgramTokenizer,
+        device: torch.device,
+        temperature: float = 1,
+        steps: int = 10, batch_size: int = 1
+) -> list[list[str]]:
+    x_t = generate_ids(model, tokenizer, device, temperature, steps, batch_size)
+    with tracing.span('generate/decode'):
+        return tokenizer.decode_batch(x_t, trim=False)
 
 
 def inference(
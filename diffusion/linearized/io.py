@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import json
 import os
+import pickle
 
 import torch
 import torch.nn as nn
 import torch.optim as optim
 
 from diffusion.linearized import DiffusionTransformer
+from diffusion.linearized.diffusion_transformer import FusedDiffusionTransformer
 from diffusion.linearized.program_tokenizer import ProgramTokenizer
 
 
@@ -24,7 +27,8 @@ def save_model_checkpoint(
         'num_layers': model.num_layers,
         'optimizer_state_dict': optimizer.state_dict(),
         'vocab': tokenizer.vocab,
-        'max_len': tokenizer.max_len
+        'max_len': tokenizer.max_len,
+        'keywords': tokenizer.keywords
     }
     if not filepath.endswith('.pt'):
         filepath += '.pt'
@@ -52,15 +56,84 @@ def load_model_checkpoint_for_training(
     return epoch
 
 
+def export_model_for_inference(checkpoint_path: str, export_dir: str) -> None:
+    """
+    Writes the inference-only part of a training checkpoint to a directory: `config.json` with the model
+    hyperparameters and the vocabulary, and `weights.pt` with the bare `state_dict`, without the optimizer
+    state. `load_model_checkpoint_for_inference` memory-maps the weights, so workers open the export in
+    milliseconds and share its pages.
+    """
+    checkpoint = torch.load(checkpoint_path, map_location='cpu', mmap=True)
+    config = {
+        'embed_dim': checkpoint.get('embed_dim', 128),
+        'num_heads': checkpoint.get('num_heads', 4),
+        'num_layers': checkpoint.get('num_layers', 2),
+        'vocab': checkpoint.get('vocab', []),
+        'max_len': checkpoint.get('max_len', 0),
+        'keywords': checkpoint.get('keywords')
+    }
+    os.makedirs(export_dir, exist_ok=True)
+    # contiguous copies, views into the checkpoint would drag their whole storage along
+    torch.save({k: v.contiguous().clone() for k, v in checkpoint['model_state_dict'].items()},
+               os.path.join(export_dir, 'weights.pt'))
+    with open(os.path.join(export_dir, 'config.json'), 'w') as f:
+        f.write(json.dumps(config, indent=4))
+    print(f"======== Exported {checkpoint_path} to {export_dir} ========\n")
+
+
+def _exported_weights(export_dir: str) -> dict[str, torch.Tensor]:
+    return torch.load(os.path.join(export_dir, 'weights.pt'), map_location='cpu', mmap=True, weights_only=True)
+
+
+def quantized_checkpoint_path(filepath: str, fused: bool = False) -> str:
+    """The int8 cache of a checkpoint, next to it; that of an export sits next to its directory, not inside."""
+    filepath = filepath.rstrip('/' + (os.altsep or '') + os.sep)
+    base = filepath if os.path.isdir(filepath) else os.path.splitext(filepath)[0]
+    return base + ('.fused' if fused else '') + '.int8.pt'
+
+
+def _modified(filepath: str) -> float:
+    # re-exporting overwrites the files of the directory, which leaves the mtime of the directory itself as is
+    if os.path.isdir(filepath):
+        return max(os.path.getmtime(os.path.join(filepath, name)) for name in ('config.json', 'weights.pt'))
+    return os.path.getmtime(filepath)
+
+
+def is_model_checkpoint(path: str) -> bool:
+    """Whether `path` is a training checkpoint or an export, rather than a quantized cache or another file."""
+    if os.path.isdir(path):
+        return os.path.isfile(os.path.join(path, 'config.json')) and os.path.isfile(os.path.join(path, 'weights.pt'))
+    return path.endswith('.pt') and not path.endswith('.int8.pt')
+
+
 def load_model_checkpoint_for_inference(
         filepath: str,
-        device: torch.device
+        device: torch.device,
+        quantize: bool = False,
+        fused: bool = False
 ) -> tuple[ProgramTokenizer, DiffusionTransformer] | None:
+    """
+    Loads a training checkpoint or a directory written by `export_model_for_inference`, whose weights are
+    memory-mapped rather than read.
+
+    With `fused`, the weights are loaded into a `FusedDiffusionTransformer`.
+    With `quantize`, the model is dynamically quantized to int8 for the CPU. The `state_dict` of the quantized
+    model is cached next to the checkpoint, and loaded into a freshly quantized model; it is rebuilt whenever
+    the checkpoint is newer or the cached state no longer fits the model.
+    """
     if not os.path.exists(filepath):
         print(f"No checkpoint found at {filepath}")
         return None
+    if quantize and device.type != 'cpu':
+        raise ValueError(f'Int8 dynamic quantization only runs on the CPU, got device {device}')
 
-    checkpoint = torch.load(filepath, map_location='cpu')
+    exported = os.path.isdir(filepath)
+    if exported:
+        with open(os.path.join(filepath, 'config.json')) as f:
+            checkpoint = json.load(f)
+    else:
+        # with a quantized model cached, only the vocabulary is read, the weights are mapped but never touched
+        checkpoint = torch.load(filepath, map_location='cpu', mmap=quantize)
 
     vocab = checkpoint.get('vocab', [])
     max_len = checkpoint.get('max_len', 0)
@@ -68,8 +141,37 @@ def load_model_checkpoint_for_inference(
     num_heads = checkpoint.get('num_heads', 4)
     num_layers = checkpoint.get('num_layers', 2)
 
-    tokenizer = ProgramTokenizer.from_vocab(vocab, max_len)
-    model = DiffusionTransformer(len(vocab), max_len, embed_dim, num_heads, num_layers).to(device)
+    tokenizer = ProgramTokenizer.from_vocab(vocab, max_len, checkpoint.get('keywords'))
+    model_type = FusedDiffusionTransformer if fused else DiffusionTransformer
+    if quantize:
+        from diffusion.linearized.quantization import quantize_int8
+        cache = quantized_checkpoint_path(filepath, fused)
+        if os.path.exists(cache) and os.path.getmtime(cache) >= _modified(filepath):
+            # the weights the quantized layers are built from are replaced by the cached ones
+            model = quantize_int8(model_type(len(vocab), max_len, embed_dim, num_heads, num_layers))
+            try:
+                model.load_state_dict(torch.load(cache, map_location='cpu', weights_only=True))
+                print(f"======== Quantized model loaded from {cache} ========\n")
+                return tokenizer, model
+            except (RuntimeError, pickle.UnpicklingError) as e:
+                print(f"======== Quantized model at {cache} is out of date, rebuilding it ({type(e).__name__}) ========\n")
+        model = model_type(len(vocab), max_len, embed_dim, num_heads, num_layers)
+        model.load_state_dict(_exported_weights(filepath) if exported else checkpoint['model_state_dict'])
+        model = quantize_int8(model)
+        torch.save(model.state_dict(), cache)
+        print(f"======== Checkpoint loaded from {filepath}, quantized model saved to {cache} ========\n")
+        return tokenizer, model
+
+    if exported:
+        # built without allocating or initializing weights, the parameters then become the mapped tensors
+        with torch.device('meta'):
+            model = model_type(len(vocab), max_len, embed_dim, num_heads, num_layers)
+        model.load_state_dict(_exported_weights(filepath), assign=True)
+        model = model.to(device)
+        print(f"======== Exported model loaded from {filepath} ========\n")
+        return tokenizer, model
+
+    model = model_type(len(vocab), max_len, embed_dim, num_heads, num_layers).to(device)
 
     model.load_state_dict(checkpoint['model_state_dict'])
     model = model.to(device)
@@ -2,23 +2,26 @@ import torch
 from torch import Tensor
 from torch.utils.data import Dataset
 
+from diffusion.linearized.metadata import SampleMetadata
 from diffusion.linearized.program_tokenizer import ProgramTokenizer
 
 
 class LinearizedDataset(Dataset):
-    def __init__(self, tokenizer: ProgramTokenizer, samples: list[Tensor]) -> None:
+    def __init__(self, tokenizer: ProgramTokenizer, samples: list[Tensor], metadata: SampleMetadata | None = None) -> None:
         self.tokenizer = tokenizer
         self.samples = samples
+        self.metadata = metadata
 
     @classmethod
-    def from_raw_samples(cls, raw_samples: list[list[str]]) -> LinearizedDataset:
-        tokenizer = ProgramTokenizer.from_programs(raw_samples)
-        samples = [torch.tensor(tokenizer.encode(sample)) for sample in raw_samples]
-        return cls(tokenizer, samples)
+    def from_raw_samples(cls, raw_samples: list[list[str]], keywords: list[str] | None = None,
+                         metadata: SampleMetadata | None = None) -> LinearizedDataset:
+        tokenizer = ProgramTokenizer.from_programs(raw_samples, keywords)
+        samples = list(torch.from_numpy(tokenizer.encode_batch(raw_samples)))
+        return cls(tokenizer, samples, metadata)
 
     def to(self, device: torch.device) -> LinearizedDataset:
         return LinearizedDataset(
-            self.tokenizer, [sample.to(device) for sample in self.samples]
+            self.tokenizer, [sample.to(device) for sample in self.samples], self.metadata
         )
 
     def __len__(self) -> int:
@@ -31,17 +34,27 @@ class LinearizedDataset(Dataset):
         torch.save({
             'vocab': self.tokenizer.vocab,
             'max_len': self.tokenizer.max_len,
+            'keywords': self.tokenizer.keywords,
             'samples': self.samples
         }, filepath)
+        # saved after the checkpoint, so it is up to date with it
+        if self.metadata is not None:
+            self.metadata.save(SampleMetadata.path_for(filepath))
         print(f"======== Dataset checkpoint saved to {filepath}")
 
     @classmethod
-    def from_checkpoint(cls, filepath: str) -> LinearizedDataset:
-        checkpoint = torch.load(filepath)
+    def from_checkpoint(cls, filepath: str, mmap: bool = False) -> LinearizedDataset:
+        """
+        With `mmap`, samples are memory-mapped from the checkpoint and only read when used. The metadata
+        saved next to the checkpoint is loaded with it, if there is an up-to-date one.
+        """
+        checkpoint = torch.load(filepath, mmap=mmap)
         tokenizer = ProgramTokenizer.from_vocab(
             checkpoint['vocab'],
-            checkpoint['max_len']
+            checkpoint['max_len'],
+            checkpoint.get('keywords')
         )
         samples = checkpoint['samples']
+        metadata = SampleMetadata.load(SampleMetadata.path_for(filepath)) if SampleMetadata.exists_for(filepath) else None
         print(f"======== Dataset checkpoint loaded from {filepath}")
-        return cls(tokenizer, samples)
\ No newline at end of file
+        return cls(tokenizer, samples, metadata)
\ No newline at end of file
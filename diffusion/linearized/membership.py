@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from diffusion.linearized.program_tokenizer import ProgramTokenizer
+
+if TYPE_CHECKING:
+    import torch
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_LENGTH = np.uint64(0x9E3779B97F4A7C15)
+_EMPTY = np.uint64(0)
+_CHUNK = 1 << 16
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer
+    h = h ^ (h >> np.uint64(30))
+    h = h * _MIX_1
+    h = h ^ (h >> np.uint64(27))
+    h = h * _MIX_2
+    return h ^ (h >> np.uint64(31))
+
+
+def _token_codes(tokenizer: ProgramTokenizer) -> np.ndarray:
+    # codes depend on the token text only, so rows of tokenizers with different ID orders hash alike
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), 'little') for t in tokenizer.vocab],
+        dtype=np.uint64
+    )
+
+
+def _weights(n: int) -> np.ndarray:
+    # a pseudo-random odd multiplier per position
+    with np.errstate(over='ignore'):
+        return _mix(np.arange(1, n + 1, dtype=np.uint64) * _LENGTH) | np.uint64(1)
+
+
+def fingerprints(x: torch.Tensor | np.ndarray, tokenizer: ProgramTokenizer) -> np.ndarray:
+    """
+    64-bit fingerprints of a `(B, L)` batch of rows, taken over the tokens before the first `<EOS>` of every
+    row (the whole row if it has none); whatever follows `<EOS>` does not matter. Never zero.
+    """
+    if not isinstance(x, np.ndarray):
+        x = x.cpu().numpy()
+    B, L = x.shape
+    codes = _token_codes(tokenizer)
+    weights = _weights(L)
+    result = np.empty(B, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for start in range(0, B, _CHUNK):
+            rows = x[start:start + _CHUNK]
+            is_eos = rows == tokenizer.eos_id
+            length = np.where(is_eos.any(axis=1), is_eos.argmax(axis=1), L)
+            c = np.where(np.arange(L) < length[:, None], codes[rows], _EMPTY)
+            h = (c * weights).sum(axis=1, dtype=np.uint64)
+            h = _mix(h ^ (length.astype(np.uint64) * _LENGTH))
+            h[h == _EMPTY] = 1
+            result[start:start + _CHUNK] = h
+    return result
+
+
+class MembershipIndex:
+    """
+    Open-addressing hash set of the fingerprints of a dataset's rows, answering "is this row a training row"
+    for whole batches with vectorized linear probing. The table is a flat `uint64` array kept at most half
+    full, saved as `.npy` and memory-mapped on load, so it is shared between processes and costs nothing to
+    open. Membership is exact up to 64-bit fingerprint collisions.
+    """
+    def __init__(self, table: np.ndarray):
+        self.table = table
+        self.mask = np.uint64(len(table) - 1)
+
+    @classmethod
+    def build(cls, x: torch.Tensor | np.ndarray, tokenizer: ProgramTokenizer) -> MembershipIndex:
+        keys = np.unique(fingerprints(x, tokenizer))
+        capacity = 16
+        while capacity < 2 * len(keys):
+            capacity *= 2
+        table = np.zeros(capacity, dtype=np.uint64)
+        mask = np.uint64(capacity - 1)
+        pending = keys
+        slots = pending & mask
+        while len(pending) > 0:
+            free = np.flatnonzero(table[slots] == _EMPTY)
+            # one key per free slot wins, everything else probes on
+            _, first = np.unique(slots[free], return_index=True)
+            winners = free[first]
+            table[slots[winners]] = pending[winners]
+            rest = np.ones(len(pending), dtype=bool)
+            rest[winners] = False
+            pending = pending[rest]
+            slots = (slots[rest] + np.uint64(1)) & mask
+        return cls(table)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.table))
+
+    def contains(self, x: torch.Tensor | np.ndarray, tokenizer: ProgramTokenizer) -> np.ndarray:
+        """Boolean `(B,)` array telling which rows of a `(B, L)` batch are in the index."""
+        fp = fingerprints(x, tokenizer)
+        found = np.zeros(len(fp), dtype=bool)
+        active = np.arange(len(fp))
+        slots = fp & self.mask
+        while len(active) > 0:
+            stored = self.table[slots]
+            hit = stored == fp[active]
+            found[active[hit]] = True
+            probing = ~hit & (stored != _EMPTY)
+            active = active[probing]
+            slots = (slots[probing] + np.uint64(1)) & self.mask
+        return found
+
+    def save(self, path: str):
+        np.save(path, self.table)
+
+    @classmethod
+    def load(cls, path: str) -> MembershipIndex:
+        return cls(np.load(path, mmap_mode='r'))
+
+    @staticmethod
+    def path_for(dataset_path: str) -> str:
+        return os.path.splitext(dataset_path)[0] + '.index.npy'
+
+    @classmethod
+    def for_dataset(cls, dataset_path: str) -> MembershipIndex:
+        """The index of a dataset checkpoint, built and saved next to it unless an up-to-date one is there."""
+        path = cls.path_for(dataset_path)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(dataset_path):
+            return cls.load(path)
+        import torch
+        from diffusion.linearized.linearized_dataset import LinearizedDataset
+        ds = LinearizedDataset.from_checkpoint(dataset_path)
+        index = cls.build(torch.stack(ds.samples), ds.tokenizer)
+        index.save(path)
+        return cls.load(path)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+import numpy as np
+
+from diffusion.linearized.preserved_tokens import PreservedTokens
+from diffusion.linearized.sidecar import DatasetSidecar
+from mast.node import AbstractNode
+from mast.stats import TreeStats, StatsCollector
+
+if TYPE_CHECKING:
+    from diffusion.linearized.program_tokenizer import ProgramTokenizer
+
+
+class SampleMetadata(DatasetSidecar):
+    """
+    Per-sample columns of a dataset: depth and size of every program parsed from its row as `StatsCollector`
+    computes them, the length of the row up to its `<EOS>`, and a `(N, T)` matrix counting the nodes of each
+    of `type_names` in every program.
+
+    They are collected once from the sampled trees when the dataset is sampled, which parse back from their
+    rows unchanged, or later by `for_dataset` from the parsed rows, so either way they agree, and saved next
+    to the checkpoint as a `DatasetSidecar`, so samples can be filtered and batched by them without decoding
+    or parsing the token data. Samples that failed to parse have depth -1.
+    """
+    _arrays = ('depth', 'size', 'length', 'type_counts', 'type_names')
+    suffix = '.meta'
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        super().__init__(arrays)
+        self._type_index = {str(n): i for i, n in enumerate(self.type_names)}
+
+    @classmethod
+    def build(cls, stats: Iterable[TreeStats | None], lengths: Iterable[int]) -> SampleMetadata:
+        depth, size, length = [], [], []
+        type_index: dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        for i, (s, n) in enumerate(zip(stats, lengths)):
+            length.append(n)
+            if s is None:
+                depth.append(-1)
+                size.append(0)
+                continue
+            depth.append(s.depth)
+            size.append(s.size)
+            for name, count in s.node_types.items():
+                rows.append(i)
+                cols.append(type_index.setdefault(name, len(type_index)))
+                counts.append(count)
+        type_counts = np.zeros((len(depth), len(type_index)), dtype=np.int32)
+        type_counts[rows, cols] = counts
+        return cls({
+            'depth': np.array(depth, dtype=np.int32),
+            'size': np.array(size, dtype=np.int32),
+            'length': np.array(length, dtype=np.int32),
+            'type_counts': type_counts,
+            'type_names': np.array(list(type_index), dtype=str),
+        })
+
+    @classmethod
+    def from_parsed(cls, parsed: Iterable[tuple[list[int], AbstractNode | None]],
+                    tokenizer: ProgramTokenizer) -> SampleMetadata:
+        collector = StatsCollector()
+        stats, lengths = [], []
+        for ids, program in parsed:
+            stats.append(collector.collect(program) if program is not None else None)
+            lengths.append(cls.length_of(ids, tokenizer))
+        return cls.build(stats, lengths)
+
+    @staticmethod
+    def length_of(ids: list[int], tokenizer: ProgramTokenizer) -> int:
+        """Length of a row up to its `<EOS>`."""
+        eos_id = tokenizer.token_to_index[PreservedTokens.EOS]
+        return ids.index(eos_id) if eos_id in ids else len(ids)
+
+    def __len__(self) -> int:
+        return len(self.depth)
+
+    def counts(self, type_name: str) -> np.ndarray:
+        """Number of nodes of `type_name` in every sample, zeros for a type no sample has."""
+        if type_name not in self._type_index:
+            return np.zeros(len(self), dtype=np.int32)
+        return self.type_counts[:, self._type_index[type_name]]
+
+    def where(
+            self,
+            depth: tuple[int | None, int | None] = (None, None),
+            length: tuple[int | None, int | None] = (None, None),
+            size: tuple[int | None, int | None] = (None, None),
+            with_types: Iterable[str] = (),
+            without_types: Iterable[str] = ()
+    ) -> np.ndarray:
+        """
+        Indices of the samples with depth, length and size within the given inclusive bounds (`None` for no
+        bound), having at least one node of every type of `with_types` and none of `without_types`.
+        """
+        keep = self.depth >= 0
+        for column, (low, high) in ((self.depth, depth), (self.length, length), (self.size, size)):
+            if low is not None:
+                keep &= column >= low
+            if high is not None:
+                keep &= column <= high
+        for name in with_types:
+            keep &= self.counts(name) > 0
+        for name in without_types:
+            keep &= self.counts(name) == 0
+        return np.flatnonzero(keep)
+
+
+class StratifiedBatchSampler:
+    """
+    Batches of dataset indices, for the `batch_sampler` of a `DataLoader`, in which every stratum of `key`
+    (a metadata column such as `depth`) is represented in proportion to its share of the samples. Strata are
+    the distinct values of `key`, or `bins` quantile ranges of it. Samples are shuffled within their stratum
+    and spread evenly over the epoch by their rank in it, so no batch is skewed towards one stratum.
+
+    With `curriculum` epochs, epoch `e` only draws from the lowest `(e + 1) / curriculum` of the strata, so
+    training starts on the shallowest or shortest programs and reaches the whole dataset after `curriculum`
+    epochs; call `set_epoch` before every epoch, as with `DistributedSampler`.
+    """
+    def __init__(self, key: np.ndarray, batch_size: int, bins: int | None = None, curriculum: int = 0,
+                 indices: np.ndarray | None = None, seed: int | None = None, drop_last: bool = False):
+        self.indices = np.arange(len(key)) if indices is None else np.asarray(indices)
+        values = np.asarray(key)[self.indices]
+        if bins is not None:
+            edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+            values = np.searchsorted(edges, values, side='right')
+        _, self.strata = np.unique(values, return_inverse=True)
+        self.n_strata = int(self.strata.max()) + 1 if len(self.strata) > 0 else 0
+        self.batch_size = batch_size
+        self.curriculum = curriculum
+        self.seed = seed
+        self.drop_last = drop_last
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def _active(self) -> np.ndarray:
+        # positions within `indices` of the samples the current epoch draws from
+        if self.curriculum <= 0 or self.epoch + 1 >= self.curriculum:
+            return np.arange(len(self.indices))
+        admitted = max(1, -(-self.n_strata * (self.epoch + 1) // self.curriculum))
+        return np.flatnonzero(self.strata < admitted)
+
+    def __len__(self) -> int:
+        n = len(self._active())
+        return n // self.batch_size if self.drop_last else -(-n // self.batch_size)
+
+    def __iter__(self) -> Iterator[list[int]]:
+        rng = np.random.default_rng(None if self.seed is None else (self.seed, self.epoch))
+        active = self._active()
+        strata = self.strata[active]
+        # a random order, then by stratum: the rank of every sample within its stratum
+        order = rng.permutation(len(active))
+        order = order[np.argsort(strata[order], kind='stable')]
+        sizes = np.bincount(strata, minlength=self.n_strata)
+        starts = np.cumsum(sizes) - sizes
+        rank = np.arange(len(order)) - starts[strata[order]]
+        # the position of every sample in the epoch, evenly spaced within its stratum with a random offset
+        position = (rank + rng.random(len(order))) / sizes[strata[order]]
+        epoch = self.indices[active[order[np.argsort(position, kind='stable')]]]
+        stop = len(epoch) - len(epoch) % self.batch_size if self.drop_last else len(epoch)
+        for start in range(0, stop, self.batch_size):
+            yield epoch[start:start + self.batch_size].tolist()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+from functools import lru_cache
+from typing import Iterable, TYPE_CHECKING
+
+import numpy as np
+
+from diffusion.linearized.sidecar import DatasetSidecar
+from diffusion.sketches import _MASK, _mix
+from mast.node import AbstractNode
+
+if TYPE_CHECKING:
+    from diffusion.linearized.program_tokenizer import ProgramTokenizer
+
+_STEP = 0x9E3779B97F4A7C15
+# label of the `*` nodes padding stems and windows
+_DUMMY = 0
+
+
+@lru_cache(maxsize=1 << 16)
+def _label_hash(label: str) -> int:
+    return int.from_bytes(hashlib.blake2b(label.encode(), digest_size=8).digest(), 'little') or 1
+
+
+def _label(node: AbstractNode) -> int:
+    label = node.get_type_name()
+    for name, value in node.enumerate_attributes():
+        label += f'\x00{name}={value!r}'
+    return _label_hash(label)
+
+
+def pq_grams(tree: AbstractNode, p: int = 2, q: int = 3) -> list[int]:
+    """
+    64-bit hashes of the pq-grams of a tree: for every node, its stem of `p` ancestors ending in the node,
+    joined with each window of `q` consecutive children, padded with `*` nodes so that every child starts
+    a window and a leaf has a single window of `*`s. A node's label is its type name and attributes.
+    """
+    grams = []
+    stack = [(tree, _label(tree), (_DUMMY,) * (p - 1))]
+    while stack:
+        node, label, ancestors = stack.pop()
+        stem = ancestors + (label,)
+        h_stem = 0
+        for l in stem:
+            h_stem = ((h_stem * _STEP) ^ l) & _MASK
+        children = [c for _, c in node.enumerate_nodes()]
+        labels = [_label(c) for c in children]
+        padded = [_DUMMY] * (q - 1) + labels + [_DUMMY] * (q - 1) if children else [_DUMMY] * q
+        for i in range(len(padded) - q + 1):
+            h = h_stem
+            for l in padded[i:i + q]:
+                h = ((h * _STEP) ^ l) & _MASK
+            grams.append(_mix(h))
+        stem = stem[1:]
+        stack.extend((c, l, stem) for c, l in zip(children, labels))
+    return grams
+
+
+def _profile(tree: AbstractNode | None, p: int, q: int) -> tuple[np.ndarray, np.ndarray]:
+    if tree is None:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32)
+    grams, counts = np.unique(np.array(pq_grams(tree, p, q), dtype=np.uint64), return_counts=True)
+    return grams, counts.astype(np.int32)
+
+
+def pq_gram_distance(t1: AbstractNode, t2: AbstractNode, p: int = 2, q: int = 3) -> float:
+    """
+    pq-gram distance of two trees, `1 - 2|P1 ∩ P2| / (|P1| + |P2|)` over their pq-gram bags; 0 for equal
+    trees and 1 for trees without a pq-gram in common. It measures shared local structure; it is not a bound
+    on tree edit distance either way.
+    """
+    g1, c1 = _profile(t1, p, q)
+    g2, c2 = _profile(t2, p, q)
+    _, i1, i2 = np.intersect1d(g1, g2, assume_unique=True, return_indices=True)
+    return 1 - 2 * int(np.minimum(c1[i1], c2[i2]).sum()) / (int(c1.sum()) + int(c2.sum()))
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # indices of all the `[start, end)` ranges, concatenated, and the range each index belongs to
+    lengths = ends - starts
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    first = np.cumsum(lengths) - lengths
+    return np.arange(int(lengths.sum())) - first[owner] + starts[owner], owner
+
+
+class NeighborIndex(DatasetSidecar):
+    """
+    Nearest neighbors of trees among a set of training trees under `pq_gram_distance`.
+
+    Every training tree is stored as its bag of pq-grams, and an inverted index maps every pq-gram to the
+    trees that contain it. A query gathers candidates from the postings of its rarest pq-grams, up to
+    `budget` postings, so pq-grams every tree shares (the root's, say) cost nothing; the `rerank` best
+    candidates by shared rare pq-grams are then scored exactly against the whole bags. A neighbor sharing
+    only common pq-grams with the query can be missed, such neighbors are far anyway.
+
+    The index is a `DatasetSidecar` of the training set, built from its parsed rows by `for_dataset`.
+    Trees are identified by their position in the training set; positions without a tree never match.
+    """
+    _arrays = ('sizes', 'tree_offsets', 'tree_grams', 'tree_counts', 'gram_keys', 'gram_offsets', 'postings',
+               'posting_counts', 'pq')
+    suffix = '.neighbors'
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        super().__init__(arrays)
+        self.p, self.q = (int(v) for v in arrays['pq'])
+
+    @classmethod
+    def build(cls, trees: Iterable[AbstractNode | None], p: int = 2, q: int = 3) -> NeighborIndex:
+        profiles = [_profile(tree, p, q) for tree in trees]
+        lengths = np.array([len(g) for g, _ in profiles], dtype=np.int64)
+        tree_offsets = np.zeros(len(profiles) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=tree_offsets[1:])
+        tree_grams = np.concatenate([g for g, _ in profiles]) if profiles else np.empty(0, dtype=np.uint64)
+        tree_counts = np.concatenate([c for _, c in profiles]) if profiles else np.empty(0, dtype=np.int32)
+        owners = np.repeat(np.arange(len(profiles), dtype=np.int32), lengths)
+
+        order = np.argsort(tree_grams, kind='stable')
+        gram_keys, starts = np.unique(tree_grams[order], return_index=True)
+        gram_offsets = np.append(starts, len(order)).astype(np.int64)
+        return cls({
+            'sizes': np.array([int(c.sum()) for _, c in profiles], dtype=np.int64),
+            'tree_offsets': tree_offsets,
+            'tree_grams': tree_grams,
+            'tree_counts': tree_counts,
+            'gram_keys': gram_keys,
+            'gram_offsets': gram_offsets,
+            'postings': owners[order],
+            'posting_counts': tree_counts[order],
+            'pq': np.array([p, q], dtype=np.int64),
+        })
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def _candidates(self, grams: np.ndarray, counts: np.ndarray, budget: int, rerank: int) -> np.ndarray:
+        pos = np.minimum(np.searchsorted(self.gram_keys, grams), len(self.gram_keys) - 1)
+        known = self.gram_keys[pos] == grams
+        pos, counts = pos[known], counts[known]
+        if len(pos) == 0:
+            return np.empty(0, dtype=np.int64)
+        df = self.gram_offsets[pos + 1] - self.gram_offsets[pos]
+        rare = np.argsort(df, kind='stable')
+        # the rarest pq-grams within the budget, and always at least one
+        taken = rare[:max(1, int(np.searchsorted(np.cumsum(df[rare]), budget, side='right')))]
+        idx, owner = _ranges(self.gram_offsets[pos[taken]], self.gram_offsets[pos[taken] + 1])
+        trees, inverse = np.unique(self.postings[idx], return_inverse=True)
+        shared = np.bincount(inverse, np.minimum(self.posting_counts[idx], counts[taken][owner]))
+        return trees[np.argsort(-shared, kind='stable')[:rerank]]
+
+    def _distances(self, grams: np.ndarray, counts: np.ndarray, trees: np.ndarray) -> np.ndarray:
+        idx, owner = _ranges(self.tree_offsets[trees], self.tree_offsets[trees + 1])
+        tree_grams = self.tree_grams[idx]
+        pos = np.minimum(np.searchsorted(grams, tree_grams), len(grams) - 1)
+        match = grams[pos] == tree_grams
+        shared = np.bincount(owner[match], np.minimum(counts[pos], self.tree_counts[idx])[match], len(trees))
+        return 1 - 2 * shared / (counts.sum() + self.sizes[trees])
+
+    def nearest(self, trees: list[AbstractNode], k: int = 1, budget: int = 1 << 16,
+                rerank: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Positions and pq-gram distances of the `k` nearest training trees of every query tree, as `(B, k)`
+        arrays ordered by distance, padded with -1 and `inf` where fewer than `k` trees share a pq-gram.
+        """
+        rerank = rerank or max(32, 4 * k)
+        ids = np.full((len(trees), k), -1, dtype=np.int64)
+        distances = np.full((len(trees), k), np.inf)
+        for b, tree in enumerate(trees):
+            grams, counts = _profile(tree, self.p, self.q)
+            if len(grams) == 0 or len(self.gram_keys) == 0:
+                continue
+            candidates = self._candidates(grams, counts, budget, rerank)
+            if len(candidates) == 0:
+                continue
+            d = self._distances(grams, counts, candidates)
+            best = np.argsort(d, kind='stable')[:k]
+            ids[b, :len(best)] = candidates[best]
+            distances[b, :len(best)] = d[best]
+        return ids, distances
+
+    @classmethod
+    def from_parsed(cls, parsed: Iterable[tuple[list[int], AbstractNode | None]],
+                    tokenizer: ProgramTokenizer) -> NeighborIndex:
+        """The index of the parsed programs; `tokenizer` is not used, the pq-grams only need the trees."""
+        return cls.build(program for _, program in parsed)
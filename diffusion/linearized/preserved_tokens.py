@@ -5,4 +5,15 @@ class PreservedTokens:
 
     @classmethod
     def all(cls):
-        return [cls.PAD, cls.MASK, cls.EOS]
\ No newline at end of file
+        return [cls.PAD, cls.MASK, cls.EOS]
+
+class SpellingTokens:
+    """Boundary markers around the characters of a spelled terminal, see `ProgramTokenizer`."""
+    NUMBER = "<NUM>"
+    NUMBER_END = "</NUM>"
+    IDENTIFIER = "<ID>"
+    IDENTIFIER_END = "</ID>"
+
+    @classmethod
+    def all(cls):
+        return [cls.NUMBER, cls.NUMBER_END, cls.IDENTIFIER, cls.IDENTIFIER_END]
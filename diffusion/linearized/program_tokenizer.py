@@ -1,32 +1,143 @@
-from diffusion.linearized.preserved_tokens import PreservedTokens
+from __future__ import annotations
+
+from itertools import chain
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from diffusion.dumb import DumbTerminalGenerator
+from diffusion.linearized.preserved_tokens import PreservedTokens, SpellingTokens
+from mast import Terminal
+from mast.grammar import Grammar, TERMINAL_PATTERNS, terminal_token
+
+if TYPE_CHECKING:
+    import torch
+
+# terminals whose tokens are spelled character by character, with their boundary markers
+SPELLED_TERMINALS: dict[Terminal, tuple[str, str]] = {
+    Terminal.NUMBER: (SpellingTokens.NUMBER, SpellingTokens.NUMBER_END),
+    Terminal.IDENTIFIER: (SpellingTokens.IDENTIFIER, SpellingTokens.IDENTIFIER_END),
+}
 
 
 class ProgramTokenizer:
-    def __init__(self, vocab: list[str], max_len: int) -> None:
+    """
+    Maps program tokens to IDs. By default every distinct token is a vocabulary entry.
+
+    Given `keywords`, the tokenizer spells instead: keywords stay whole, while number and identifier tokens are
+    written as their characters between boundary markers, e.g. `x1 + 42` as
+    `<ID> x 1 </ID> + <NUM> 4 2 </NUM>`. The vocabulary then only holds keywords, markers and characters, so
+    its size no longer grows with the range of terminal values. `decode` and `decode_batch` join spelled
+    terminals back, so decoded programs are the same in both modes.
+    """
+    def __init__(self, vocab: list[str], max_len: int, keywords: list[str] | None = None) -> None:
         self.vocab = vocab
         self.vocab_size = len(self.vocab)
         self.token_to_index = {w: i for i, w in enumerate(self.vocab)}
         self.index_to_token = {i: w for i, w in enumerate(self.vocab)}
         self.max_len = max_len
-        print(f'Total tokens: {self.vocab_size}, Max program length: {self.max_len}')
+        self.eos_id = self.token_to_index[PreservedTokens.EOS]
+        self.pad_id = self.token_to_index[PreservedTokens.PAD]
+        self._vocab_array = np.array(self.vocab, dtype=object)
+        self.keywords = keywords
+        self.spelled = keywords is not None
+        self._keyword_set = set(keywords or ())
+        self._ends = {start: end for start, end in SPELLED_TERMINALS.values()}
+        self.characters = set(self.vocab) - self._keyword_set - set(PreservedTokens.all()) - set(SpellingTokens.all())
+
+    @staticmethod
+    def keywords_of(grammar: Grammar) -> list[str]:
+        """The tokens kept whole when spelling programs of a grammar: its keywords and boolean literals."""
+        keywords = set(grammar.keywords)
+        if any(grammar.is_terminal(t) and t.get_terminal_type() == Terminal.BOOLEAN for t in grammar.node_types):
+            keywords.update(terminal_token(Terminal.BOOLEAN, v) for v in (False, True))
+        return sorted(keywords)
+
+    @staticmethod
+    def _spell(tokens: list[str], keywords: set[str]) -> list[str]:
+        spelled = []
+        for token in tokens:
+            if token not in keywords:
+                for terminal, (start, end) in SPELLED_TERMINALS.items():
+                    if TERMINAL_PATTERNS[terminal].fullmatch(token):
+                        spelled.append(start)
+                        spelled.extend(token)
+                        spelled.append(end)
+                        break
+                else:
+                    spelled.append(token)
+            else:
+                spelled.append(token)
+        return spelled
+
+    def spell(self, tokens: list[str]) -> list[str]:
+        return self._spell(tokens, self._keyword_set) if self.spelled else tokens
+
+    def unspell(self, tokens: list[str]) -> list[str]:
+        """Joins spelled terminals back into tokens; malformed spans are left as they are."""
+        if not self.spelled:
+            return tokens
+        result = []
+        i = 0
+        while i < len(tokens):
+            end = self._ends.get(tokens[i])
+            j = i + 1
+            if end is not None:
+                while j < len(tokens) and tokens[j] in self.characters:
+                    j += 1
+                if j < len(tokens) and tokens[j] == end and j > i + 1:
+                    result.append(''.join(tokens[i + 1:j]))
+                    i = j + 1
+                    continue
+                j = i + 1
+            result.append(tokens[i])
+            i = j
+        return result
 
     @classmethod
-    def from_programs(cls, programs: list[list[str]]) -> ProgramTokenizer:
+    def from_programs(cls, programs: list[list[str]], keywords: list[str] | None = None) -> ProgramTokenizer:
+        if keywords is not None:
+            programs = [cls._spell(program, set(keywords)) for program in programs]
         unique_tokens: set[str] = set()
         for program in programs:
             unique_tokens.update(program)
+        if keywords is not None:
+            unique_tokens.update(keywords)
+            unique_tokens -= set(SpellingTokens.all())
         sorted_tokens = sorted(unique_tokens)
         preserved_tokens: list[str] = PreservedTokens.all()
+        if keywords is not None:
+            preserved_tokens += SpellingTokens.all()
         vocab = preserved_tokens + sorted_tokens
-        max_length = max(len(program) for program in programs) + 1  # +1 for <EOS>
-        return cls(vocab, max_length)
+        max_length = max((len(program) for program in programs), default=0) + 1  # +1 for <EOS>
+        return cls(vocab, max_length, keywords)
 
     @classmethod
-    def from_vocab(cls, vocab: list[str], max_len: int) -> ProgramTokenizer:
-        return cls(vocab, max_len)
+    def from_language(cls, grammar: Grammar, tg: DumbTerminalGenerator, max_len: int, spelled: bool = False) -> ProgramTokenizer:
+        """
+        The closed vocabulary of every program `tg` can fill the grammar with: its keywords plus the token of every
+        terminal value, or with `spelled` the characters of those tokens. It is sorted like `from_programs`, so
+        tokenizers of one grammar and generator share IDs whatever data they are used on. `max_len` includes
+        `<EOS>`, and counts spelled characters and markers.
+        """
+        terminals = {t.get_terminal_type() for t in grammar.node_types if grammar.is_terminal(t)}
+        if spelled:
+            keywords = cls.keywords_of(grammar)
+            tokens = set(keywords)
+            for terminal in terminals & set(SPELLED_TERMINALS):
+                tokens.update(tg.characters(terminal))
+            return cls(PreservedTokens.all() + SpellingTokens.all() + sorted(tokens), max_len, keywords)
+        tokens = set(grammar.keywords)
+        for terminal in terminals:
+            tokens.update(terminal_token(terminal, v) for v in tg.values(terminal))
+        return cls(PreservedTokens.all() + sorted(tokens), max_len)
+
+    @classmethod
+    def from_vocab(cls, vocab: list[str], max_len: int, keywords: list[str] | None = None) -> ProgramTokenizer:
+        return cls(vocab, max_len, keywords)
 
     def encode(self, p: list[str]) -> list[int]:
-        ids = [self.token_to_index[token] for token in p]
+        ids = [self.token_to_index[token] for token in self.spell(p)]
         ids.append(self.token_to_index[PreservedTokens.EOS])
         if len(ids) < self.max_len:
             ids += [self.token_to_index[PreservedTokens.PAD]] * (self.max_len - len(ids))
@@ -35,4 +146,44 @@ class ProgramTokenizer:
     def decode(self, ids: list[int]) -> list[str]:
         # eos_pos = ids.index(self.token_to_index[PreservedTokens.EOS])
         # ids = ids[:eos_pos]
-        return [self.index_to_token[i] for i in ids]
\ No newline at end of file
+        return self.unspell([self.index_to_token[i] for i in ids])
+
+    def encode_batch(self, programs: list[list[str]]) -> np.ndarray:
+        """Encodes many programs into one `(B, max_len)` array, each row followed by `<EOS>` and padded."""
+        if self.spelled:
+            programs = [self.spell(p) for p in programs]
+        lengths = np.fromiter(map(len, programs), dtype=np.int64, count=len(programs))
+        if len(programs) > 0 and lengths.max() >= self.max_len:
+            raise ValueError(f'Program of {lengths.max()} tokens does not fit in max_len {self.max_len}')
+        ids = np.fromiter(
+            map(self.token_to_index.__getitem__, chain.from_iterable(programs)),
+            dtype=np.int64, count=int(lengths.sum())
+        )
+        out = np.full((len(programs), self.max_len), self.pad_id, dtype=np.int64)
+        pos = np.arange(self.max_len)
+        out[pos < lengths[:, None]] = ids
+        out[np.arange(len(programs)), lengths] = self.eos_id
+        return out
+
+    def decode_batch(self, x: torch.Tensor | np.ndarray, trim: bool = True, join: bool = False) -> list[list[str]] | list[str]:
+        """
+        Decodes a `(B, L)` batch of IDs. With `trim`, every row is cut at its first `<EOS>` and stripped of
+        `<PAD>`; with `join`, rows are returned as space separated source strings.
+        """
+        if not isinstance(x, np.ndarray):
+            x = x.cpu().numpy()
+        if not trim:
+            rows = self._vocab_array[x].tolist()
+        else:
+            L = x.shape[1]
+            is_eos = x == self.eos_id
+            eos_pos = np.where(is_eos.any(axis=1), is_eos.argmax(axis=1), L)
+            keep = (np.arange(L) < eos_pos[:, None]) & (x != self.pad_id)
+            tokens = self._vocab_array[x[keep]].tolist()
+            ends = np.cumsum(keep.sum(axis=1)).tolist()
+            rows = [tokens[start:end] for start, end in zip([0] + ends[:-1], ends)]
+        if self.spelled:
+            rows = [self.unspell(row) for row in rows]
+        if join:
+            return [' '.join(row) for row in rows]
+        return rows
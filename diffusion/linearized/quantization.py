@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import time
+
+import torch
+from torch import nn
+
+from diffusion.linearized.diffusion_transformer import DiffusionTransformer, FusedDiffusionTransformer
+from diffusion.linearized.inference import generate_ids
+from diffusion.linearized.program_tokenizer import ProgramTokenizer
+from diffusion.linearized.token_parser import TokenParser
+from mast.grammar import Grammar
+from mast.stats import StatsCollector, StatsSummary
+
+
+def quantize_int8(model: DiffusionTransformer) -> DiffusionTransformer:
+    """
+    Copy of a model with the `nn.Linear` layers of the encoder and the head dynamically quantized to int8, for
+    CPU inference. Those of a `FusedDiffusionTransformer` include the attention projections; in a
+    `DiffusionTransformer` these stay in fp32, `nn.MultiheadAttention` reads their weights directly.
+    """
+    fused = isinstance(model, FusedDiffusionTransformer)
+    names = ('qkv', 'proj', 'linear1', 'linear2') if fused else ('linear1', 'linear2')
+    layers = {'head'} | {f'transformer.layers.{i}.{n}' for i in range(model.num_layers) for n in names}
+    quantized = torch.ao.quantization.quantize_dynamic(model.cpu().eval(), layers, dtype=torch.qint8)
+    if not fused:
+        for layer in quantized.transformer.layers:
+            # keeps the layers off the fused fast path, which needs the fp32 weights of `linear1` and `linear2`
+            layer.activation_relu_or_gelu = 0
+        # and the rows off nested tensors under a pad mask, which the int8 kernels do not take
+        quantized.transformer.use_nested_tensor = False
+    return quantized
+
+
+def _depth_dist(summary: StatsSummary) -> dict[int, float]:
+    return {d: n / summary.count for d, n in sorted(summary.depth_dist.items())} if summary.count > 0 else {}
+
+
+def compare_quantized(
+        model: nn.Module,
+        quantized: nn.Module,
+        tokenizer: ProgramTokenizer,
+        grammar: Grammar,
+        steps: int = 20,
+        batch_size: int = 100,
+        temperature: float = 1.0,
+        seed: int = 0
+) -> dict:
+    """
+    Samples a batch from an fp32 model and its quantized copy on the CPU, from the same seed, and reports the
+    parse rate, depth distribution and generation time of both, with the drop in parse rate and the total
+    variation distance between the depth distributions.
+    """
+    device = torch.device('cpu')
+    parser = TokenParser(grammar, tokenizer)
+    collector = StatsCollector()
+    logs = {}
+    for name, m in (('fp32', model), ('int8', quantized)):
+        torch.manual_seed(seed)
+        start = time.perf_counter()
+        x = generate_ids(m.to(device), tokenizer, device, temperature=temperature, steps=steps, batch_size=batch_size)
+        seconds = time.perf_counter() - start
+        summary = StatsSummary()
+        for program in parser.parse_batch(x):
+            if program is None:
+                summary.add_failure()
+            else:
+                summary.add(collector.collect(program))
+        logs[name] = {
+            'parse_rate': summary.parse_rate(),
+            'avg_depth': summary.avg_depth(),
+            'depth_dist': _depth_dist(summary),
+            'seconds': seconds
+        }
+    fp32, int8 = logs['fp32']['depth_dist'], logs['int8']['depth_dist']
+    logs['parse_rate_drop'] = logs['fp32']['parse_rate'] - logs['int8']['parse_rate']
+    logs['depth_tv_distance'] = sum(abs(fp32.get(d, 0) - int8.get(d, 0)) for d in fp32.keys() | int8.keys()) / 2
+    logs['speedup'] = logs['fp32']['seconds'] / logs['int8']['seconds']
+    return logs
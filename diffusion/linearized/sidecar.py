@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+import numpy as np
+
+from mast.grammar import Grammar
+from mast.node import AbstractNode
+
+if TYPE_CHECKING:
+    from torch import Tensor
+    from diffusion.linearized.program_tokenizer import ProgramTokenizer
+
+
+def parse_rows(rows: Iterable[Tensor], tokenizer: ProgramTokenizer,
+               grammar: Grammar) -> Iterator[tuple[list[int], AbstractNode | None]]:
+    """The IDs of every row with the program parsed from them, `None` where they do not parse."""
+    from diffusion.linearized.token_parser import TokenParser
+    tp = TokenParser(grammar, tokenizer)
+    for row in rows:
+        ids = row.tolist()
+        try:
+            yield ids, tp.parse(ids)
+        except SyntaxError:
+            yield ids, None
+
+
+class DatasetSidecar(ABC):
+    """
+    Per-sample arrays of a dataset, saved next to its checkpoint as `.npy` files in one directory named after it
+    with `suffix`, and memory-mapped on load. Subclasses list the arrays in `_arrays`; the last one is written
+    last and marks a complete sidecar.
+    """
+    _arrays: tuple[str, ...] = ()
+    suffix = ''
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        for name in self._arrays:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    @abstractmethod
+    def from_parsed(cls, parsed: Iterable[tuple[list[int], AbstractNode | None]],
+                    tokenizer: ProgramTokenizer) -> DatasetSidecar:
+        """Built from the rows of a dataset with their parsed programs, as `parse_rows` yields them."""
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for name in self._arrays:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str) -> DatasetSidecar:
+        return cls({name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in cls._arrays})
+
+    @classmethod
+    def path_for(cls, dataset_path: str) -> str:
+        return os.path.splitext(dataset_path)[0] + cls.suffix
+
+    @classmethod
+    def exists_for(cls, dataset_path: str) -> bool:
+        done = os.path.join(cls.path_for(dataset_path), f'{cls._arrays[-1]}.npy')
+        return os.path.exists(done) and os.path.getmtime(done) >= os.path.getmtime(dataset_path)
+
+    @classmethod
+    def for_dataset(cls, dataset_path: str, grammar: Grammar) -> DatasetSidecar:
+        """The sidecar of a dataset checkpoint, built and saved next to it unless an up-to-date one is there."""
+        path = cls.path_for(dataset_path)
+        if cls.exists_for(dataset_path):
+            return cls.load(path)
+        from diffusion.linearized.linearized_dataset import LinearizedDataset
+        ds = LinearizedDataset.from_checkpoint(dataset_path)
+        cls.from_parsed(parse_rows(ds.samples, ds.tokenizer, grammar), ds.tokenizer).save(path)
+        return cls.load(path)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from typing import Type, Any
+
+import torch
+
+from diffusion.linearized.preserved_tokens import PreservedTokens
+from diffusion.linearized.program_tokenizer import ProgramTokenizer, SPELLED_TERMINALS
+from diffusion.linearized.validity import StructureValidator
+from mast.grammar import Grammar, Symbol, TERMINAL_PATTERNS, terminal_value
+from mast.node import ConcreteNode, MaskedNode
+
+
+class _Reject(Exception):
+    def __init__(self, pos: int):
+        super().__init__()
+        self.pos = pos
+
+
+class TokenParser:
+    """
+    Builds mast trees straight from rows of token IDs, without decoding them to source and going through
+    tree-sitter. The parse is driven by tables derived from a `Grammar`: every vocabulary ID is mapped to a
+    grammar symbol once, and every slot gets a symbol-indexed table of the node types it can start with plus
+    a table of its infix operators, which are parsed by precedence climbing.
+
+    With a spelling tokenizer, spelled terminals are joined into single symbols before the parse.
+    """
+    def __init__(self, grammar: Grammar, tokenizer: ProgramTokenizer):
+        self.grammar = grammar
+        self.tokenizer = tokenizer
+        self.eos_id = tokenizer.token_to_index[PreservedTokens.EOS]
+        self.pad_id = tokenizer.token_to_index[PreservedTokens.PAD]
+        self.validator = StructureValidator(tokenizer, grammar)
+
+        self._symbols: list[Symbol | None] = [
+            grammar.symbol(t) if not tokenizer.spelled or t in tokenizer.keywords else None for t in tokenizer.vocab
+        ]
+        self._values: list[Any] = [
+            terminal_value(s, t) if s is not None and not isinstance(s, str) else None
+            for s, t in zip(self._symbols, tokenizer.vocab)
+        ]
+        # start marker ID -> (terminal, end marker ID), and the IDs of characters, for spelling tokenizers
+        self._spelled: dict[int, tuple[Any, int]] = {}
+        self._chars: set[int] = set()
+        if tokenizer.spelled:
+            self._spelled = {
+                tokenizer.token_to_index[start]: (terminal, tokenizer.token_to_index[end])
+                for terminal, (start, end) in SPELLED_TERMINALS.items()
+            }
+            self._chars = {tokenizer.token_to_index[c] for c in tokenizer.characters}
+
+        self._prefix: dict[Type[MaskedNode], dict[Symbol, list[Type[ConcreteNode]]]] = {}
+        self._infix: dict[Type[MaskedNode], dict[str, Type[ConcreteNode]]] = {}
+        for t in grammar.node_types:
+            if not grammar.is_templated(t):
+                continue
+            for e in t.get_token_template():
+                if isinstance(e, list):
+                    e = e[0]
+                if not isinstance(e, str):
+                    self._compile_slot(e)
+
+    def _compile_slot(self, slot: Type[MaskedNode]):
+        if slot in self._prefix:
+            return
+        prefix: dict[Symbol, list[Type[ConcreteNode]]] = {}
+        infix: dict[str, Type[ConcreteNode]] = {}
+        for alt in self.grammar.alternatives(slot):
+            if self.grammar.is_templated(alt):
+                template = alt.get_token_template()
+                if len(template) > 1 and template[0] is slot and isinstance(template[1], str):
+                    infix[template[1]] = alt
+                    continue
+            for s in self.grammar.first(alt):
+                prefix.setdefault(s, []).append(alt)
+        self._prefix[slot] = prefix
+        self._infix[slot] = infix
+
+    def _length(self, ids: list[int]) -> int:
+        try:
+            n = ids.index(self.eos_id)
+        except ValueError:
+            raise SyntaxError(f'Missing {PreservedTokens.EOS} in {len(ids)} tokens')
+        for i in range(n + 1, len(ids)):
+            if ids[i] != self.pad_id:
+                raise SyntaxError(f'Unexpected token "{self.tokenizer.vocab[ids[i]]}" after {PreservedTokens.EOS} at position {i}')
+        return n
+
+    def _lex(self, ids: list[int], n: int) -> tuple[list[Symbol | None], list[Any], list[int]]:
+        """Symbols and terminal values of the first `n` IDs, and the position in `ids` each one starts at."""
+        if not self._spelled:
+            return [self._symbols[i] for i in ids[:n]], [self._values[i] for i in ids[:n]], list(range(n))
+        symbols, values, positions = [], [], []
+        i = 0
+        while i < n:
+            positions.append(i)
+            spelled = self._spelled.get(ids[i])
+            if spelled is None:
+                symbols.append(self._symbols[ids[i]])
+                values.append(self._values[ids[i]])
+                i += 1
+                continue
+            terminal, end = spelled
+            j = i + 1
+            while j < n and ids[j] in self._chars:
+                j += 1
+            text = ''.join(self.tokenizer.vocab[c] for c in ids[i + 1:j])
+            if j < n and ids[j] == end and TERMINAL_PATTERNS[terminal].fullmatch(text) and text not in self.tokenizer.keywords:
+                symbols.append(terminal)
+                values.append(terminal_value(terminal, text))
+                i = j + 1
+            else:
+                symbols.append(None)
+                values.append(None)
+                i += 1
+        return symbols, values, positions
+
+    def parse(self, ids: list[int]) -> ConcreteNode:
+        """Parse one encoded program, raising `SyntaxError` at the first token that cannot be read."""
+        n = self._length(ids)
+        symbols, values, positions = self._lex(ids, n)
+        run = _Run(self, symbols, values)
+        try:
+            root, pos = run.node(self.grammar.root_type, 0)
+            if pos != len(symbols):
+                raise _Reject(pos)
+        except _Reject as e:
+            pos = max(e.pos, run.furthest)
+            pos = positions[pos] if pos < len(positions) else n
+            token = self.tokenizer.vocab[ids[pos]] if pos < len(ids) else PreservedTokens.EOS
+            raise SyntaxError(f'Unexpected token "{token}" at position {pos}') from None
+        return root
+
+    def parse_batch(self, x: torch.Tensor) -> list[ConcreteNode | None]:
+        """
+        Parse every row of a `(B, L)` tensor of token IDs; rows that do not parse become `None`.
+        Rows failing the structural checks of the validator are rejected without being parsed.
+        """
+        valid, _, _ = self.validator(x)
+        programs: list[ConcreteNode | None] = []
+        for ids, plausible in zip(x.tolist(), valid.tolist()):
+            if not plausible:
+                programs.append(None)
+                continue
+            try:
+                programs.append(self.parse(ids))
+            except SyntaxError:
+                programs.append(None)
+        return programs
+
+
+class _Run:
+    def __init__(self, parser: TokenParser, symbols: list[Symbol | None], values: list[Any]):
+        self.p = parser
+        self.symbols = symbols
+        self.values = values
+        self.n = len(symbols)
+        self.furthest = 0
+        # packrat memo of slot parses, keeps the backtracking between alternatives linear
+        self.memo: dict[tuple[Type[MaskedNode], int, int], tuple[ConcreteNode, int] | _Reject] = {}
+
+    def _symbol(self, pos: int) -> Symbol | None:
+        return self.symbols[pos] if pos < self.n else None
+
+    def _reject(self, pos: int) -> _Reject:
+        self.furthest = max(self.furthest, pos)
+        return _Reject(pos)
+
+    def slot(self, slot: Type[MaskedNode], pos: int, min_prec: int = 0) -> tuple[ConcreteNode, int]:
+        key = (slot, pos, min_prec)
+        if key not in self.memo:
+            try:
+                self.memo[key] = self._slot(slot, pos, min_prec)
+            except _Reject as e:
+                self.memo[key] = e
+        result = self.memo[key]
+        if isinstance(result, _Reject):
+            raise result
+        return result
+
+    def _slot(self, slot: Type[MaskedNode], pos: int, min_prec: int) -> tuple[ConcreteNode, int]:
+        candidates = self.p._prefix[slot].get(self._symbol(pos))
+        if not candidates:
+            raise self._reject(pos)
+        rejected = None
+        for node_type in candidates:
+            try:
+                node, pos = self.node(node_type, pos)
+                break
+            except _Reject as e:
+                rejected = e
+        else:
+            raise rejected
+
+        infix = self.p._infix[slot]
+        while pos < self.n:
+            node_type = infix.get(self._symbol(pos))
+            if node_type is None or node_type.get_precedence() < min_prec:
+                break
+            template = node_type.get_token_template()
+            args, pos = self.elements(template[2:], pos + 1, node_type.get_precedence() + 1)
+            node = node_type(node, *args)
+        return node, pos
+
+    def node(self, node_type: Type[ConcreteNode], pos: int) -> tuple[ConcreteNode, int]:
+        if not self.p.grammar.is_templated(node_type):
+            if self._symbol(pos) != node_type.get_terminal_type():
+                raise self._reject(pos)
+            return node_type(self.values[pos]), pos + 1
+        args, pos = self.elements(node_type.get_token_template(), pos)
+        return node_type(*args), pos
+
+    def elements(self, template: list, pos: int, min_prec: int = 0) -> tuple[list[Any], int]:
+        args: list[Any] = []
+        for e in template:
+            if isinstance(e, str):
+                if self._symbol(pos) != e:
+                    raise self._reject(pos)
+                pos += 1
+            elif isinstance(e, list):
+                items = []
+                first = self.p.grammar.first(e)
+                while self._symbol(pos) in first:
+                    item, pos = self.slot(e[0], pos)
+                    items.append(item)
+                args.append(items)
+            else:
+                node, pos = self.slot(e, pos, min_prec)
+                args.append(node)
+        return args, pos
@@ -6,66 +6,158 @@ import torch
 from torch import nn, optim
 from torch.utils.data import DataLoader
 
+from diffusion import tracing
 from diffusion.linearized import LinearizedDataset, DiffusionTransformer, StructuredDiffusionLoss
+from diffusion.linearized.diffusion_transformer import padding_mask
+from diffusion.linearized.metadata import StratifiedBatchSampler
 from diffusion.linearized.io import load_model_checkpoint_for_training, save_model_checkpoint
 from diffusion.linearized.preserved_tokens import PreservedTokens
 from diffusion.linearized.program_tokenizer import ProgramTokenizer
 
 
-def train_one_batch(
-        model: nn.Module,
-        batch_tokens: torch.Tensor,
-        tokenizer: ProgramTokenizer,
-        structure_loss: StructuredDiffusionLoss,
-        optimizer: optim.Optimizer,
-        device: torch.device
-) -> float:
-    model.train()
-
-    x_start = batch_tokens.to(device)
-    B, L = x_start.shape
-
+def _sample_mask(B: int, L: int, device: torch.device) -> tuple[torch.Tensor, torch.Tensor]:
     # 1. random sampling mask ratio: t ~ Uniform(0, 1)
     t = torch.rand(B, 1, device=device)
 
     # 2. generate mask matrix
     # mask where probability < t
     rand_matrix = torch.rand(B, L, device=device)
-    mask_indices = rand_matrix < t
+    return t, rand_matrix < t
+
 
+def _batch_loss(
+        model: nn.Module,
+        x_start: torch.Tensor,
+        t: torch.Tensor,
+        mask_indices: torch.Tensor,
+        tokenizer: ProgramTokenizer,
+        structure_loss: StructuredDiffusionLoss,
+        masked: torch.Tensor,
+        share: float = 1.0
+) -> torch.Tensor:
+    """
+    The loss of rows that are a `share` of a batch with `masked` masked positions in all: the cross-entropy
+    summed over their masked positions and divided by `masked`, plus their structure loss times `share`, so
+    the losses of the slices of a batch add up to the loss of the whole batch.
+    """
     # 3. construct noisy input
     mask_tid = tokenizer.token_to_index[PreservedTokens.MASK]
+    pad_tid = tokenizer.token_to_index[PreservedTokens.PAD]
+    eos_tid = tokenizer.token_to_index[PreservedTokens.EOS]
     x_noisy = x_start.clone()
     x_noisy[mask_indices] = mask_tid
 
-    # 5. forward
-    logits = model(x_noisy, t, pad_mask=None)
+    # 5. forward, without the padding left unmasked past the first of a row
+    with tracing.span('train/forward'):
+        logits = model(x_noisy, t, pad_mask=padding_mask(x_noisy, pad_tid))
 
-    # 6. compute loss where masked
-    loss_fct = nn.CrossEntropyLoss(reduction='none')
-    # flatten dimensions for loss computation
-    ce_loss_raw = loss_fct(logits.view(-1, model.head.out_features), x_start.view(-1))
-    ce_loss_raw = ce_loss_raw.view(B, L)
+    # 6. compute loss where masked, only there, which leaves out every position under the pad mask
+    with tracing.span('train/loss'):
+        loss_fct = nn.CrossEntropyLoss(reduction='none')
+        target = x_start[mask_indices]
+        ce_loss_raw = loss_fct(logits[mask_indices], target)
 
-    pad_tid = tokenizer.token_to_index[PreservedTokens.PAD]
-    eos_tid = tokenizer.token_to_index[PreservedTokens.EOS]
-    weights = torch.ones_like(ce_loss_raw)
-    weights[x_start == eos_tid] = 0.2
-    weights[x_start == pad_tid] = 0.2
-    ce_loss_raw = ce_loss_raw * weights
+        weights = torch.ones_like(ce_loss_raw)
+        weights[target == eos_tid] = 0.2
+        weights[target == pad_tid] = 0.2
+        ce_loss_raw = ce_loss_raw * weights
+
+        # average loss over the masked positions of the whole batch
+        masked_ce_loss = ce_loss_raw.sum() / (masked + 1e-6)
 
-    # average loss only on masked positions
-    masked_ce_loss = (ce_loss_raw * mask_indices.float()).sum() / (mask_indices.sum() + 1e-6)
+        struct_loss = structure_loss(logits)
 
-    struct_loss = structure_loss(logits)
+        return masked_ce_loss + struct_loss * share
 
-    total_loss = masked_ce_loss + struct_loss
+
+def train_one_batch(
+        model: nn.Module,
+        batch_tokens: torch.Tensor,
+        tokenizer: ProgramTokenizer,
+        structure_loss: StructuredDiffusionLoss,
+        optimizer: optim.Optimizer,
+        device: torch.device,
+        micro_batch_size: int | None = None
+) -> float:
+    """
+    One optimizer step on a batch. With `micro_batch_size`, the batch is run in slices of that many rows whose
+    gradients are accumulated, so only a slice is in memory at once. The mask is drawn for the whole batch and
+    every slice is weighted by its share of the masked positions and of the rows, so the gradient is that of
+    the whole batch, up to dropout.
+    """
+    model.train()
+
+    with tracing.span('train/to_device'):
+        x_start = batch_tokens.to(device)
+    B, L = x_start.shape
+    step = micro_batch_size or B
+    t, mask_indices = _sample_mask(B, L, device)
+    masked = mask_indices.sum()
 
     optimizer.zero_grad()
-    total_loss.backward()
-    optimizer.step()
+    total_loss = 0.0
+    for i in range(0, B, step):
+        rows = slice(i, i + step)
+        x = x_start[rows]
+        loss = _batch_loss(model, x, t[rows], mask_indices[rows], tokenizer, structure_loss, masked, x.size(0) / B)
+        with tracing.span('train/backward'):
+            loss.backward()
+        total_loss += loss.item()
+    with tracing.span('train/optimizer'):
+        optimizer.step()
+
+    return total_loss
+
+
+def probe_batch_size(
+        model: nn.Module,
+        tokenizer: ProgramTokenizer,
+        structure_loss: StructuredDiffusionLoss,
+        device: torch.device,
+        budget: int,
+        reserved: int = 0,
+        limit: int = 1 << 16
+) -> int:
+    """
+    The largest batch of `max_len` rows, up to `limit`, whose forward and backward fit in `budget` bytes of
+    device memory next to `reserved` bytes set aside for state not allocated yet, such as that of the
+    optimizer. Grows the batch by doubling, then bisects. Gradients are left zeroed.
+    """
+    if device.type == 'cpu':
+        raise ValueError('Probing the batch size needs an accelerator to measure memory on, got the CPU')
+    # rows without padding, none of which the pad mask leaves out
+    mask_id = tokenizer.token_to_index[PreservedTokens.MASK]
+    model.train()
 
-    return total_loss.item()
+    def fits(batch_size: int) -> bool:
+        model.zero_grad(set_to_none=True)
+        torch.accelerator.memory.empty_cache()
+        torch.accelerator.memory.reset_peak_memory_stats(device)
+        x = torch.full((batch_size, tokenizer.max_len), mask_id, dtype=torch.long, device=device)
+        try:
+            t, mask_indices = _sample_mask(batch_size, tokenizer.max_len, device)
+            _batch_loss(model, x, t, mask_indices, tokenizer, structure_loss, mask_indices.sum()).backward()
+            torch.accelerator.synchronize(device)
+        except torch.OutOfMemoryError:
+            return False
+        finally:
+            model.zero_grad(set_to_none=True)
+        return torch.accelerator.memory.max_memory_allocated(device) + reserved <= budget
+
+    low, high = 0, 1
+    while high <= limit and fits(high):
+        low, high = high, high * 2
+    high = min(high, limit + 1)
+    while high - low > 1:
+        mid = (low + high) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid
+    torch.accelerator.memory.empty_cache()
+    if low == 0:
+        raise ValueError(f'Not even a batch of one row fits in {budget} bytes')
+    return low
 
 
 def train(
@@ -75,9 +167,18 @@ def train(
         structure_loss: StructuredDiffusionLoss,
         device: torch.device,
         epochs: int, batch_size: int,
-        model_checkpoint_path: str
+        model_checkpoint_path: str,
+        micro_batch_size: int | None = None,
+        batch_sampler: StratifiedBatchSampler | None = None
 ) -> None:
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    """
+    With `micro_batch_size`, gradients of each batch are accumulated over slices, see `train_one_batch`.
+    With `batch_sampler`, batches come from it, told the epoch before each one, instead of shuffling.
+    """
+    if batch_sampler is not None:
+        dataloader = DataLoader(dataset, batch_sampler=batch_sampler)
+    else:
+        dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
 
     start_epoch = 0
 
@@ -86,17 +187,24 @@ def train(
         start_epoch = loaded_epoch
 
     for epoch in range(start_epoch, epochs):
+        if batch_sampler is not None:
+            batch_sampler.set_epoch(epoch)
         total_loss = 0
-        for b_id, batch in enumerate(dataloader):
-            loss = train_one_batch(model, batch, dataset.tokenizer, structure_loss, optimizer, device)
+        for b_id, batch in enumerate(tracing.iterate(dataloader, 'train/fetch')):
+            with tracing.span('train/batch', epoch=epoch, batch=b_id):
+                loss = train_one_batch(model, batch, dataset.tokenizer, structure_loss, optimizer, device, micro_batch_size)
             total_loss += loss
+            tracing.count('train/samples', batch.size(0))
+            tracing.emit('train/batch', epoch=epoch, batch=b_id, loss=loss)
             if b_id % 10 == 0:
                 print(f"Epoch {epoch + 1} | Batch {b_id} | Loss: {loss:.4f}")
         avg_loss = total_loss / len(dataloader)
         print(f"\n======== Epoch {epoch + 1} completed. Average Loss: {avg_loss:.4f}\n")
+        tracing.emit('train/epoch', epoch=epoch, avg_loss=avg_loss)
 
         # Save checkpoint
         if (epoch + 1) % 5 == 0:
-            save_model_checkpoint(model, optimizer, dataset.tokenizer, epoch, model_checkpoint_path + f'x{epoch + 1}ep')
+            with tracing.span('train/checkpoint'):
+                save_model_checkpoint(model, optimizer, dataset.tokenizer, epoch, model_checkpoint_path + f'x{epoch + 1}ep')
 
     save_model_checkpoint(model, optimizer, dataset.tokenizer, epochs, model_checkpoint_path + f'x{epochs}ep_final')
\ No newline at end of file
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from enum import IntFlag
+
+import torch
+
+from diffusion.linearized.preserved_tokens import PreservedTokens
+from diffusion.linearized.program_tokenizer import ProgramTokenizer, SPELLED_TERMINALS
+from mast.grammar import Grammar, Symbol
+
+# grammar symbol of the characters of spelled terminals
+_CHAR = '<char>'
+
+
+class Violation(IntFlag):
+    NONE = 0
+    NO_EOS = 1
+    TOKEN_AFTER_EOS = 2
+    INVALID_TOKEN = 4
+    UNBALANCED = 8
+    ADJACENCY = 16
+
+
+class StructureValidator:
+    """
+    Cheap necessary conditions for a row of token IDs to be a program, checked for a whole `(B, L)` batch at
+    once on the device the batch lives on:
+
+    - the row has an `<EOS>` and nothing but `<PAD>` after it;
+    - no preserved or unknown token appears before `<EOS>`;
+    - every bracket pair of the grammar is balanced (depth by cumsum, never negative, zero at the end);
+    - every pair of adjacent symbols, including the row boundaries, can be adjacent in the grammar.
+
+    Without a grammar only the first two checks are made.
+
+    With a spelling tokenizer, a start marker stands for its terminal, the end marker takes the terminal's
+    place on the right, characters may only appear between the two, and every marker pair counts as a
+    bracket pair.
+    """
+    def __init__(self, tokenizer: ProgramTokenizer, grammar: Grammar | None = None):
+        self.tokenizer = tokenizer
+        self.grammar = grammar
+        self.eos_id = tokenizer.token_to_index[PreservedTokens.EOS]
+        self.pad_id = tokenizer.token_to_index[PreservedTokens.PAD]
+
+        # categories: 0 = invalid, 1 = beginning of row, 2 = <EOS>, then one per grammar symbol
+        invalid, bos, eos = 0, 1, 2
+        if grammar is not None:
+            symbols = [self._symbol(t) for t in tokenizer.vocab]
+        else:
+            symbols = [None if t in PreservedTokens.all() else t for t in tokenizer.vocab]
+        index = {s: i + 3 for i, s in enumerate(dict.fromkeys(s for s in symbols if s is not None))}
+        category = [index.get(s, invalid) for s in symbols]
+        category[self.eos_id] = eos
+        self.bos_category = bos
+        self.eos_category = eos
+        self.category = torch.tensor(category, dtype=torch.long)
+
+        if grammar is None:
+            self.adjacency = None
+            self.brackets = None
+            return
+
+        # the symbol a terminal is followed by on its right, which is its end marker when it is spelled
+        tail: dict[Symbol, Symbol] = {t: end for t, (_, end) in SPELLED_TERMINALS.items()} if tokenizer.spelled else {}
+        adjacency = torch.zeros(len(index) + 3, len(index) + 3, dtype=torch.bool)
+        for a, b in grammar.bigrams():
+            a = tail.get(a, a)
+            if a in index and b in index:
+                adjacency[index[a], index[b]] = True
+        for s in grammar.first(grammar.root_type):
+            if s in index:
+                adjacency[bos, index[s]] = True
+        for s in grammar.last(grammar.root_type):
+            s = tail.get(s, s)
+            if s in index:
+                adjacency[index[s], eos] = True
+        if _CHAR in index:
+            adjacency[index[_CHAR], index[_CHAR]] = True
+            for start, end in tail.items():
+                if start in index and end in index:
+                    adjacency[index[start], index[_CHAR]] = True
+                    adjacency[index[_CHAR], index[end]] = True
+        self.adjacency = adjacency
+
+        pairs = sorted({
+            (template[0], template[-1])
+            for template in (t.get_token_template() for t in grammar.node_types if grammar.is_templated(t))
+            if len(template) > 1 and isinstance(template[0], str) and isinstance(template[-1], str)
+        } | (set(SPELLED_TERMINALS.values()) if tokenizer.spelled else set()))
+        brackets = torch.zeros(tokenizer.vocab_size, max(len(pairs), 1), dtype=torch.long)
+        for k, (o, c) in enumerate(pairs):
+            if o in tokenizer.token_to_index:
+                brackets[tokenizer.token_to_index[o], k] = 1
+            if c in tokenizer.token_to_index:
+                brackets[tokenizer.token_to_index[c], k] = -1
+        self.brackets = brackets
+
+    def _symbol(self, token: str) -> Symbol | None:
+        if not self.tokenizer.spelled:
+            return self.grammar.symbol(token)
+        for terminal, (start, end) in SPELLED_TERMINALS.items():
+            if token == start:
+                return terminal
+            if token == end:
+                return end
+        if token in self.tokenizer.keywords:
+            return self.grammar.symbol(token)
+        if token in PreservedTokens.all():
+            return None
+        return _CHAR
+
+    def _tables_to(self, device: torch.device):
+        if self.category.device != device:
+            self.category = self.category.to(device)
+            if self.adjacency is not None:
+                self.adjacency = self.adjacency.to(device)
+                self.brackets = self.brackets.to(device)
+
+    @torch.no_grad()
+    def __call__(self, x: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Returns the validity mask `(B,)`, the `Violation` flags of every row `(B,)` and the position of the
+        first `<EOS>` of every row `(B,)`, which is `L` for rows without one.
+        """
+        self._tables_to(x.device)
+        B, L = x.shape
+        pos = torch.arange(L, device=x.device).unsqueeze(0)
+
+        is_eos = x == self.eos_id
+        has_eos = is_eos.any(dim=1)
+        eos_pos = torch.where(has_eos, is_eos.int().argmax(dim=1), torch.full_like(has_eos, L, dtype=torch.long))
+        body = pos < eos_pos.unsqueeze(1)
+        tail = pos > eos_pos.unsqueeze(1)
+
+        reasons = torch.zeros(B, dtype=torch.long, device=x.device)
+        reasons |= (~has_eos).long() * Violation.NO_EOS
+        reasons |= (tail & (x != self.pad_id)).any(dim=1).long() * Violation.TOKEN_AFTER_EOS
+
+        category = self.category[x]
+        reasons |= (body & (category == 0)).any(dim=1).long() * Violation.INVALID_TOKEN
+
+        if self.adjacency is not None:
+            depth = torch.cumsum(self.brackets[x] * body.unsqueeze(-1), dim=1)
+            unbalanced = (depth < 0).any(dim=2).any(dim=1) | (depth[:, -1, :] != 0).any(dim=1)
+            reasons |= unbalanced.long() * Violation.UNBALANCED
+
+            category = torch.where(body, category, self.eos_category)
+            category = torch.cat([torch.full((B, 1), self.bos_category, device=x.device, dtype=torch.long), category], dim=1)
+            allowed = self.adjacency[category[:, :-1], category[:, 1:]]
+            checked = pos <= eos_pos.unsqueeze(1)
+            reasons |= (checked & ~allowed).any(dim=1).long() * Violation.ADJACENCY
+
+        return reasons == 0, reasons, eos_pos
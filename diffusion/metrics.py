@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from diffusion.sketches import HyperLogLog, Histogram, fingerprint
+from mast.node import AbstractNode
+from mast.stats import TreeStats
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class StreamingMetrics:
+    """
+    Diversity, depth and length metrics of a stream of parsed programs, complementing `StatsSummary`.
+
+    With no `error`, diversity is exact and keeps the source of every distinct program; with an `error`,
+    distinct programs are counted by a `HyperLogLog` of at most that relative standard error, as far as its
+    precision goes, over their token fingerprints, in memory independent of the number of programs; the logs
+    report the error of the sketch. Depths and lengths go to histograms of width 1 up to `max_depth` and
+    `max_len`, which are exact within those bounds. Metrics of workers merge when they were built with the
+    same parameters.
+    """
+    def __init__(self, error: float | None = None, max_depth: int = 1024, max_len: int = 1 << 16):
+        self.error = error
+        self._sources: set[str] | None = set() if error is None else None
+        self._distinct: HyperLogLog | None = HyperLogLog.for_error(error) if error is not None else None
+        self.depth = Histogram(0, 1, max_depth)
+        self.length = Histogram(0, 1, max_len)
+
+    def add(self, program: AbstractNode, stats: TreeStats):
+        if self._sources is not None:
+            self._sources.add(program.to_source())
+        else:
+            self._distinct.add(fingerprint(program.to_tokens()))
+        self.depth.add(stats.depth)
+        self.length.add(stats.length)
+
+    def merge(self, other: StreamingMetrics):
+        if self._sources is not None:
+            self._sources |= other._sources
+        else:
+            self._distinct.merge(other._distinct)
+        self.depth.merge(other.depth)
+        self.length.merge(other.length)
+
+    def distinct(self) -> int:
+        return len(self._sources) if self._sources is not None else self._distinct.count()
+
+    def diversity(self) -> float:
+        return self.distinct() / self.depth.count if self.depth.count > 0 else 0
+
+    def logs(self) -> dict:
+        logs = {'distinct': self.distinct()}
+        if self.error is not None:
+            # that of the sketch, which can be coarser than the `error` asked for
+            logs['distinct_error'] = self._distinct.error()
+        for name, histogram in (('depth', self.depth), ('len', self.length)):
+            logs[f'{name}_quantiles'] = {f'p{round(q * 100)}': histogram.quantile(q) for q in QUANTILES}
+            logs[f'max_{name}'] = histogram.max if histogram.count > 0 else 0
+        return logs
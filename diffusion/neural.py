@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import math
+from typing import Type, Any
+
+import torch
+from torch import nn
+
+from diffusion import tracing
+from diffusion.decorruptor import Decorruptor
+from diffusion.linearized.diffusion_transformer import padding_mask
+from diffusion.linearized.preserved_tokens import PreservedTokens
+from diffusion.linearized.program_tokenizer import ProgramTokenizer, SPELLED_TERMINALS
+from diffusion.terminal_generator import TerminalGenerator
+from mast import TransitionKernels as TK
+from mast import Terminal
+from mast.grammar import Grammar, Symbol, terminal_value
+from mast.node import AbstractNode, ConcreteNode, MaskedNode
+
+
+class NeuralDecorruptor(Decorruptor):
+    """
+    Decorrupts masked trees with a linearized diffusion model, many trees at a time.
+
+    Every step linearizes each unfinished tree, where a masked node is a single `<MASK>` token, and runs one
+    batched forward over all of them. The logits at the position of a masked node are read as the model's
+    guess for the first token of its subtree: a `mask_down` picks between the descendant mask types by the
+    probability of the tokens they can start with, and a terminal is unmasked to one of the vocabulary
+    tokens of its type. All open masked nodes of all trees are decided from the same forward, so a tree is
+    finished in as many steps as it is deep, and it is grammatical by construction.
+
+    Masked nodes deeper than `max_depth`, or in trees longer than the model's `max_len`, are only masked
+    down to the types that finish the tree soonest. With a spelling tokenizer the model does not see the
+    characters of a terminal at its mask, so terminal values come from `tg` instead.
+    """
+    def __init__(
+            self,
+            model: nn.Module,
+            tokenizer: ProgramTokenizer,
+            grammar: Grammar,
+            device: torch.device,
+            tg: TerminalGenerator | None = None,
+            temperature: float = 1.0,
+            max_depth: int | None = None
+    ):
+        if tokenizer.spelled and tg is None:
+            raise ValueError('A terminal generator is required with a spelling tokenizer.')
+        self.model = model
+        self.tokenizer = tokenizer
+        self.grammar = grammar
+        self.device = device
+        self.tg = tg
+        self.temperature = temperature
+        self.max_depth = max_depth
+        self.mask_id = tokenizer.token_to_index[PreservedTokens.MASK]
+        self.pad_id = tokenizer.token_to_index[PreservedTokens.PAD]
+
+        # grammar symbol -> IDs of the tokens it is read from
+        self._symbol_ids: dict[Symbol, list[int]] = {}
+        for i, t in enumerate(tokenizer.vocab):
+            s = grammar.symbol(t) if not tokenizer.spelled or t in tokenizer.keywords else None
+            if s is not None:
+                self._symbol_ids.setdefault(s, []).append(i)
+        if tokenizer.spelled:
+            for terminal, (start, _) in SPELLED_TERMINALS.items():
+                self._symbol_ids[terminal] = [tokenizer.token_to_index[start]]
+
+        self._height: dict[type, float] = {}
+        self._solve_heights()
+        # masked type -> its descendant mask types, a (C, V) log-membership of the tokens each can start with,
+        # and a (C,) mask of those finishing the tree soonest
+        self._choices: dict[Type[MaskedNode], tuple[list[Type[MaskedNode]], torch.Tensor, torch.Tensor]] = {}
+        # terminal type -> token IDs of its values and the values
+        self._values: dict[Terminal, tuple[torch.Tensor, list[Any]]] = {}
+
+    def _masked_types(self) -> set[Type[MaskedNode]]:
+        types = set[Type[MaskedNode]]()
+        pending = [e[0] if isinstance(e, list) else e for t in self.grammar.node_types if self.grammar.is_templated(t)
+                   for e in t.get_token_template() if not isinstance(e, str)]
+        while pending:
+            m = pending.pop()
+            if m in types:
+                continue
+            types.add(m)
+            if hasattr(m, 'get_descendant_mask_types'):
+                pending.extend(m.get_descendant_mask_types())
+        return types
+
+    def _solve_heights(self):
+        # least number of levels a subtree of every masked and concrete type can be finished in
+        masked = self._masked_types()
+        height = {t: math.inf for t in list(masked) + self.grammar.node_types}
+        changed = True
+        while changed:
+            changed = False
+            for t in self.grammar.node_types:
+                if self.grammar.is_templated(t):
+                    slots = [height[e] for e in t.get_token_template() if not isinstance(e, (str, list))]
+                    h = 1 + max(slots, default=0)
+                else:
+                    h = 1
+                if h < height[t]:
+                    height[t] = h
+                    changed = True
+            for m in masked:
+                if hasattr(m, 'get_descendant_mask_types'):
+                    h = min(height[d] for d in m.get_descendant_mask_types())
+                else:
+                    h = height[m.unmask_target()]
+                if h < height[m]:
+                    height[m] = h
+                    changed = True
+        self._height = height
+
+    def _choices_of(self, mask_type: Type[MaskedNode]) -> tuple[list[Type[MaskedNode]], torch.Tensor, torch.Tensor]:
+        if mask_type not in self._choices:
+            descendants = sorted(mask_type.get_descendant_mask_types(), key=lambda d: d.__name__)
+            member = torch.full((len(descendants), self.tokenizer.vocab_size), -math.inf)
+            for c, d in enumerate(descendants):
+                for s in self.grammar.first(d):
+                    member[c, self._symbol_ids.get(s, [])] = 0
+            lowest = min(self._height[d] for d in descendants)
+            closing = torch.tensor([self._height[d] == lowest for d in descendants])
+            self._choices[mask_type] = (descendants, member.to(self.device), closing.to(self.device))
+        return self._choices[mask_type]
+
+    def _values_of(self, terminal: Terminal) -> tuple[torch.Tensor, list[Any]]:
+        if terminal not in self._values:
+            ids = self._symbol_ids.get(terminal, [])
+            if not ids:
+                raise ValueError(f'No token of the vocabulary is a {terminal}.')
+            values = [terminal_value(terminal, self.tokenizer.vocab[i]) for i in ids]
+            self._values[terminal] = (torch.tensor(ids, device=self.device), values)
+        return self._values[terminal]
+
+    @staticmethod
+    def _frontier(tree: AbstractNode, depth: int, frontier: list[tuple[MaskedNode, int]]):
+        # masked nodes in the order their `<MASK>` tokens appear in `to_tokens`
+        if isinstance(tree, MaskedNode):
+            frontier.append((tree, depth))
+            return
+        for _, c in tree.enumerate_nodes():
+            NeuralDecorruptor._frontier(c, depth + 1, frontier)
+
+    def _sample(self, scores: torch.Tensor) -> list[int]:
+        probs = torch.softmax(scores / self.temperature, dim=-1)
+        return torch.multinomial(probs, num_samples=1).squeeze(1).tolist()
+
+    def decorrupt(self, tree: AbstractNode):
+        self.decorrupt_batch([tree])
+
+    @torch.no_grad()
+    def decorrupt_batch(self, trees: list[AbstractNode]):
+        """Decorrupts, in place, every masked node of the trees the given ones are attached to."""
+        for tree in trees:
+            if not isinstance(tree, MaskedNode):
+                raise ValueError(f'Expected an instance of MaskedNode, got {type(tree)}')
+        self.model.eval()
+        L = self.tokenizer.max_len
+        # the top of every tree, at the depth that puts the given masked node at depth 1
+        roots: dict[int, tuple[AbstractNode, int]] = {}
+        for tree in trees:
+            root, depth = tree, 1
+            while root.parent is not None:
+                root, depth = root.parent, depth - 1
+            roots[id(root)] = (root, depth)
+
+        step = 0
+        while True:
+            frontiers: list[list[tuple[MaskedNode, int]]] = []
+            rows: list[list[int]] = []
+            for root, depth in roots.values():
+                frontier: list[tuple[MaskedNode, int]] = []
+                self._frontier(root, depth, frontier)
+                if not frontier:
+                    continue
+                frontiers.append(frontier)
+                rows.append(self.tokenizer.encode(root.to_tokens())[:L])
+            if not frontiers:
+                break
+
+            with tracing.span('decorrupt/step', step=step, trees=len(rows)):
+                with tracing.span('decorrupt/forward'):
+                    positions = [[p for p, i in enumerate(ids) if i == self.mask_id] for ids in rows]
+                    x = torch.tensor(rows, device=self.device)
+                    t = (x == self.mask_id).float().mean(dim=1, keepdim=True)
+                    log_probs = torch.log_softmax(self.model(x, t, pad_mask=padding_mask(x, self.pad_id)), dim=-1)
+
+                with tracing.span('decorrupt/apply'):
+                    nodes: list[tuple[MaskedNode, torch.Tensor, bool]] = []
+                    for r, (frontier, pos) in enumerate(zip(frontiers, positions)):
+                        for k, (node, depth) in enumerate(frontier):
+                            # masks cut off past `max_len` read the last position and are closed
+                            closing = k >= len(pos) or (self.max_depth is not None and depth >= self.max_depth)
+                            nodes.append((node, log_probs[r, pos[min(k, len(pos) - 1)] if pos else L - 1], closing))
+                    self._apply(nodes)
+            tracing.count('decorrupt/nodes', sum(len(f) for f in frontiers))
+            step += 1
+
+    def _apply(self, nodes: list[tuple[MaskedNode, torch.Tensor, bool]]):
+        # mask down in rounds until every node can be unmasked, a round scores all nodes of one type at once
+        while True:
+            groups: dict[type, list[int]] = {}
+            for n, (node, _, _) in enumerate(nodes):
+                if TK.MASK_DOWN in node.get_supported_transition_kernels():
+                    groups.setdefault(type(node), []).append(n)
+            if not groups:
+                break
+            for mask_type, members in groups.items():
+                descendants, member, closing = self._choices_of(mask_type)
+                lp = torch.stack([nodes[n][1] for n in members])
+                scores = torch.logsumexp(lp.unsqueeze(1) + member.unsqueeze(0), dim=-1)
+                closed = torch.tensor([nodes[n][2] for n in members], device=scores.device).unsqueeze(1)
+                # when the vocabulary has no token of any descendant, they are all equally likely
+                scores = torch.where(torch.isinf(scores).all(dim=1, keepdim=True), torch.zeros_like(scores), scores)
+                scores = scores.masked_fill(closed & ~closing.unsqueeze(0), -math.inf)
+                for n, c in zip(members, self._sample(scores)):
+                    node, lp_n, closed_n = nodes[n]
+                    nodes[n] = (node.mask_down(descendants[c]), lp_n, closed_n)
+
+        terminals: dict[Terminal, list[int]] = {}
+        for n, (node, _, _) in enumerate(nodes):
+            if TK.UNMASK not in node.get_supported_transition_kernels():
+                raise ValueError(f'Node type {node.get_type_name()} supports neither UNMASK nor MASK_DOWN.')
+            concrete_type: Type[ConcreteNode] = type(node).unmask_target()
+            if hasattr(concrete_type, 'create_empty'):
+                node.unmask(concrete_type.create_empty())
+            elif hasattr(concrete_type, 'get_terminal_type'):
+                terminals.setdefault(concrete_type.get_terminal_type(), []).append(n)
+            else:
+                raise TypeError(f'Cannot unmask node of type {node.get_type_name()} to {concrete_type.get_type_name()}: Concrete node is neither a terminal nor non-terminal.')
+
+        for terminal, members in terminals.items():
+            if self.tokenizer.spelled:
+                chosen = [self.tg.generate(None, terminal) for _ in members]
+            else:
+                ids, values = self._values_of(terminal)
+                lp = torch.stack([nodes[n][1] for n in members])
+                chosen = [values[c] for c in self._sample(lp[:, ids])]
+            for n, value in zip(members, chosen):
+                node = nodes[n][0]
+                node.unmask(type(node).unmask_target()(value))
+
+    def generate(self, batch_size: int) -> list[ConcreteNode]:
+        """Decorrupts `batch_size` programs from the root type of the grammar with all of its slots masked."""
+        programs = []
+        for _ in range(batch_size):
+            template = self.grammar.root_type.get_token_template()
+            programs.append(self.grammar.root_type(*[[] if isinstance(e, list) else e() for e in template if not isinstance(e, str)]))
+        self.decorrupt_batch([node for p in programs for _, node in p.enumerate_nodes() if isinstance(node, MaskedNode)])
+        return programs
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import sys
+
+_MASK = (1 << 64) - 1
+
+
+def fingerprint(tokens: list[str]) -> int:
+    """64-bit fingerprint of a token sequence."""
+    return int.from_bytes(hashlib.blake2b('\x00'.join(tokens).encode(), digest_size=8).digest(), 'little')
+
+
+def _mix(h: int) -> int:
+    # splitmix64 finalizer
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK
+    return h ^ (h >> 31)
+
+
+class ExactSet:
+    """Set of fingerprints with the interface of `BloomFilter`; exact up to 64-bit collisions, memory grows with it."""
+    def __init__(self):
+        self._keys: set[int] = set()
+
+    def add(self, key: int) -> bool:
+        """Adds a key, telling whether it was already there."""
+        if key in self._keys:
+            return True
+        self._keys.add(key)
+        return False
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._keys
+
+    def nbytes(self) -> int:
+        # the hash table of the set and an int object per key, 60 to 90 bytes per key in all
+        return sys.getsizeof(self._keys) + sum(sys.getsizeof(k) for k in self._keys)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over 64-bit keys, sized for `capacity` keys at a false positive rate of `error`.
+    Probe positions are derived from the key by double hashing. Memory stays at the size chosen up front;
+    past `capacity` keys the false positive rate climbs above `error`.
+    """
+    def __init__(self, capacity: int, error: float = 1e-3):
+        capacity = max(1, capacity)
+        self.bits = max(64, math.ceil(-capacity * math.log(error) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._bytes = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key: int) -> list[int]:
+        h1 = key & _MASK
+        h2 = _mix(h1) | 1
+        return [((h1 + i * h2) & _MASK) % self.bits for i in range(self.hashes)]
+
+    def add(self, key: int) -> bool:
+        """Adds a key, telling whether it was (probably) already there."""
+        present = True
+        data = self._bytes
+        for p in self._positions(key):
+            byte, bit = p >> 3, 1 << (p & 7)
+            if not data[byte] & bit:
+                present = False
+                data[byte] |= bit
+        return present
+
+    def __contains__(self, key: int) -> bool:
+        data = self._bytes
+        return all(data[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def nbytes(self) -> int:
+        return len(self._bytes)
+
+
+class HyperLogLog:
+    """
+    Distinct count of 64-bit keys in `2 ** precision` one-byte registers, with a relative standard error of
+    about `1.04 / sqrt(2 ** precision)`; `for_error` picks the precision for a target error. Sketches of the
+    same precision merge into the sketch of the union of their keys.
+    """
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f'Precision must be between 4 and 18, got {precision}')
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @classmethod
+    def for_error(cls, error: float) -> HyperLogLog:
+        """The smallest sketch with at most `error`, or the largest one for errors below about 0.0020."""
+        return cls(min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2)))))
+
+    def error(self) -> float:
+        """The relative standard error of the count."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, key: int):
+        h = _mix(key & _MASK)
+        rest_bits = 64 - self.precision
+        index = h >> rest_bits
+        rank = rest_bits - (h & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: HyperLogLog):
+        if other.precision != self.precision:
+            raise ValueError(f'Cannot merge sketches of precision {self.precision} and {other.precision}')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros > 0:
+            # linear counting is the better estimate while many registers are empty
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def nbytes(self) -> int:
+        return len(self.registers)
+
+
+class Histogram:
+    """
+    Counts of values in `buckets` buckets of `width` starting at `low`, with values past either end counted
+    apart, and their exact count, sum, minimum and maximum. Memory is fixed by the layout; with a width of 1
+    and integer values inside the range the distribution is exact. Histograms of the same layout merge.
+    """
+    def __init__(self, low: float = 0, width: float = 1, buckets: int = 1024):
+        self.low = low
+        self.width = width
+        self.counts = [0] * buckets
+        self.underflow = 0
+        self.overflow = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        bucket = math.floor((value - self.low) / self.width)
+        if bucket < 0:
+            self.underflow += 1
+        elif bucket >= len(self.counts):
+            self.overflow += 1
+        else:
+            self.counts[bucket] += 1
+
+    def merge(self, other: Histogram):
+        if (other.low, other.width, len(other.counts)) != (self.low, self.width, len(self.counts)):
+            raise ValueError('Cannot merge histograms of different bucket layouts')
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0
+
+    def quantile(self, q: float) -> float:
+        """The lower edge of the bucket holding the `q`-quantile, clamped to the observed range."""
+        if self.count == 0:
+            return 0
+        rank = q * (self.count - 1)
+        seen = self.underflow
+        if rank < seen:
+            return self.min
+        for i, n in enumerate(self.counts):
+            seen += n
+            if rank < seen:
+                return min(max(self.low + i * self.width, self.min), self.max)
+        return self.max
+
+    def dist(self) -> dict[float, int]:
+        """Bucket lower edges to counts, for the non-empty buckets."""
+        return {self.low + i * self.width: n for i, n in enumerate(self.counts) if n > 0}
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Iterator
+
+_CHUNK = 1 << 20
+
+# device of this worker process, see `run_jobs`
+_device: str | None = None
+
+
+def _hash_file(path: str, h):
+    with open(path, 'rb') as f:
+        while chunk := f.read(_CHUNK):
+            h.update(chunk)
+
+
+class ResultCache:
+    """
+    Results of assessments on disk, one JSON file per result, keyed by the content hash of the checkpoint
+    and the parameters of the assessment; renaming or touching a checkpoint keeps its results, changing
+    its bytes does not. Content hashes are remembered by path, size and modification time, so a checkpoint
+    is only read again after it changed.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._hashes_path = os.path.join(root, 'hashes.json')
+        self._hashes: dict[str, list] = {}
+        if os.path.exists(self._hashes_path):
+            with open(self._hashes_path) as f:
+                self._hashes = json.load(f)
+
+    def content_hash(self, path: str) -> str:
+        """Hash of the bytes of a file, or of the names and bytes of the files under a directory."""
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(d, n) for d, _, names in os.walk(path) for n in names
+        )
+        stamp = [[os.path.relpath(p, path), os.path.getsize(p), os.stat(p).st_mtime_ns] for p in files]
+        known = self._hashes.get(os.path.abspath(path))
+        if known is not None and known[0] == stamp:
+            return known[1]
+        h = hashlib.blake2b(digest_size=16)
+        for p in files:
+            h.update(os.path.relpath(p, path).encode() + b'\x00')
+            _hash_file(p, h)
+        self._hashes[os.path.abspath(path)] = [stamp, h.hexdigest()]
+        self._write(self._hashes_path, self._hashes)
+        return h.hexdigest()
+
+    @staticmethod
+    def key(content_hash: str, params: dict[str, Any]) -> str:
+        return hashlib.blake2b(
+            json.dumps([content_hash, params], sort_keys=True).encode(), digest_size=16
+        ).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f'{key}.json')
+
+    @staticmethod
+    def _write(path: str, value: Any):
+        # written aside and renamed, a sweep killed mid-write leaves no truncated result behind
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(json.dumps(value, indent=4))
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> dict | None:
+        if not os.path.exists(self._path(key)):
+            return None
+        with open(self._path(key)) as f:
+            return json.load(f)
+
+    def put(self, key: str, result: dict):
+        self._write(self._path(key), result)
+
+
+def _init_worker(devices):
+    global _device
+    _device = devices.get()
+
+
+def _run(fn: Callable[[Any, str], Any], job: Any) -> Any:
+    return fn(job, _device)
+
+
+def run_jobs(
+        fn: Callable[[Any, str], Any],
+        jobs: list,
+        devices: list[str],
+        workers_per_device: int = 1
+) -> Iterator[tuple[Any, Any]]:
+    """
+    Runs `fn(job, device)` for every job and yields `(job, result)` pairs as they complete. Jobs are spread
+    over `workers_per_device` processes per device, each process bound to one device; with a single worker
+    they run in this process, in order. `fn` and the jobs must be picklable.
+    """
+    workers = len(devices) * workers_per_device
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield job, fn(job, devices[0])
+        return
+    # spawned rather than forked, CUDA cannot be initialized again in a forked child
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        queue = manager.Queue()
+        for _ in range(workers_per_device):
+            for device in devices:
+                queue.put(device)
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(queue,)) as pool:
+            futures = {pool.submit(_run, fn, job): job for job in jobs}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Iterable, Iterator, TextIO, TypeVar, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import torch
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+# end of an iterator in `iterate`, an object no iterable can yield
+_END = object()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer: Tracer, name: str, args: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.tracer._sync()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *_):
+        self.tracer._sync()
+        self.tracer._record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Tracer:
+    """
+    Collects timed spans and counters of one run.
+
+    Spans are written as complete events of a Chrome trace (open it in `chrome://tracing` or Perfetto) when the
+    tracer is closed. Metrics are appended to a JSONL stream as they are emitted; on close a last `summary`
+    record with per-span totals and counter values is written, so two runs can be compared line by line.
+
+    CUDA kernels run asynchronously, so with a CUDA `device` the device is synchronized at both ends of every
+    span. This makes the spans honest at the price of some overlap, and is why tracing is off by default.
+    """
+    def __init__(self, trace_path: str | None = None, metrics_path: str | None = None,
+                 device: torch.device | None = None):
+        self.trace_path = trace_path
+        self.device = device if device is not None and device.type == 'cuda' else None
+        self.metrics: TextIO | None = open(metrics_path, 'w') if metrics_path is not None else None
+        self.events: list[dict] = []
+        self.totals: dict[str, list[int]] = {}
+        self.counters: dict[str, float] = {}
+        self.pid = os.getpid()
+        self.origin = time.perf_counter_ns()
+
+    def _sync(self):
+        if self.device is not None:
+            import torch
+            torch.cuda.synchronize(self.device)
+
+    def _record(self, name: str, start: int, end: int, args: dict[str, Any]):
+        total = self.totals.setdefault(name, [0, 0])
+        total[0] += 1
+        total[1] += end - start
+        if self.trace_path is not None:
+            event = {
+                'name': name, 'ph': 'X', 'pid': self.pid, 'tid': threading.get_ident(),
+                'ts': (start - self.origin) / 1000, 'dur': (end - start) / 1000
+            }
+            if args:
+                event['args'] = args
+            self.events.append(event)
+
+    def span(self, name: str, **args) -> _Span:
+        return _Span(self, name, args)
+
+    def count(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+        if self.trace_path is not None:
+            self.events.append({
+                'name': name, 'ph': 'C', 'pid': self.pid,
+                'ts': (time.perf_counter_ns() - self.origin) / 1000, 'args': {'value': self.counters[name]}
+            })
+
+    def emit(self, kind: str, **fields):
+        if self.metrics is not None:
+            self.metrics.write(json.dumps({'kind': kind, **fields}) + '\n')
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            'spans': {
+                name: {'count': n, 'total_s': ns / 1e9, 'mean_ms': ns / n / 1e6}
+                for name, (n, ns) in sorted(self.totals.items())
+            },
+            'counters': dict(sorted(self.counters.items()))
+        }
+
+    def close(self):
+        if self.metrics is not None:
+            self.emit('summary', **self.summary())
+            self.metrics.close()
+            self.metrics = None
+        if self.trace_path is not None:
+            with open(self.trace_path, 'w') as f:
+                json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+# the active tracer; the functions below are no-ops while it is None
+_tracer: Tracer | None = None
+
+
+def enable(trace_path: str | None = None, metrics_path: str | None = None,
+           device: torch.device | None = None) -> Tracer:
+    global _tracer
+    disable()
+    _tracer = Tracer(trace_path, metrics_path, device)
+    return _tracer
+
+
+def disable():
+    """Closes the active tracer, writing its trace and summary."""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **args) -> _Span | _NullSpan:
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, **args)
+
+
+def count(name: str, value: float = 1):
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def emit(kind: str, **fields):
+    if _tracer is not None:
+        _tracer.emit(kind, **fields)
+
+
+T = TypeVar('T')
+def iterate(iterable: Iterable[T], name: str) -> Iterator[T]:
+    """Iterates `iterable`, timing every `next` as a span, e.g. to see how long a data loader takes."""
+    if _tracer is None:
+        yield from iterable
+        return
+    it = iter(iterable)
+    while True:
+        with span(name):
+            item = next(it, _END)
+        if item is _END:
+            return
+        yield item
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import random
+from typing import Any, Iterable, Type
+
+from diffusion.dumb import DumbTerminalGenerator
+from mast.grammar import Grammar
+from mast.node import ConcreteNode, MaskedNode
+
+# a slot as the token parser reads it: the slot, the least precedence of an infix node it is read as, the token
+# that follows it if one does, and whether it is read by a parse of its own rather than as the left operand an
+# infix loop has already read
+Slot = tuple[Type[MaskedNode], int, str | None, bool]
+# a node type with the token that follows it, which the slots at its end inherit
+State = tuple[type, str | None]
+# a template element that holds children: a slot, or a list of slots
+Element = Slot | list
+
+
+class UniformSampler:
+    """
+    Samples programs uniformly at random among all programs of a given depth or size, without rejection.
+
+    The number of trees every node type roots is counted per depth (of at most `d`) and per size (of exactly
+    `n` nodes) by dynamic programming over the templates of the grammar, whose slots are unmasked to the
+    concrete types the `mask_down` hierarchy leads to. A tree is then sampled top down, picking every node
+    type and every split of the remaining depth or size between the children with probability proportional
+    to the number of trees it leaves, so every tree is equally likely; a terminal counts once per value the
+    terminal generator can give it. Depth and size follow `StatsCollector`: the root does not count.
+
+    Only trees that `TokenParser` reads back from their tokens are counted, so every program as written is
+    one tree and the draw is uniform over programs as written. A slot is read by precedence climbing: the
+    left operand of an infix node takes no infix node of lower precedence, the right one none of the same or
+    lower, and a slot followed by an infix operator of its own may not end in a slot left open, as `! a`
+    before `&&` does. Trees the parser would read differently can only be written with brackets, which are
+    sampled as node types like any other unless excluded.
+
+    Counts are exact integers and grow with the largest depth or size asked for. By depth, templates with
+    lists of children are unbounded and not supported; by size, they are.
+    """
+    def __init__(self, grammar: Grammar, tg: DumbTerminalGenerator, exclude: Iterable[Type[ConcreteNode]] = (),
+                 rng: random.Random | None = None):
+        self.grammar = grammar
+        self.rng = rng or random.Random()
+        self._excluded = set(exclude)
+        self._values: dict[type, list[Any]] = {
+            t: tg.values(t.get_terminal_type())
+            for t in grammar.node_types if t not in self._excluded and grammar.is_terminal(t)
+        }
+        # slot -> infix operator -> node type, as the token parser tells them apart
+        self._infix: dict[Type[MaskedNode], dict[str, type]] = {}
+        self._root: State = (grammar.root_type, None)
+        # every state below the root a program can reach, with its elements and the alternatives of its slots
+        self._states: list[State] = []
+        self._elements: dict[State, list[Element]] = {}
+        self._alternatives: dict[Slot, list[State]] = {}
+        todo = [self._root]
+        while todo:
+            state = todo.pop()
+            if not grammar.is_templated(state[0]):
+                continue
+            self._elements[state] = self._slots_of(state)
+            for e in self._elements[state]:
+                slot = e[0] if isinstance(e, list) else e
+                if slot in self._alternatives:
+                    continue
+                self._alternatives[slot] = self._states_of(slot)
+                for s in self._alternatives[slot]:
+                    if s not in self._states:
+                        self._states.append(s)
+                        todo.append(s)
+        # state -> number of trees of depth at most d, at index d
+        self._by_depth: dict[State, list[int]] = {s: [] for s in self._states}
+        # state -> number of trees of exactly n nodes, at index n
+        self._by_size: dict[State, list[int]] = {s: [] for s in self._states}
+        # slot -> number of trees it can be unmasked to of exactly n nodes, at index n
+        self._slot_size: dict[Slot, list[int]] = {s: [] for s in self._alternatives}
+        # slot -> number of lists of it of n nodes in total, at index n
+        self._list_size: dict[Slot, list[int]] = {
+            e[0]: [] for es in self._elements.values() for e in es if isinstance(e, list)
+        }
+        # templated state -> for every i, number of ways to fill its elements from the i-th on with n nodes
+        self._suffix_size: dict[State, list[list[int]]] = {
+            s: [[] for _ in es] + [[]] for s, es in self._elements.items()
+        }
+
+    def _infix_of(self, slot: Type[MaskedNode]) -> dict[str, type]:
+        if slot not in self._infix:
+            self._infix[slot] = {
+                t.get_token_template()[1]: t for t in self.grammar.alternatives(slot)
+                if self.grammar.is_templated(t) and len(t.get_token_template()) > 1
+                and t.get_token_template()[0] is slot and isinstance(t.get_token_template()[1], str)
+            }
+        return self._infix[slot]
+
+    def _slots_of(self, state: State) -> list[Element]:
+        t, follow = state
+        template = t.get_token_template()
+        infix = isinstance(template[0], type) and t in self._infix_of(template[0]).values()
+        precedence = t.get_precedence() if infix else 0
+        elements: list[Element] = []
+        for i, e in enumerate(template):
+            if isinstance(e, str):
+                continue
+            if isinstance(e, list):
+                elements.append([(e[0], 0, None, True)])
+            elif infix and i == 0:
+                elements.append((e, precedence, template[1], False))
+            else:
+                after = template[i + 1] if i + 1 < len(template) else follow
+                elements.append((e, precedence + 1 if infix else 0, after if isinstance(after, str) else None, True))
+        return elements
+
+    def _states_of(self, slot: Slot) -> list[State]:
+        s, min_prec, follow, own = slot
+        infix = self._infix_of(s)
+        # a parse of its own would go on past the slot into the operator that follows it
+        if own and follow in infix and infix[follow].get_precedence() >= min_prec:
+            return []
+        # a terminal ends in no slot, the token after it does not matter
+        return [
+            (t, follow if self.grammar.is_templated(t) else None) for t in dict.fromkeys(self.grammar.alternatives(s))
+            if t not in self._excluded and (t not in infix.values() or t.get_precedence() >= min_prec)
+        ]
+
+    def _choose(self, weights: list[int]) -> int:
+        r = self.rng.randrange(sum(weights))
+        for i, w in enumerate(weights):
+            if r < w:
+                return i
+            r -= w
+        raise AssertionError('unreachable')
+
+    # by depth
+
+    def _depth_counts(self, depth: int):
+        for es in self._elements.values():
+            if any(isinstance(e, list) for e in es):
+                raise ValueError('Sampling by depth is unbounded for templates with lists of children, sample by size.')
+        for d in range(len(self._by_depth[self._states[0]]) if self._states else 0, depth + 1):
+            for s in self._states:
+                if s[0] in self._values:
+                    n = len(self._values[s[0]]) if d >= 1 else 0
+                else:
+                    n = 1 if d >= 1 else 0
+                    for e in self._elements[s]:
+                        n *= self._slot_depth(e, d - 1) if d >= 1 else 0
+                self._by_depth[s].append(n)
+
+    def _slot_depth(self, slot: Slot, d: int) -> int:
+        return sum(self._by_depth[s][d] for s in self._alternatives[slot]) if d >= 0 else 0
+
+    def _slot_exact(self, slot: Slot, d: int) -> int:
+        return self._slot_depth(slot, d) - self._slot_depth(slot, d - 1)
+
+    def _root_depth(self, d: int) -> int:
+        n = 1
+        for e in self._elements[self._root]:
+            n *= self._slot_depth(e, d)
+        return n
+
+    def count_by_depth(self, depth: int) -> int:
+        """Number of programs of exactly `depth`."""
+        self._depth_counts(depth)
+        return self._root_depth(depth) - self._root_depth(depth - 1) if depth > 0 else self._root_depth(0)
+
+    def _children_by_depth(self, elements: list[Element], d: int, exact: bool) -> list[ConcreteNode]:
+        # children of depth at most `d`, at least one of exactly `d` when `exact`
+        if not exact or not elements:
+            return [self._node_by_depth(e, d, False) for e in elements]
+        # trees of the elements from the i-th on, of depth at most d and at most d - 1
+        below, lower = [1] * (len(elements) + 1), [1] * (len(elements) + 1)
+        for i in range(len(elements) - 1, -1, -1):
+            below[i] = below[i + 1] * self._slot_depth(elements[i], d)
+            lower[i] = lower[i + 1] * self._slot_depth(elements[i], d - 1)
+        children, hit = [], False
+        for i, e in enumerate(elements):
+            if not hit:
+                hit = self._choose([
+                    self._slot_depth(e, d - 1) * (below[i + 1] - lower[i + 1]),
+                    self._slot_exact(e, d) * below[i + 1]
+                ]) == 1
+                children.append(self._node_by_depth(e, d, hit))
+            else:
+                children.append(self._node_by_depth(e, d, False))
+        return children
+
+    def _node_by_depth(self, slot: Slot, d: int, exact: bool) -> ConcreteNode:
+        alternatives = self._alternatives[slot]
+        weights = [self._by_depth[s][d] - (self._by_depth[s][d - 1] if exact and d > 0 else 0) for s in alternatives]
+        s = alternatives[self._choose(weights)]
+        if s[0] in self._values:
+            return s[0](self.rng.choice(self._values[s[0]]))
+        return s[0](*self._children_by_depth(self._elements[s], d - 1, exact))
+
+    def sample_by_depth(self, min_depth: int, max_depth: int) -> ConcreteNode:
+        """A program drawn uniformly from all programs of a depth between `min_depth` and `max_depth`."""
+        depths = list(range(min_depth, max_depth + 1))
+        weights = [self.count_by_depth(d) for d in depths]
+        if sum(weights) == 0:
+            raise ValueError(f'No program has a depth between {min_depth} and {max_depth}.')
+        d = depths[self._choose(weights)]
+        return self.grammar.root_type(*self._children_by_depth(self._elements[self._root], d, True))
+
+    # by size
+
+    def _element_counts(self, e: Element) -> list[int]:
+        return self._list_size[e[0]] if isinstance(e, list) else self._slot_size[e]
+
+    def _size_counts(self, size: int):
+        for m in range(len(self._by_size[self._states[0]]) if self._states else 0, size + 1):
+            for s in self._states:
+                if s[0] in self._values:
+                    self._by_size[s].append(len(self._values[s[0]]) if m == 1 else 0)
+                else:
+                    self._by_size[s].append(self._suffix_size[s][0][m - 1] if m >= 1 else 0)
+            for slot, alternatives in self._alternatives.items():
+                self._slot_size[slot].append(sum(self._by_size[s][m] for s in alternatives))
+            for slot, items in self._list_size.items():
+                # a list is empty, or a first child of j nodes and a list of the rest
+                single = self._slot_size[slot]
+                items.append(1 if m == 0 else sum(single[j] * items[m - j] for j in range(1, m + 1)))
+            for s, es in self._elements.items():
+                suffix = self._suffix_size[s]
+                suffix[len(es)].append(1 if m == 0 else 0)
+                for i in range(len(es) - 1, -1, -1):
+                    counts = self._element_counts(es[i])
+                    suffix[i].append(sum(counts[j] * suffix[i + 1][m - j] for j in range(m + 1)))
+
+    def count_by_size(self, size: int) -> int:
+        """Number of programs of exactly `size` nodes."""
+        self._size_counts(size)
+        return self._suffix_size[self._root][0][size]
+
+    def _children_by_size(self, state: State, m: int) -> list[Any]:
+        elements, suffix = self._elements[state], self._suffix_size[state]
+        children = []
+        for i, e in enumerate(elements):
+            counts = self._element_counts(e)
+            j = self._choose([counts[j] * suffix[i + 1][m - j] for j in range(m + 1)])
+            if isinstance(e, list):
+                items = []
+                single, rest = self._slot_size[e[0]], self._list_size[e[0]]
+                n = j
+                while n > 0:
+                    k = 1 + self._choose([single[k] * rest[n - k] for k in range(1, n + 1)])
+                    items.append(self._node_by_size(e[0], k))
+                    n -= k
+                children.append(items)
+            else:
+                children.append(self._node_by_size(e, j))
+            m -= j
+        return children
+
+    def _node_by_size(self, slot: Slot, n: int) -> ConcreteNode:
+        alternatives = self._alternatives[slot]
+        s = alternatives[self._choose([self._by_size[s][n] for s in alternatives])]
+        if s[0] in self._values:
+            return s[0](self.rng.choice(self._values[s[0]]))
+        return s[0](*self._children_by_size(s, n - 1))
+
+    def sample_by_size(self, min_size: int, max_size: int) -> ConcreteNode:
+        """A program drawn uniformly from all programs of between `min_size` and `max_size` nodes."""
+        sizes = list(range(min_size, max_size + 1))
+        weights = [self.count_by_size(n) for n in sizes]
+        if sum(weights) == 0:
+            raise ValueError(f'No program has between {min_size} and {max_size} nodes.')
+        n = sizes[self._choose(weights)]
+        return self.grammar.root_type(*self._children_by_size(self._root, n))
@@ -0,0 +1,11 @@
+import argparse
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', type=str, required=True, help='Path to the model checkpoint file')
+    parser.add_argument('--out', type=str, required=True, help='Directory to write the inference-only export to')
+    args = parser.parse_args()
+
+    from diffusion.linearized.io import export_model_for_inference
+
+    export_model_for_inference(args.model, args.out)
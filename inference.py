@@ -1,34 +1,38 @@
 import argparse
 
-import torch
-import diffusion.linearized as dl
-
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--model', type=str, required=True)
     parser.add_argument('--steps', type=int, default=10)
     parser.add_argument('--batch-size', type=int, default=10)
     parser.add_argument('--temperature', type=float, default=1.0)
+    parser.add_argument('--fused', action='store_true', help='Run the model with fused attention')
+    parser.add_argument('--quantize', action='store_true', help='Run a dynamically quantized int8 model on the CPU')
     args = parser.parse_args()
 
-    device = torch.accelerator.current_accelerator()
+    import torch
+    from diffusion.linearized.inference import generate_ids
+    from diffusion.linearized.io import load_model_checkpoint_for_inference
+    from diffusion.linearized.validity import StructureValidator, Violation
+
+    device = torch.device('cpu') if args.quantize else torch.accelerator.current_accelerator()
     print('Using torch device: ', device)
 
-    g = dl.inference(args.model, device, steps=args.steps, batch_size=args.batch_size, temperature=args.temperature)
+    tokenizer, model = load_model_checkpoint_for_inference(args.model, device, quantize=args.quantize, fused=args.fused)
+    x = generate_ids(model, tokenizer, device, steps=args.steps, batch_size=args.batch_size, temperature=args.temperature)
+    _, reasons, eos_pos = StructureValidator(tokenizer)(x)
     valid, othto, noeos = 0, 0, 0
-    for i, prog in enumerate(g):
-        if '<EOS>' in prog:
-            eos_pos = prog.index('<EOS>')
-            pads = set(prog[eos_pos + 1:])
-            if len(pads) == 0 or (len(pads) == 1 and '<PAD>' in pads):
-                comment = ''
-                valid += 1
-            else:
-                comment = f' (Invalid token after EOS: {[t for t in pads if t != "<PAD>"]})'
-                othto += 1
-            prog = prog[:eos_pos]
-        else:
+    for i, (ids, reason, eos) in enumerate(zip(x.tolist(), reasons.tolist(), eos_pos.tolist())):
+        # positions are those of the IDs, so spelled terminals are only joined for printing
+        prog = [tokenizer.index_to_token[t] for t in ids]
+        if reason & Violation.NO_EOS:
             comment = ' (No EOS)'
             noeos += 1
-        print(f"#{i + 1}: {str.join(' ', prog)}{comment}")
-    print(f"Valid: {valid} / Other Tokens: {othto} / No EOS: {noeos}")
\ No newline at end of file
+        elif reason & Violation.TOKEN_AFTER_EOS:
+            comment = f' (Invalid token after EOS: {list({t for t in prog[eos + 1:] if t != "<PAD>"})})'
+            othto += 1
+        else:
+            comment = ''
+            valid += 1
+        print(f"#{i + 1}: {str.join(' ', tokenizer.unspell(prog[:eos]))}{comment}")
+    print(f"Valid: {valid} / Other Tokens: {othto} / No EOS: {noeos}")
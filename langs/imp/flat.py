@@ -0,0 +1,1885 @@
+# Generated from langs.imp by specialize.py, do not edit.
+from __future__ import annotations
+
+from abc import ABC
+from mast.node import AbstractNode
+from abc import abstractmethod
+from typing import Any
+from tree_sitter import Node as TNode
+from mast import Terminal
+from mast.container import LabeledContainer, ChildrenContainer
+from mast.node import ConcreteNode, AbstractNode, RootNode
+from mast.node import MaskedNode
+from uuid import uuid4
+from mast import TransitionKernels as _TK
+
+_ID = AbstractNode.id
+
+
+def _get_id(self):
+    try:
+        return _ID.__get__(self)
+    except AttributeError:
+        _ID.__set__(self, uuid4())
+        return _ID.__get__(self)
+
+
+# `id` of the nodes, a `uuid4` made the first time it is read rather than for every node built
+_lazy_id = property(_get_id, _ID.__set__)
+
+
+
+class ProgramBase(AbstractNode, ABC):
+    __slots__ = ()
+
+
+class AExprBase(AbstractNode, ABC):
+    __slots__ = ()
+
+
+class IdentifierBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class IntLiteralBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class DivExprBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class AddExprBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class BracketedAExprBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class BExprBase(AbstractNode, ABC):
+    __slots__ = ()
+
+
+class BoolLiteralBase(BExprBase, ABC):
+    __slots__ = ()
+
+
+class LeqExprBase(BExprBase, ABC):
+    __slots__ = ()
+
+
+class NotExprBase(BExprBase, ABC):
+    __slots__ = ()
+
+
+class LandExprBase(BExprBase, ABC):
+    __slots__ = ()
+
+
+class BracketedBExprBase(BExprBase, ABC):
+    __slots__ = ()
+
+
+class StmtBase(AbstractNode, ABC):
+    __slots__ = ()
+
+
+class AsnStmtBase(StmtBase, ABC):
+    __slots__ = ()
+
+
+class IfStmtBase(StmtBase, ABC):
+    __slots__ = ()
+
+
+class WhileStmtBase(StmtBase, ABC):
+    __slots__ = ()
+
+
+class BlockBase(StmtBase, ABC):
+    __slots__ = ()
+
+
+class Program(ConcreteNode, RootNode, ProgramBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, body: StmtBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['body'])
+        self.subtrees['body'] = body
+        body.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        body: Stmt | None = Stmt.from_tsn(node.child(0))
+        if body is None:
+            raise SyntaxError('Expected a valid statement')
+        return cls(body)
+
+    def body(self) -> AExpr:
+        return self.subtrees.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return self.body().to_tokens()
+
+    def to_source(self) -> str:
+        return self.body().to_source()
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Program'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'source_file'
+
+    @classmethod
+    def from_tree_sitter(cls, tree):
+        return cls.from_tsn(tree.root_node)
+
+    @classmethod
+    def get_token_template(cls):
+        return _Program_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(AExprMask())
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return set()
+
+
+class AExpr(ConcreteNode, AExprBase):
+    __slots__ = ()
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        for node_type in [IntLiteral, Identifier, DivExpr, AddExpr, BracketedAExpr]:
+            if node.type == node_type.tree_sitter_rule():
+                return node_type.from_tsn(node)
+        raise SyntaxError(f'Unrecognized statement type: {node.type}')
+
+    @abstractmethod
+    def to_source(self) -> str:
+        pass
+
+    @classmethod
+    def get_type_name(cls):
+        return 'A.Expr.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return '_aexpr'
+
+    def mask(self):
+        masked_node = AExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class Identifier(ConcreteNode, IdentifierBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, name: str):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.attributes = LabeledContainer(['name'])
+        self.attributes['name'] = name
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        return cls(node.text.decode('utf-8'))
+
+    def name(self):
+        return self.attributes.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return [self.name()]
+
+    def to_source(self) -> str:
+        return self.name()
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Id'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'id'
+
+    @classmethod
+    def get_terminal_type(cls):
+        return Terminal.IDENTIFIER
+
+    def mask(self):
+        masked_node = IdentifierMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class IntLiteral(ConcreteNode, IntLiteralBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, value: int):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.attributes = LabeledContainer(['value'])
+        self.attributes['value'] = value
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        return cls(int(node.text))
+
+    def value(self):
+        return self.attributes.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return [str(self.value())]
+
+    def to_source(self) -> str:
+        return str(self.value())
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Int'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'int'
+
+    @classmethod
+    def get_terminal_type(cls):
+        return Terminal.NUMBER
+
+    def mask(self):
+        masked_node = IntLiteralMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class DivExpr(ConcreteNode, DivExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, left: AExprBase, right: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['left', 'right'])
+        self.subtrees['left'] = left
+        self.subtrees['right'] = right
+        left.parent = self
+        right.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        left: AExpr | None = AExpr.from_tsn(node.child(0))
+        right: AExpr | None = AExpr.from_tsn(node.child(2))
+        if left is None or right is None:
+            raise SyntaxError('Expected 2 valid arithmatic expressions')
+        return cls(left, right)
+
+    def left(self):
+        return self.subtrees.items[0]
+
+    def right(self):
+        return self.subtrees.items[1]
+
+    def to_tokens(self) -> list[str]:
+        return self.left().to_tokens() + ['/'] + self.right().to_tokens()
+
+    def to_source(self) -> str:
+        return f'{self.left().to_source()} / {self.right().to_source()}'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Div.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'div_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _DivExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 2
+
+    @classmethod
+    def create_empty(cls):
+        return cls(AExprMask(), AExprMask())
+
+    def mask(self):
+        masked_node = DivExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    def binop_swap(self):
+        left = self.subtrees.items[0]
+        right = self.subtrees.items[1]
+        self.subtrees['left'] = right
+        self.subtrees['right'] = left
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.BINOP_SWAP, _TK.MASK}
+
+
+class AddExpr(ConcreteNode, AddExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, left: AExprBase, right: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['left', 'right'])
+        self.subtrees['left'] = left
+        self.subtrees['right'] = right
+        left.parent = self
+        right.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        left: AExpr | None = AExpr.from_tsn(node.child(0))
+        right: AExpr | None = AExpr.from_tsn(node.child(2))
+        if left is None or right is None:
+            raise SyntaxError('Expected 2 valid arithmatic expressions')
+        return cls(left, right)
+
+    def left(self):
+        return self.subtrees.items[0]
+
+    def right(self):
+        return self.subtrees.items[1]
+
+    def to_tokens(self) -> list[str]:
+        return self.left().to_tokens() + ['+'] + self.right().to_tokens()
+
+    def to_source(self) -> str:
+        return f'{self.left().to_source()} + {self.right().to_source()}'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Add.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'add_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _AddExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 1
+
+    @classmethod
+    def create_empty(cls):
+        return cls(AExprMask(), AExprMask())
+
+    def mask(self):
+        masked_node = AddExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    def binop_swap(self):
+        left = self.subtrees.items[0]
+        right = self.subtrees.items[1]
+        self.subtrees['left'] = right
+        self.subtrees['right'] = left
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.BINOP_SWAP, _TK.MASK}
+
+
+class BracketedAExpr(ConcreteNode, BracketedAExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, expr: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['expr'])
+        self.subtrees['expr'] = expr
+        expr.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        expr: AExpr | None = AExpr.from_tsn(node.child(1))
+        if expr is None:
+            raise SyntaxError('Expected a valid arithmatic expression')
+        return cls(expr)
+
+    def expr(self):
+        return self.subtrees.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return ['('] + self.expr().to_tokens() + [')']
+
+    def to_source(self) -> str:
+        return f'({self.expr().to_source()})'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Brc.A.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'brc_a_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _BracketedAExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(AExprMask())
+
+    def mask(self):
+        masked_node = BracketedAExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class BExpr(ConcreteNode, BExprBase):
+    __slots__ = ()
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        for node_type in [BoolLiteral, LeqExpr, NotExpr, LandExpr, BracketedBExpr]:
+            if node.type == node_type.tree_sitter_rule():
+                return node_type.from_tsn(node)
+        raise SyntaxError(f'Unrecognized statement type: {node.type}')
+
+    @abstractmethod
+    def to_source(self) -> str:
+        pass
+
+    @classmethod
+    def get_type_name(cls):
+        return 'B.Expr.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return '_bexpr'
+
+    def mask(self):
+        masked_node = BExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class BoolLiteral(ConcreteNode, BoolLiteralBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, value: int):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.attributes = LabeledContainer(['value'])
+        self.attributes['value'] = value
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        if node.text == b'true':
+            return cls(True)
+        if node.text == b'false':
+            return cls(False)
+        raise SyntaxError(f'Expected "true" or "false", but got {node.text}')
+
+    def value(self):
+        return self.attributes.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return [str(self.value()).lower()]
+
+    def to_source(self) -> str:
+        return str(self.value())
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Bool'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'bool'
+
+    @classmethod
+    def get_terminal_type(cls):
+        return Terminal.BOOLEAN
+
+    def mask(self):
+        masked_node = BoolLiteralMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class LeqExpr(ConcreteNode, LeqExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, left: AExprBase, right: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['left', 'right'])
+        self.subtrees['left'] = left
+        self.subtrees['right'] = right
+        left.parent = self
+        right.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        left: AExpr | None = AExpr.from_tsn(node.child(0))
+        right: AExpr | None = AExpr.from_tsn(node.child(2))
+        if left is None or right is None:
+            raise SyntaxError('Expected 2 valid arithmatic expressions')
+        return cls(left, right)
+
+    def left(self):
+        return self.subtrees.items[0]
+
+    def right(self):
+        return self.subtrees.items[1]
+
+    def to_tokens(self) -> list[str]:
+        return self.left().to_tokens() + ['<='] + self.right().to_tokens()
+
+    def to_source(self) -> str:
+        return f'{self.left().to_source()} <= {self.right().to_source()}'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'L.Eq.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'leq_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _LeqExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 2
+
+    @classmethod
+    def create_empty(cls):
+        return cls(BExprMask(), BExprMask())
+
+    def mask(self):
+        masked_node = LeqExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    def binop_swap(self):
+        left = self.subtrees.items[0]
+        right = self.subtrees.items[1]
+        self.subtrees['left'] = right
+        self.subtrees['right'] = left
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.BINOP_SWAP, _TK.MASK}
+
+
+class NotExpr(ConcreteNode, NotExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, expr: BExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['expr'])
+        self.subtrees['expr'] = expr
+        expr.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        expr: BExpr | None = BExpr.from_tsn(node.child(1))
+        if expr is None:
+            raise SyntaxError('Expected a valid boolean expression')
+        return cls(expr)
+
+    def expr(self):
+        return self.subtrees.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return ['!'] + self.expr().to_tokens()
+
+    def to_source(self) -> str:
+        return f'!({self.expr().to_source()})'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Not.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'not_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _NotExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(BExprMask())
+
+    def mask(self):
+        masked_node = NotExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class LandExpr(ConcreteNode, LandExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, left: BExprBase, right: BExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['left', 'right'])
+        self.subtrees['left'] = left
+        self.subtrees['right'] = right
+        left.parent = self
+        right.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        left: BExpr | None = BExpr.from_tsn(node.child(0))
+        right: BExpr | None = BExpr.from_tsn(node.child(2))
+        if left is None or right is None:
+            raise SyntaxError('Expected 2 valid boolean expressions')
+        return cls(left, right)
+
+    def left(self):
+        return self.subtrees.items[0]
+
+    def right(self):
+        return self.subtrees.items[1]
+
+    def to_tokens(self) -> list[str]:
+        return self.left().to_tokens() + ['&&'] + self.right().to_tokens()
+
+    def to_source(self) -> str:
+        return f'{self.left().to_source()} <= {self.right().to_source()}'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'L.And.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'land_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _LandExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 1
+
+    @classmethod
+    def create_empty(cls):
+        return cls(BExprMask())
+
+    def mask(self):
+        masked_node = LandExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    def binop_swap(self):
+        left = self.subtrees.items[0]
+        right = self.subtrees.items[1]
+        self.subtrees['left'] = right
+        self.subtrees['right'] = left
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.BINOP_SWAP, _TK.MASK}
+
+
+class BracketedBExpr(ConcreteNode, BracketedBExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, expr: BExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['expr'])
+        self.subtrees['expr'] = expr
+        expr.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        expr: BExpr | None = BExpr.from_tsn(node.child(1))
+        if expr is None:
+            raise SyntaxError('Expected a valid boolean expression')
+        return cls(expr)
+
+    def expr(self):
+        return self.subtrees.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return ['('] + self.expr().to_tokens() + [')']
+
+    def to_source(self) -> str:
+        return f'({self.expr().to_source()})'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Brc.B.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'brc_b_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _BracketedBExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(BExprMask())
+
+    def mask(self):
+        masked_node = BracketedBExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class Stmt(ConcreteNode, StmtBase):
+    __slots__ = ()
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        for node_type in [AsnStmt, IfStmt, WhileStmt, Block]:
+            if node.type == node_type.tree_sitter_rule():
+                return node_type.from_tsn(node)
+        raise SyntaxError(f'Unrecognized statement type: {node.type}')
+
+    @abstractmethod
+    def to_source(self) -> str:
+        pass
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Stmt.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return '_stmt'
+
+    def mask(self):
+        masked_node = StmtMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class AsnStmt(ConcreteNode, AsnStmtBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, target: IdentifierBase, expr: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['target', 'expr'])
+        self.subtrees['target'] = target
+        self.subtrees['expr'] = expr
+        target.parent = self
+        expr.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        target: Identifier | None = Identifier.from_tsn(node.child(0))
+        expr: AExpr | None = AExpr.from_tsn(node.child(2))
+        if target is None or expr is None:
+            raise SyntaxError('Expected a valid identifier and a valid arithmatic expression')
+        return cls(target, expr)
+
+    def target(self):
+        return self.subtrees.items[0]
+
+    def expr(self):
+        return self.subtrees.items[1]
+
+    def to_tokens(self) -> list[str]:
+        return self.target().to_tokens() + ['='] + self.expr().to_tokens() + [';']
+
+    def to_source(self) -> str:
+        return f'{self.target().to_source()} = {self.expr().to_source()};\n'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Asn.Stmt.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'asn_stmt'
+
+    @classmethod
+    def get_token_template(cls):
+        return _AsnStmt_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(IdentifierMask(), StmtMask())
+
+    def mask(self):
+        masked_node = AsnStmtMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class IfStmt(ConcreteNode, IfStmtBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, cond: BExprBase, body: StmtBase, else_body: StmtBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['cond', 'body', 'else_body'])
+        self.subtrees['cond'] = cond
+        self.subtrees['body'] = body
+        self.subtrees['else_body'] = else_body
+        cond.parent = self
+        body.parent = self
+        else_body.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        cond: BExpr | None = BExpr.from_tsn(node.child(2))
+        body: Stmt | None = Stmt.from_tsn(node.child(4))
+        else_body: Stmt | None = Stmt.from_tsn(node.child(6))
+        if cond is None or body is None or else_body is None:
+            raise SyntaxError('Expected a valid if-else structure: <condition> <body> <else-body>')
+        return cls(cond, body, else_body)
+
+    def cond(self):
+        return self.subtrees.items[0]
+
+    def body(self):
+        return self.subtrees.items[1]
+
+    def else_body(self):
+        return self.subtrees.items[2]
+
+    def to_tokens(self) -> list[str]:
+        tokens = ['if', '(', *self.cond().to_tokens(), ')']
+        if isinstance(self.body(), BlockBase):
+            tokens += self.body().to_tokens()
+        else:
+            tokens += ['{'] + self.body().to_tokens() + ['}']
+        tokens += ['else']
+        if isinstance(self.else_body(), BlockBase):
+            tokens += self.else_body().to_tokens()
+        else:
+            tokens += ['{'] + self.else_body().to_tokens() + ['}']
+        return tokens
+
+    def to_source(self) -> str:
+        s = f'if ({self.cond().to_source()}) '
+        if isinstance(self.body(), BlockBase):
+            s += self.body().to_source()
+        else:
+            s += f'{{\n{self.body().to_source()}}}'
+        s += f' else '
+        if isinstance(self.else_body(), BlockBase):
+            s += self.else_body().to_source()
+        else:
+            s += f'{{\n{self.else_body().to_source()}}}'
+        s += '\n'
+        return s
+
+    @classmethod
+    def get_type_name(cls):
+        return 'If.Stmt.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'if_stmt'
+
+    @classmethod
+    def get_token_template(cls):
+        return _IfStmt_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(BExprMask(), StmtMask(), StmtMask())
+
+    def mask(self):
+        masked_node = IfStmtMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class WhileStmt(ConcreteNode, WhileStmtBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, cond: BExprBase, body: StmtBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['cond', 'body'])
+        self.subtrees['cond'] = cond
+        self.subtrees['body'] = body
+        cond.parent = self
+        body.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        cond: BExpr | None = BExpr.from_tsn(node.child(2))
+        body: Stmt | None = Stmt.from_tsn(node.child(4))
+        if cond is None or body is None:
+            raise SyntaxError('Expected a valid while structure: <condition> <body>')
+        return cls(cond, body)
+
+    def cond(self):
+        return self.subtrees.items[0]
+
+    def body(self):
+        return self.subtrees.items[1]
+
+    def to_tokens(self) -> list[str]:
+        tokens = ['while', '(', *self.cond().to_tokens(), ')']
+        if isinstance(self.body(), BlockBase):
+            tokens += self.body().to_tokens()
+        else:
+            tokens += ['{'] + self.body().to_tokens() + ['}']
+        return tokens
+
+    def to_source(self) -> str:
+        s = f'while ({self.cond().to_source()}) '
+        if isinstance(self.body(), BlockBase):
+            s += self.body().to_source()
+        else:
+            s += f'{{\n{self.body().to_source()}}}'
+        s += '\n'
+        return s
+
+    @classmethod
+    def get_type_name(cls):
+        return 'While Stmt.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'while_stmt'
+
+    @classmethod
+    def get_token_template(cls):
+        return _WhileStmt_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(BExprMask(), StmtMask())
+
+    def mask(self):
+        masked_node = WhileStmtMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class Block(ConcreteNode, BlockBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, stmts: list[Stmt]):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = ChildrenContainer()
+        for stmt in stmts:
+            self.subtrees.append(stmt)
+            stmt.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
+        stmts: list[Stmt] = []
+        for child in node.children[1:-1]:
+            stmt: Stmt | None = Stmt.from_tsn(child)
+            if stmt is None:
+                raise SyntaxError('Expected a valid statement')
+            stmts.append(stmt)
+        return cls(stmts)
+
+    def child(self, i: int):
+        return self.subtrees[i]
+
+    def to_tokens(self) -> list[str]:
+        tokens = ['{']
+        for stmt in self.subtrees:
+            tokens += stmt.to_tokens()
+        tokens += ['}']
+        return tokens
+
+    def to_source(self) -> str:
+        return '{\n' + ''.join((stmt.to_source() for stmt in self.subtrees)) + '}'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Block'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'block'
+
+    @classmethod
+    def get_token_template(cls):
+        return _Block_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    def mask(self):
+        masked_node = BlockMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class AExprMask(MaskedNode, AExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = AExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, AExpr):
+            raise ValueError(f'Expected AExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return AExpr
+
+    def mask_down(self, descendant_type):
+        if descendant_type not in _AExprMask_DESCENDANTS:
+            raise TypeError(f'Cannot mask down "{descendant_type.get_type_name()}" to "{AExprMask.get_type_name()}".')
+        descendant_mask = descendant_type()
+        self.parent.subtrees.replace(self, descendant_mask)
+        descendant_mask.parent = self.parent
+        return descendant_mask
+
+    @classmethod
+    def get_descendant_mask_types(cls):
+        return _AExprMask_DESCENDANTS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_DOWN, _TK.UNMASK}
+
+
+class IdentifierMask(MaskedNode, IdentifierBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = Identifier
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, Identifier):
+            raise ValueError(f'Expected Identifier, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return Identifier
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _IdentifierMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{IdentifierMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _IdentifierMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class IntLiteralMask(MaskedNode, IntLiteralBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = IntLiteral
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, IntLiteral):
+            raise ValueError(f'Expected IntLiteral, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return IntLiteral
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _IntLiteralMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{IntLiteralMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _IntLiteralMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class DivExprMask(MaskedNode, DivExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = DivExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, DivExpr):
+            raise ValueError(f'Expected DivExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return DivExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _DivExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{DivExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _DivExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class AddExprMask(MaskedNode, AddExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = AddExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, AddExpr):
+            raise ValueError(f'Expected AddExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return AddExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _AddExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{AddExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _AddExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class BracketedAExprMask(MaskedNode, BracketedAExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = BracketedAExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, BracketedAExpr):
+            raise ValueError(f'Expected BracketedAExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return BracketedAExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _BracketedAExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{BracketedAExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _BracketedAExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class BExprMask(MaskedNode, BExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = BExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, BExpr):
+            raise ValueError(f'Expected BExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return BExpr
+
+    def mask_down(self, descendant_type):
+        if descendant_type not in _BExprMask_DESCENDANTS:
+            raise TypeError(f'Cannot mask down "{descendant_type.get_type_name()}" to "{BExprMask.get_type_name()}".')
+        descendant_mask = descendant_type()
+        self.parent.subtrees.replace(self, descendant_mask)
+        descendant_mask.parent = self.parent
+        return descendant_mask
+
+    @classmethod
+    def get_descendant_mask_types(cls):
+        return _BExprMask_DESCENDANTS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_DOWN, _TK.UNMASK}
+
+
+class BoolLiteralMask(MaskedNode, BoolLiteralBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = BoolLiteral
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, BoolLiteral):
+            raise ValueError(f'Expected BoolLiteral, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return BoolLiteral
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _BoolLiteralMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{BoolLiteralMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _BoolLiteralMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class LeqExprMask(MaskedNode, LeqExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = LeqExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, LeqExpr):
+            raise ValueError(f'Expected LeqExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return LeqExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _LeqExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{LeqExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _LeqExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class NotExprMask(MaskedNode, NotExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = NotExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, NotExpr):
+            raise ValueError(f'Expected NotExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return NotExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _NotExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{NotExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _NotExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class LandExprMask(MaskedNode, LandExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = LandExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, LandExpr):
+            raise ValueError(f'Expected LandExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return LandExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _LandExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{LandExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _LandExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class BracketedBExprMask(MaskedNode, BracketedBExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = BracketedBExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, BracketedBExpr):
+            raise ValueError(f'Expected BracketedBExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return BracketedBExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _BracketedBExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{BracketedBExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _BracketedBExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class StmtMask(MaskedNode, StmtBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = Stmt
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, Stmt):
+            raise ValueError(f'Expected Stmt, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return Stmt
+
+    def mask_down(self, descendant_type):
+        if descendant_type not in _StmtMask_DESCENDANTS:
+            raise TypeError(f'Cannot mask down "{descendant_type.get_type_name()}" to "{StmtMask.get_type_name()}".')
+        descendant_mask = descendant_type()
+        self.parent.subtrees.replace(self, descendant_mask)
+        descendant_mask.parent = self.parent
+        return descendant_mask
+
+    @classmethod
+    def get_descendant_mask_types(cls):
+        return _StmtMask_DESCENDANTS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_DOWN, _TK.UNMASK}
+
+
+class AsnStmtMask(MaskedNode, AsnStmtBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = AsnStmt
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, AsnStmt):
+            raise ValueError(f'Expected AsnStmt, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return AsnStmt
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _AsnStmtMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{AsnStmtMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _AsnStmtMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class IfStmtMask(MaskedNode, IfStmtBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = IfStmt
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, IfStmt):
+            raise ValueError(f'Expected IfStmt, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return IfStmt
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _IfStmtMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{IfStmtMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _IfStmtMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class WhileStmtMask(MaskedNode, WhileStmtBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = WhileStmt
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, WhileStmt):
+            raise ValueError(f'Expected WhileStmt, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return WhileStmt
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _WhileStmtMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{WhileStmtMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _WhileStmtMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class BlockMask(MaskedNode, BlockBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = Block
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, Block):
+            raise ValueError(f'Expected Block, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return Block
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _BlockMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{BlockMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _BlockMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+_Program_TEMPLATE = [StmtMask]
+_DivExpr_TEMPLATE = [AExprMask, '/', AExprMask]
+_AddExpr_TEMPLATE = [AExprMask, '+', AExprMask]
+_BracketedAExpr_TEMPLATE = ['(', AExprMask, ')']
+_LeqExpr_TEMPLATE = [AExprMask, '<=', AExprMask]
+_NotExpr_TEMPLATE = ['!', BExprMask]
+_LandExpr_TEMPLATE = [BExprMask, '&&', BExprMask]
+_BracketedBExpr_TEMPLATE = ['(', BExprMask, ')']
+_AsnStmt_TEMPLATE = [IdentifierMask, '=', AExprMask, ';']
+_IfStmt_TEMPLATE = ['if', '(', BExprMask, ')', BlockMask, 'else', BlockMask]
+_WhileStmt_TEMPLATE = ['while', '(', BExprMask, ')', BlockMask]
+_Block_TEMPLATE = ['{', [StmtMask], '}']
+_AExprMask_DESCENDANTS = [IdentifierMask, IntLiteralMask, DivExprMask, AddExprMask, BracketedAExprMask]
+_IdentifierMask_ANCESTORS = [AExprMask]
+_IntLiteralMask_ANCESTORS = [AExprMask]
+_DivExprMask_ANCESTORS = [AExprMask]
+_AddExprMask_ANCESTORS = [AExprMask]
+_BracketedAExprMask_ANCESTORS = [AExprMask]
+_BExprMask_DESCENDANTS = [BoolLiteralMask, LeqExprMask, NotExprMask, LandExprMask, BracketedBExprMask]
+_BoolLiteralMask_ANCESTORS = [BExprMask]
+_LeqExprMask_ANCESTORS = [BExprMask]
+_NotExprMask_ANCESTORS = [BExprMask]
+_LandExprMask_ANCESTORS = [BExprMask]
+_BracketedBExprMask_ANCESTORS = [BExprMask]
+_StmtMask_DESCENDANTS = [AsnStmtMask, IfStmtMask, WhileStmtMask, BlockMask]
+_AsnStmtMask_ANCESTORS = [StmtMask]
+_IfStmtMask_ANCESTORS = [StmtMask]
+_WhileStmtMask_ANCESTORS = [StmtMask]
+_BlockMask_ANCESTORS = [StmtMask]
+
+__all__ = ['Program', 'AExpr', 'AExprMask', 'Identifier', 'IdentifierMask', 'IntLiteral', 'IntLiteralMask', 'DivExpr', 'DivExprMask', 'AddExpr', 'AddExprMask', 'BracketedAExpr', 'BracketedAExprMask', 'BExpr', 'BExprMask', 'BoolLiteral', 'BoolLiteralMask', 'LeqExpr', 'LeqExprMask', 'NotExpr', 'NotExprMask', 'LandExpr', 'LandExprMask', 'BracketedBExpr', 'BracketedBExprMask', 'Stmt', 'StmtMask', 'AsnStmt', 'AsnStmtMask', 'IfStmt', 'IfStmtMask', 'WhileStmt', 'WhileStmtMask', 'Block', 'BlockMask']
@@ -18,6 +18,7 @@ import langs.imp.mask as mask
 @attr.is_root_node()
 @attr.node_type_name('Program')
 @attr.tree_sitter_rule('source_file')
+@attr.token_template([mask.StmtMask])
 @attr.is_non_terminal_node([mask.AExprMask])
 class Program(ConcreteNode, RootNode, base.ProgramBase):
     def __init__(self, body: base.StmtBase):
@@ -112,6 +113,7 @@ class IntLiteral(ConcreteNode, base.IntLiteralBase):
 
 @attr.node_type_name('Div.Exp.')
 @attr.tree_sitter_rule('div_exp')
+@attr.token_template([mask.AExprMask, '/', mask.AExprMask], precedence=2)
 @behavior.can_binop_swap('left', 'right')
 @attr.is_non_terminal_node([mask.AExprMask, mask.AExprMask])
 class DivExpr(ConcreteNode, base.DivExprBase):
@@ -148,6 +150,7 @@ class DivExpr(ConcreteNode, base.DivExprBase):
 
 @attr.node_type_name('Add.Exp.')
 @attr.tree_sitter_rule('add_exp')
+@attr.token_template([mask.AExprMask, '+', mask.AExprMask], precedence=1)
 @behavior.can_binop_swap('left', 'right')
 @attr.is_non_terminal_node([mask.AExprMask, mask.AExprMask])
 class AddExpr(ConcreteNode, base.AddExprBase):
@@ -184,6 +187,7 @@ class AddExpr(ConcreteNode, base.AddExprBase):
 
 @attr.node_type_name('Brc.A.Exp.')
 @attr.tree_sitter_rule('brc_a_exp')
+@attr.token_template(['(', mask.AExprMask, ')'])
 @attr.is_non_terminal_node([mask.AExprMask])
 class BracketedAExpr(ConcreteNode, base.BracketedAExprBase):
     def __init__(self, expr: base.AExprBase):
@@ -228,7 +232,7 @@ class BExpr(ConcreteNode, base.BExprBase):
 
 @attr.node_type_name('Bool')
 @attr.tree_sitter_rule('bool')
-# TODO: Terminal type not defined yet
+@attr.is_terminal_node(Terminal.BOOLEAN)
 class BoolLiteral(ConcreteNode, base.BoolLiteralBase):
     def __init__(self, value: int):
         super().__init__()
@@ -239,9 +243,9 @@ class BoolLiteral(ConcreteNode, base.BoolLiteralBase):
     def from_tsn(cls, node: TNode) -> ConcreteNode | None:
         if node.type != cls.tree_sitter_rule():
             raise SyntaxError(f'Expected {cls.tree_sitter_rule()}, but got {node.type}')
-        if node.text == 'true':
+        if node.text == b'true':
             return cls(True)
-        if node.text == 'false':
+        if node.text == b'false':
             return cls(False)
         raise SyntaxError(f'Expected "true" or "false", but got {node.text}')
 
@@ -257,6 +261,7 @@ class BoolLiteral(ConcreteNode, base.BoolLiteralBase):
 
 @attr.node_type_name('L.Eq.Exp.')
 @attr.tree_sitter_rule('leq_exp')
+@attr.token_template([mask.AExprMask, '<=', mask.AExprMask], precedence=2)
 @behavior.can_binop_swap('left', 'right')
 @attr.is_non_terminal_node([mask.BExprMask, mask.BExprMask])
 class LeqExpr(ConcreteNode, base.LeqExprBase):
@@ -293,6 +298,7 @@ class LeqExpr(ConcreteNode, base.LeqExprBase):
 
 @attr.node_type_name('Not.Exp.')
 @attr.tree_sitter_rule('not_exp')
+@attr.token_template(['!', mask.BExprMask])
 @attr.is_non_terminal_node([mask.BExprMask])
 class NotExpr(ConcreteNode, base.NotExprBase):
     def __init__(self, expr: base.BExprBase):
@@ -322,6 +328,7 @@ class NotExpr(ConcreteNode, base.NotExprBase):
 
 @attr.node_type_name("L.And.Exp.")
 @attr.tree_sitter_rule('land_exp')
+@attr.token_template([mask.BExprMask, '&&', mask.BExprMask], precedence=1)
 @behavior.can_binop_swap('left', 'right')
 @attr.is_non_terminal_node([mask.BExprMask])
 class LandExpr(ConcreteNode, base.LandExprBase):
@@ -358,6 +365,7 @@ class LandExpr(ConcreteNode, base.LandExprBase):
 
 @attr.node_type_name('Brc.B.Exp.')
 @attr.tree_sitter_rule('brc_b_exp')
+@attr.token_template(['(', mask.BExprMask, ')'])
 @attr.is_non_terminal_node([mask.BExprMask])
 class BracketedBExpr(ConcreteNode, base.BracketedBExprBase):
     def __init__(self, expr: base.BExprBase):
@@ -402,6 +410,7 @@ class Stmt(ConcreteNode, base.StmtBase):
 
 @attr.node_type_name('Asn.Stmt.')
 @attr.tree_sitter_rule('asn_stmt')
+@attr.token_template([mask.IdentifierMask, '=', mask.AExprMask, ';'])
 @attr.is_non_terminal_node([mask.IdentifierMask, mask.StmtMask])
 class AsnStmt(ConcreteNode, base.AsnStmtBase):
     def __init__(self, target: base.IdentifierBase, expr: base.AExprBase):
@@ -437,6 +446,7 @@ class AsnStmt(ConcreteNode, base.AsnStmtBase):
 
 @attr.node_type_name('If.Stmt.')
 @attr.tree_sitter_rule('if_stmt')
+@attr.token_template(['if', '(', mask.BExprMask, ')', mask.BlockMask, 'else', mask.BlockMask])
 @attr.is_non_terminal_node([mask.BExprMask, mask.StmtMask, mask.StmtMask])
 class IfStmt(ConcreteNode, base.IfStmtBase):
     def __init__(self, cond: base.BExprBase, body: base.StmtBase, else_body: base.StmtBase):
@@ -499,6 +509,7 @@ class IfStmt(ConcreteNode, base.IfStmtBase):
 
 @attr.node_type_name('While Stmt.')
 @attr.tree_sitter_rule('while_stmt')
+@attr.token_template(['while', '(', mask.BExprMask, ')', mask.BlockMask])
 @attr.is_non_terminal_node([mask.BExprMask, mask.StmtMask])
 class WhileStmt(ConcreteNode, base.WhileStmtBase):
     def __init__(self, cond: base.BExprBase, body: base.StmtBase):
@@ -545,6 +556,7 @@ class WhileStmt(ConcreteNode, base.WhileStmtBase):
 
 @attr.node_type_name('Block')
 @attr.tree_sitter_rule('block')
+@attr.token_template(['{', [mask.StmtMask], '}'])
 # TODO: How to decorrupt a block?
 class Block(ConcreteNode, base.BlockBase):
     def __init__(self, stmts: list[Stmt]):
@@ -0,0 +1,697 @@
+# Generated from langs.minimp by specialize.py, do not edit.
+from __future__ import annotations
+
+from abc import ABC
+from mast.node import AbstractNode
+from abc import abstractmethod
+from typing import Any
+from tree_sitter import Node as TNode
+from mast import Terminal
+from mast.container import LabeledContainer
+from mast.node import ConcreteNode, AbstractNode, RootNode
+from mast.node import MaskedNode
+from uuid import uuid4
+from mast import TransitionKernels as _TK
+
+_ID = AbstractNode.id
+
+
+def _get_id(self):
+    try:
+        return _ID.__get__(self)
+    except AttributeError:
+        _ID.__set__(self, uuid4())
+        return _ID.__get__(self)
+
+
+# `id` of the nodes, a `uuid4` made the first time it is read rather than for every node built
+_lazy_id = property(_get_id, _ID.__set__)
+
+
+
+class ProgramBase(AbstractNode, ABC):
+    __slots__ = ()
+
+
+class AExprBase(AbstractNode, ABC):
+    __slots__ = ()
+
+
+class IdentifierBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class IntLiteralBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class DivExprBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class AddExprBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class BracketedAExprBase(AExprBase, ABC):
+    __slots__ = ()
+
+
+class Program(ConcreteNode, RootNode, ProgramBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, body: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['body'])
+        self.subtrees['body'] = body
+        body.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            return None
+        body: AExpr | None = AExpr.from_tsn(node.child(0))
+        return cls(body)
+
+    def body(self) -> AExpr:
+        return self.subtrees.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return self.body().to_tokens()
+
+    def to_source(self) -> str:
+        return self.body().to_source()
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Program'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'source_file'
+
+    @classmethod
+    def from_tree_sitter(cls, tree):
+        return cls.from_tsn(tree.root_node)
+
+    @classmethod
+    def get_token_template(cls):
+        return _Program_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(AExprMask())
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return set()
+
+
+class AExpr(ConcreteNode, AExprBase):
+    __slots__ = ()
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type == IntLiteral.tree_sitter_rule():
+            return IntLiteral.from_tsn(node)
+        elif node.type == Identifier.tree_sitter_rule():
+            return Identifier.from_tsn(node)
+        elif node.type == DivExpr.tree_sitter_rule():
+            return DivExpr.from_tsn(node)
+        elif node.type == AddExpr.tree_sitter_rule():
+            return AddExpr.from_tsn(node)
+        elif node.type == BracketedAExpr.tree_sitter_rule():
+            return BracketedAExpr.from_tsn(node)
+        else:
+            return None
+
+    @abstractmethod
+    def to_source(self) -> str:
+        pass
+
+    @classmethod
+    def get_type_name(cls):
+        return 'A.Expr.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return '_aexpr'
+
+    def mask(self):
+        masked_node = AExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class Identifier(ConcreteNode, IdentifierBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, name: str):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.attributes = LabeledContainer(['name'])
+        self.attributes['name'] = name
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            return None
+        return cls(node.text.decode('utf-8'))
+
+    def name(self):
+        return self.attributes.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return [self.name()]
+
+    def to_source(self) -> str:
+        return self.name()
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Id'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'id'
+
+    @classmethod
+    def get_terminal_type(cls):
+        return Terminal.IDENTIFIER
+
+    def mask(self):
+        masked_node = IdentifierMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class IntLiteral(ConcreteNode, IntLiteralBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, value: int):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.attributes = LabeledContainer(['value'])
+        self.attributes['value'] = value
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            return None
+        return cls(int(node.text))
+
+    def value(self):
+        return self.attributes.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return [str(self.value())]
+
+    def to_source(self) -> str:
+        return str(self.value())
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Int'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'int'
+
+    @classmethod
+    def get_terminal_type(cls):
+        return Terminal.NUMBER
+
+    def mask(self):
+        masked_node = IntLiteralMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class DivExpr(ConcreteNode, DivExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, left: AExprBase, right: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['left', 'right'])
+        self.subtrees['left'] = left
+        self.subtrees['right'] = right
+        left.parent = self
+        right.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            return None
+        left: AExpr | None = AExpr.from_tsn(node.child(0))
+        right: AExpr | None = AExpr.from_tsn(node.child(2))
+        if left is None or right is None:
+            return None
+        return cls(left, right)
+
+    def left(self):
+        return self.subtrees.items[0]
+
+    def right(self):
+        return self.subtrees.items[1]
+
+    def to_tokens(self) -> list[str]:
+        return self.left().to_tokens() + ['/'] + self.right().to_tokens()
+
+    def to_source(self) -> str:
+        return f'{self.left().to_source()} / {self.right().to_source()}'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Div.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'div_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _DivExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 2
+
+    @classmethod
+    def create_empty(cls):
+        return cls(AExprMask(), AExprMask())
+
+    def mask(self):
+        masked_node = DivExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    def binop_swap(self):
+        left = self.subtrees.items[0]
+        right = self.subtrees.items[1]
+        self.subtrees['left'] = right
+        self.subtrees['right'] = left
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.BINOP_SWAP, _TK.MASK}
+
+
+class AddExpr(ConcreteNode, AddExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, left: AExprBase, right: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['left', 'right'])
+        self.subtrees['left'] = left
+        self.subtrees['right'] = right
+        left.parent = self
+        right.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            return None
+        left: AExpr | None = AExpr.from_tsn(node.child(0))
+        right: AExpr | None = AExpr.from_tsn(node.child(2))
+        if left is None or right is None:
+            return None
+        return cls(left, right)
+
+    def left(self):
+        return self.subtrees.items[0]
+
+    def right(self):
+        return self.subtrees.items[1]
+
+    def to_tokens(self) -> list[str]:
+        return self.left().to_tokens() + ['+'] + self.right().to_tokens()
+
+    def to_source(self) -> str:
+        return f'{self.left().to_source()} + {self.right().to_source()}'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Add.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'add_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _AddExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 1
+
+    @classmethod
+    def create_empty(cls):
+        return cls(AExprMask(), AExprMask())
+
+    def mask(self):
+        masked_node = AddExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    def binop_swap(self):
+        left = self.subtrees.items[0]
+        right = self.subtrees.items[1]
+        self.subtrees['left'] = right
+        self.subtrees['right'] = left
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.BINOP_SWAP, _TK.MASK}
+
+
+class BracketedAExpr(ConcreteNode, BracketedAExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self, expr: AExprBase):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self.subtrees = LabeledContainer(['expr'])
+        self.subtrees['expr'] = expr
+        expr.parent = self
+
+    @classmethod
+    def from_tsn(cls, node: TNode) -> ConcreteNode | None:
+        if node.type != cls.tree_sitter_rule():
+            return None
+        expr: AExpr | None = AExpr.from_tsn(node.child(1))
+        if expr is None:
+            return None
+        return cls(expr)
+
+    def expr(self):
+        return self.subtrees.items[0]
+
+    def to_tokens(self) -> list[str]:
+        return ['('] + self.expr().to_tokens() + [')']
+
+    def to_source(self) -> str:
+        return f'({self.expr().to_source()})'
+
+    @classmethod
+    def get_type_name(cls):
+        return 'Brc.A.Exp.'
+
+    @classmethod
+    def tree_sitter_rule(cls):
+        return 'brc_a_exp'
+
+    @classmethod
+    def get_token_template(cls):
+        return _BracketedAExpr_TEMPLATE
+
+    @classmethod
+    def get_precedence(cls):
+        return 0
+
+    @classmethod
+    def create_empty(cls):
+        return cls(AExprMask())
+
+    def mask(self):
+        masked_node = BracketedAExprMask()
+        self.parent.subtrees.replace(self, masked_node)
+        masked_node.parent = self.parent
+        return masked_node
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK}
+
+
+class AExprMask(MaskedNode, AExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = AExpr
+
+    def mask_down(self, descendant_type):
+        if descendant_type not in _AExprMask_DESCENDANTS:
+            raise TypeError(f'Cannot mask down "{descendant_type.get_type_name()}" to "{AExprMask.get_type_name()}".')
+        descendant_mask = descendant_type()
+        self.parent.subtrees.replace(self, descendant_mask)
+        descendant_mask.parent = self.parent
+        return descendant_mask
+
+    @classmethod
+    def get_descendant_mask_types(cls):
+        return _AExprMask_DESCENDANTS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_DOWN}
+
+
+class IdentifierMask(MaskedNode, IdentifierBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = Identifier
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, Identifier):
+            raise ValueError(f'Expected Identifier, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return Identifier
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _IdentifierMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{IdentifierMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _IdentifierMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class IntLiteralMask(MaskedNode, IntLiteralBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = IntLiteral
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, IntLiteral):
+            raise ValueError(f'Expected IntLiteral, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return IntLiteral
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _IntLiteralMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{IntLiteralMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _IntLiteralMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class DivExprMask(MaskedNode, DivExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = DivExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, DivExpr):
+            raise ValueError(f'Expected DivExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return DivExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _DivExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{DivExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _DivExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class AddExprMask(MaskedNode, AddExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = AddExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, AddExpr):
+            raise ValueError(f'Expected AddExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return AddExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _AddExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{AddExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _AddExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+class BracketedAExprMask(MaskedNode, BracketedAExprBase):
+    __slots__ = ()
+    id = _lazy_id
+
+    def __init__(self):
+        self.parent = None
+        self.attributes = None
+        self.subtrees = None
+        self._node_type = AbstractNode
+        self._node_type = BracketedAExpr
+
+    def unmask(self, concrete_node):
+        if not isinstance(concrete_node, BracketedAExpr):
+            raise ValueError(f'Expected BracketedAExpr, got {concrete_node.__class__.__name__}')
+        self.parent.subtrees.replace(self, concrete_node)
+        concrete_node.parent = self.parent
+        return concrete_node
+
+    @classmethod
+    def unmask_target(cls):
+        return BracketedAExpr
+
+    def mask_up(self, ancestor_type):
+        if ancestor_type not in _BracketedAExprMask_ANCESTORS:
+            raise TypeError(f'Cannot mask up "{BracketedAExprMask.get_type_name()}" to "{ancestor_type.get_type_name()}".')
+        ancestor_mask = ancestor_type()
+        self.parent.subtrees.replace(self, ancestor_mask)
+        ancestor_mask.parent = self.parent
+        return ancestor_mask
+
+    @classmethod
+    def get_ancestor_mask_types(cls):
+        return _BracketedAExprMask_ANCESTORS
+
+    @classmethod
+    def get_supported_transition_kernels(cls):
+        return {_TK.MASK_UP, _TK.UNMASK}
+
+
+_Program_TEMPLATE = [AExprMask]
+_DivExpr_TEMPLATE = [AExprMask, '/', AExprMask]
+_AddExpr_TEMPLATE = [AExprMask, '+', AExprMask]
+_BracketedAExpr_TEMPLATE = ['(', AExprMask, ')']
+_AExprMask_DESCENDANTS = [IdentifierMask, IntLiteralMask, DivExprMask, AddExprMask, BracketedAExprMask]
+_IdentifierMask_ANCESTORS = [AExprMask]
+_IntLiteralMask_ANCESTORS = [AExprMask]
+_DivExprMask_ANCESTORS = [AExprMask]
+_AddExprMask_ANCESTORS = [AExprMask]
+_BracketedAExprMask_ANCESTORS = [AExprMask]
+
+__all__ = ['Program', 'AExpr', 'AExprMask', 'Identifier', 'IdentifierMask', 'IntLiteral', 'IntLiteralMask', 'DivExpr', 'DivExprMask', 'AddExpr', 'AddExprMask', 'BracketedAExpr', 'BracketedAExprMask']
@@ -18,6 +18,7 @@ import langs.minimp.mask as mask
 @attr.is_root_node()
 @attr.node_type_name('Program')
 @attr.tree_sitter_rule('source_file')
+@attr.token_template([mask.AExprMask])
 @attr.is_non_terminal_node([mask.AExprMask])
 class Program(ConcreteNode, RootNode, base.ProgramBase):
     def __init__(self, body: base.AExprBase):
@@ -118,6 +119,7 @@ class IntLiteral(ConcreteNode, base.IntLiteralBase):
 
 @attr.node_type_name('Div.Exp.')
 @attr.tree_sitter_rule('div_exp')
+@attr.token_template([mask.AExprMask, '/', mask.AExprMask], precedence=2)
 @tk.can_binop_swap('left', 'right')
 @attr.is_non_terminal_node([mask.AExprMask, mask.AExprMask])
 class DivExpr(ConcreteNode, base.DivExprBase):
@@ -154,6 +156,7 @@ class DivExpr(ConcreteNode, base.DivExprBase):
 
 @attr.node_type_name('Add.Exp.')
 @attr.tree_sitter_rule('add_exp')
+@attr.token_template([mask.AExprMask, '+', mask.AExprMask], precedence=1)
 @tk.can_binop_swap('left', 'right')
 @attr.is_non_terminal_node([mask.AExprMask, mask.AExprMask])
 class AddExpr(ConcreteNode, base.AddExprBase):
@@ -190,6 +193,7 @@ class AddExpr(ConcreteNode, base.AddExprBase):
 
 @attr.node_type_name('Brc.A.Exp.')
 @attr.tree_sitter_rule('brc_a_exp')
+@attr.token_template(['(', mask.AExprMask, ')'])
 @attr.is_non_terminal_node([mask.AExprMask])
 class BracketedAExpr(ConcreteNode, base.BracketedAExprBase):
     def __init__(self, expr: base.AExprBase):
@@ -11,4 +11,5 @@ class TransitionKernels(Enum):
 class Terminal(Enum):
     IDENTIFIER = 1
     NUMBER = 2
-    STRING = 3
\ No newline at end of file
+    STRING = 3
+    BOOLEAN = 4
\ No newline at end of file
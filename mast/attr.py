@@ -56,4 +56,21 @@ def is_terminal_node(t: Terminal) -> Callable:
             return t
         setattr(cls, 'get_terminal_type', classmethod(gtt))
         return cls
+    return decorator
+
+
+def token_template(template: list, precedence: int = 0) -> Callable:
+    """
+    Describe the token sequence of a non-terminal node. Elements are literal tokens (`str`), masked node types
+    standing for a subtree, or a one-element list of a masked node type standing for zero or more subtrees.
+    `precedence` mirrors the `prec` of the tree-sitter rule and only matters for infix templates.
+    """
+    def decorator(clss: Type[TCN]) -> Type[TCN]:
+        def gtt(_: Type[TCN]) -> list:
+            return template
+        setattr(clss, 'get_token_template', classmethod(gtt))
+        def gp(_: Type[TCN]) -> int:
+            return precedence
+        setattr(clss, 'get_precedence', classmethod(gp))
+        return clss
     return decorator
\ No newline at end of file
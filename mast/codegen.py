@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import ast
+import inspect
+import pkgutil
+from enum import Enum
+from importlib import import_module
+from types import ModuleType
+from typing import Any, Iterable
+from uuid import UUID
+
+from mast.container import LabeledContainer, ChildrenContainer
+from mast.node import AbstractNode, ConcreteNode, MaskedNode
+
+# decorator metadata, read off the decorated classes: method -> closure variable holding its value
+_KERNELS = {
+    'mask': 'masked_node_type',
+    'unmask': 'unmasked_node_type',
+    'mask_up': 'ancestor_mask_types',
+    'mask_down': 'descendant_mask_types',
+}
+_DECORATOR_MODULES = {'mast.attr', 'mast.transition_kernel'}
+
+
+def _closure(cls: type, name: str) -> dict[str, Any]:
+    member = vars(cls)[name]
+    return inspect.getclosurevars(getattr(member, '__func__', member)).nonlocals
+
+
+class _Flatten(ast.NodeTransformer):
+    """Drops the submodule prefix of `mask.AExprMask` and friends, and inlines labeled container accessors."""
+    def __init__(self, submodules: set[str], labels: dict[str, list[str]]):
+        self.submodules = submodules
+        self.labels = labels
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        if isinstance(node.value, ast.Name) and node.value.id in self.submodules:
+            return ast.copy_location(ast.Name(node.attr, node.ctx), node)
+        return self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        # `LabeledContainer[AbstractNode](...)` goes through the generic alias, which costs a call and an attribute
+        if isinstance(node.func, ast.Subscript) and isinstance(node.func.value, ast.Name) \
+                and node.func.value.id in ('LabeledContainer', 'ChildrenContainer'):
+            node.func = node.func.value
+        return self.generic_visit(node)
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.AST:
+        # `self.subtrees['left']` -> `self.subtrees.items[0]`, for reads only: the items are not to be modified
+        container = node.value
+        if isinstance(node.ctx, ast.Load) and isinstance(container, ast.Attribute) and container.attr in self.labels \
+                and isinstance(container.value, ast.Name) and container.value.id == 'self' \
+                and isinstance(node.slice, ast.Constant) and node.slice.value in self.labels[container.attr]:
+            index = self.labels[container.attr].index(node.slice.value)
+            items = ast.Attribute(container, 'items', ast.Load())
+            return ast.copy_location(ast.Subscript(items, ast.Constant(index), node.ctx), node)
+        return self.generic_visit(node)
+
+
+# what `super().__init__()` of a node class runs, written out, except for the `id` which is made on first read
+_BASE_INITS = {
+    AbstractNode: 'self.parent = None\nself.attributes = None\nself.subtrees = None',
+    MaskedNode: 'self.parent = None\nself.attributes = None\nself.subtrees = None\nself._node_type = AbstractNode',
+}
+
+_LAZY_ID = '''
+_ID = AbstractNode.id
+
+
+def _get_id(self):
+    try:
+        return _ID.__get__(self)
+    except AttributeError:
+        _ID.__set__(self, uuid4())
+        return _ID.__get__(self)
+
+
+# `id` of the nodes, a `uuid4` made the first time it is read rather than for every node built
+_lazy_id = property(_get_id, _ID.__set__)
+'''
+
+
+def _inline_super_init(cls_def: ast.ClassDef, cls: type) -> bool:
+    # replaces `super().__init__()` in `__init__` when it runs `AbstractNode.__init__` or `MaskedNode.__init__`
+    base_init = next(k for k in cls.__mro__[1:] if '__init__' in vars(k))
+    if base_init not in _BASE_INITS:
+        return False
+    inlined = False
+    for f in cls_def.body:
+        if not isinstance(f, ast.FunctionDef) or f.name != '__init__':
+            continue
+        for i, stmt in enumerate(f.body):
+            if isinstance(stmt, ast.Expr) and ast.unparse(stmt) == 'super().__init__()':
+                f.body[i:i + 1] = ast.parse(_BASE_INITS[base_init]).body
+                inlined = True
+    return inlined
+
+
+def _labels(cls_def: ast.ClassDef) -> dict[str, list[str]]:
+    # container -> labels, from `self.<container> = LabeledContainer...([...])` in `__init__`
+    labels = {}
+    for f in cls_def.body:
+        if not isinstance(f, ast.FunctionDef) or f.name != '__init__':
+            continue
+        for s in ast.walk(f):
+            if isinstance(s, ast.Assign) and len(s.targets) == 1 and isinstance(s.targets[0], ast.Attribute) \
+                    and isinstance(s.value, ast.Call) and s.value.args and isinstance(s.value.args[0], ast.List):
+                values = [e.value for e in s.value.args[0].elts if isinstance(e, ast.Constant)]
+                if len(values) == len(s.value.args[0].elts):
+                    labels[s.targets[0].attr] = values
+    return labels
+
+
+class _Emitter:
+    def __init__(self, classes: dict[str, type]):
+        self.names = {cls: name for name, cls in classes.items()}
+        self.constants: list[str] = []
+
+    def expr(self, value: Any) -> str:
+        if isinstance(value, type) and value in self.names:
+            return self.names[value]
+        if isinstance(value, list):
+            return '[' + ', '.join(self.expr(v) for v in value) + ']'
+        if isinstance(value, (set, frozenset)):
+            return '{' + ', '.join(sorted(self.expr(v) for v in value)) + '}' if value else 'set()'
+        if isinstance(value, Enum):
+            return f'{type(value).__name__}.{value.name}'
+        return repr(value)
+
+    def constant(self, name: str, value: Any) -> str:
+        # collections returned by metadata methods are built once, after every class is defined
+        self.constants.append(f'{name} = {self.expr(value)}')
+        return name
+
+    def members(self, name: str, cls: type) -> list[str]:
+        own = vars(cls)
+        lines = []
+
+        def classmethod_returning(method: str, value: str, args: str = 'cls'):
+            lines.extend(['@classmethod', f'def {method}({args}):', f'    return {value}'])
+
+        if 'get_type_name' in own:
+            classmethod_returning('get_type_name', repr(cls.get_type_name()))
+        if 'tree_sitter_rule' in own:
+            classmethod_returning('tree_sitter_rule', repr(cls.tree_sitter_rule()))
+        if 'from_tree_sitter' in own:
+            classmethod_returning('from_tree_sitter', 'cls.from_tsn(tree.root_node)', 'cls, tree')
+        if 'get_terminal_type' in own:
+            classmethod_returning('get_terminal_type', self.expr(cls.get_terminal_type()))
+        if 'get_token_template' in own:
+            classmethod_returning('get_token_template', self.constant(f'_{name}_TEMPLATE', cls.get_token_template()))
+            classmethod_returning('get_precedence', repr(cls.get_precedence()))
+        if 'create_empty' in own:
+            params = _closure(cls, 'create_empty')['param_types']
+            classmethod_returning('create_empty', f'cls({", ".join(f"{self.expr(t)}()" for t in params)})')
+        if 'mask' in own:
+            target = self.expr(_closure(cls, 'mask')[_KERNELS['mask']])
+            lines.extend([
+                'def mask(self):',
+                f'    masked_node = {target}()',
+                '    self.parent.subtrees.replace(self, masked_node)',
+                '    masked_node.parent = self.parent',
+                '    return masked_node',
+            ])
+        if 'unmask' in own:
+            target = self.expr(_closure(cls, 'unmask')[_KERNELS['unmask']])
+            lines.extend([
+                'def unmask(self, concrete_node):',
+                f'    if not isinstance(concrete_node, {target}):',
+                f"        raise ValueError(f'Expected {target}, got {{concrete_node.__class__.__name__}}')",
+                '    self.parent.subtrees.replace(self, concrete_node)',
+                '    concrete_node.parent = self.parent',
+                '    return concrete_node',
+            ])
+            classmethod_returning('unmask_target', target)
+        for kernel, getter, noun, message in (
+                ('mask_up', 'get_ancestor_mask_types', 'ancestor',
+                 f'Cannot mask up "{{{name}.get_type_name()}}" to "{{ancestor_type.get_type_name()}}".'),
+                ('mask_down', 'get_descendant_mask_types', 'descendant',
+                 f'Cannot mask down "{{descendant_type.get_type_name()}}" to "{{{name}.get_type_name()}}".')):
+            if kernel not in own:
+                continue
+            types = self.constant(f'_{name}_{noun.upper()}S', _closure(cls, kernel)[_KERNELS[kernel]])
+            lines.extend([
+                f'def {kernel}(self, {noun}_type):',
+                f'    if {noun}_type not in {types}:',
+                f'        raise TypeError(f{message!r})',
+                f'    {noun}_mask = {noun}_type()',
+                f'    self.parent.subtrees.replace(self, {noun}_mask)',
+                f'    {noun}_mask.parent = self.parent',
+                f'    return {noun}_mask',
+            ])
+            classmethod_returning(getter, types)
+        if 'binop_swap' in own:
+            closure = _closure(cls, 'binop_swap')
+            op1, op2 = closure['op1'], closure['op2']
+            lines.extend([
+                'def binop_swap(self):',
+                f'    left = self.subtrees[{op1!r}]',
+                f'    right = self.subtrees[{op2!r}]',
+                f'    self.subtrees[{op1!r}] = right',
+                f'    self.subtrees[{op2!r}] = left',
+            ])
+        if issubclass(cls, (ConcreteNode, MaskedNode)):
+            # a fresh set every call, callers may change it
+            classmethod_returning('get_supported_transition_kernels', self.expr(cls.get_supported_transition_kernels())
+                                  .replace('TransitionKernels.', '_TK.'))
+        return lines
+
+
+def _submodules(package: ModuleType) -> list[ModuleType]:
+    return [import_module(f'{package.__name__}.{m.name}') for m in pkgutil.iter_modules(package.__path__)
+            if not m.name.startswith('_') and m.name != 'flat']
+
+
+def _classes(modules: list[ModuleType]) -> dict[str, type]:
+    return {
+        name: value for m in modules for name, value in vars(m).items()
+        if isinstance(value, type) and value.__module__ == m.__name__
+    }
+
+
+def specialize(package_name: str) -> str:
+    """
+    Source of a flat module equivalent to the language package `package_name`: the classes of all of its
+    modules in one namespace, with the metadata and transition kernels of the decorators in `mast.attr` and
+    `mast.transition_kernel` written out as plain methods returning constants, `__slots__` on every class,
+    the labeled children and attributes of a node read by index instead of by label, and the `super().__init__()`
+    of the node base classes written out, with the `id` of a node made when it is first read.
+    """
+    package = import_module(package_name)
+    modules = _submodules(package)
+    submodules = {m.__name__.rsplit('.', 1)[1] for m in modules}
+    classes = _classes(modules)
+    emitter = _Emitter(classes)
+
+    imports: dict[str, None] = {}
+    defs: dict[str, ast.ClassDef] = {}
+    for m in modules:
+        tree = ast.parse(inspect.getsource(m))
+        for stmt in tree.body:
+            if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+                module = stmt.module if isinstance(stmt, ast.ImportFrom) else stmt.names[0].name
+                if module == '__future__' or module in _DECORATOR_MODULES or (module or '').startswith(package_name):
+                    continue
+                imports[ast.unparse(stmt)] = None
+            elif isinstance(stmt, ast.ClassDef):
+                defs[stmt.name] = stmt
+            else:
+                raise ValueError(f'Cannot specialize module-level {type(stmt).__name__} of {m.__name__}')
+
+    # bases first
+    order: list[str] = []
+    def visit(name: str):
+        if name in order or name not in defs:
+            return
+        for base in defs[name].bases:
+            visit(ast.unparse(base).rsplit('.', 1)[-1])
+        order.append(name)
+    for name in defs:
+        visit(name)
+
+    body = []
+    for name in order:
+        flatten = _Flatten(submodules, _labels(defs[name]))
+        cls_def = flatten.visit(defs[name])
+        cls_def.decorator_list = []
+        members = flatten.visit(ast.Module(ast.parse('\n'.join(emitter.members(name, classes[name]))).body, [])).body
+        stmts = [s for s in cls_def.body if not isinstance(s, ast.Pass)]
+        docstring = stmts[:1] if stmts and isinstance(stmts[0], ast.Expr) and isinstance(stmts[0].value, ast.Constant) else []
+        lazy_id = ast.parse('id = _lazy_id').body if _inline_super_init(cls_def, classes[name]) else []
+        cls_def.body = docstring + ast.parse('__slots__ = ()').body + lazy_id + stmts[len(docstring):] + members
+        body.append(ast.unparse(ast.fix_missing_locations(cls_def)))
+
+    header = [
+        f'# Generated from {package_name} by specialize.py, do not edit.',
+        'from __future__ import annotations',
+        '',
+        *dict.fromkeys([*imports, 'from uuid import uuid4', 'from mast import Terminal',
+                        'from mast import TransitionKernels as _TK', 'from mast.node import AbstractNode']),
+        _LAZY_ID,
+    ]
+    exports = getattr(package, '__all__', [n for n in classes])
+    return '\n'.join(
+        header + ['', ''] + ['\n\n\n'.join(body)] + ['', ''] + emitter.constants + ['', f'__all__ = {exports!r}', '']
+    )
+
+
+def _translate(node: AbstractNode, module: ModuleType) -> AbstractNode:
+    # the same tree built from the classes of `module`; constructors take the labeled children or attributes
+    # in label order, or a list of all children
+    cls = getattr(module, type(node).__name__)
+    if isinstance(node.subtrees, ChildrenContainer):
+        return cls([_translate(c, module) for c in node.subtrees.children])
+    if isinstance(node.subtrees, LabeledContainer):
+        return cls(*[_translate(c, module) for c in node.subtrees.items])
+    if isinstance(node, MaskedNode):
+        return cls()
+    return cls(*[v for _, v in node.enumerate_attributes()])
+
+
+def _shape(node: AbstractNode) -> tuple:
+    return (type(node).__name__, node.get_type_name(), tuple(node.enumerate_attributes()),
+            tuple((label, _shape(c)) for label, c in node.enumerate_nodes()))
+
+
+def check_specialized(package_name: str, module: ModuleType, programs: Iterable[AbstractNode]) -> list[str]:
+    """
+    Differences between a language package and its specialized `module`, empty when they are equivalent.
+    Compares the metadata and supported kernels of every class, then, for every program of the package,
+    the tokens, source and shape of the same program built from `module`, and of both after masking,
+    masking down and unmasking every node.
+    """
+    problems = []
+    for name, original in sorted(_classes(_submodules(import_module(package_name))).items()):
+        flat = getattr(module, name, None)
+        if flat is None:
+            problems.append(f'{name}: missing')
+            continue
+        for method in ('get_type_name', 'tree_sitter_rule', 'get_terminal_type', 'get_precedence',
+                       'get_supported_transition_kernels'):
+            if hasattr(original, method) != hasattr(flat, method):
+                problems.append(f'{name}.{method}: defined on one side only')
+            elif hasattr(original, method) and not (issubclass(original, MaskedNode) and method == 'get_type_name'):
+                if getattr(original, method)() != getattr(flat, method)():
+                    problems.append(f'{name}.{method}: {getattr(original, method)()} != {getattr(flat, method)()}')
+        for method in ('get_token_template', 'unmask_target', 'get_descendant_mask_types', 'get_ancestor_mask_types'):
+            if hasattr(original, method) != hasattr(flat, method):
+                problems.append(f'{name}.{method}: defined on one side only')
+            elif hasattr(original, method):
+                expected = _names(getattr(original, method)())
+                if expected != _names(getattr(flat, method)()):
+                    problems.append(f'{name}.{method}: {expected} != {_names(getattr(flat, method)())}')
+        for method in ('create_empty', 'from_tree_sitter', 'mask', 'unmask', 'mask_up', 'mask_down', 'binop_swap'):
+            if hasattr(original, method) != hasattr(flat, method):
+                problems.append(f'{name}.{method}: defined on one side only')
+
+    for i, program in enumerate(programs):
+        copy = _translate(program, module)
+        for what in ('to_tokens', 'to_source'):
+            if getattr(program, what)() != getattr(copy, what)():
+                problems.append(f'program {i}: {what} differs')
+        if _shape(program) != _shape(copy):
+            problems.append(f'program {i}: shape differs')
+        ids = [n.id for n in _nodes(copy)]
+        if len(set(ids)) != len(ids) or not all(isinstance(i, UUID) for i in ids):
+            problems.append(f'program {i}: node ids are not distinct UUIDs')
+        _exercise(program)
+        _exercise(copy)
+        if _shape(program) != _shape(copy):
+            problems.append(f'program {i}: shape differs after masking and unmasking')
+    return problems
+
+
+def _names(value: Any) -> Any:
+    if isinstance(value, type):
+        return value.__name__
+    if isinstance(value, (list, tuple)):
+        return [_names(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_names(v) for v in value)
+    return value
+
+
+def _nodes(root: AbstractNode) -> list[AbstractNode]:
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(c for _, c in node.enumerate_nodes())
+    return nodes
+
+
+def _exercise(root: AbstractNode):
+    # masks every node, walks the mask up and down again and unmasks it back, swapping binary operators
+    for node in _nodes(root)[1:]:
+        if hasattr(node, 'binop_swap'):
+            node.binop_swap()
+        if not hasattr(node, 'mask'):
+            continue
+        masked = node.mask()
+        if hasattr(masked, 'mask_up'):
+            for ancestor in masked.get_ancestor_mask_types():
+                masked = masked.mask_up(ancestor).mask_down(type(masked))
+                break
+        masked.unmask(node)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic, TYPE_CHECKING
+from typing import TypeVar, Generic, Sequence, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from mast.node import AbstractNode
@@ -31,6 +31,11 @@ class LabeledContainer(Generic[T], Enumerable[T]):
     def __setitem__(self, key: str, value: T):
         self._items[self._labels.index(key)] = value
 
+    @property
+    def items(self) -> Sequence[T]:
+        """The items in label order, not copied; not to be modified."""
+        return self._items
+
     def enumerate(self) -> list[tuple[str, T]]:
         return list(zip(self._labels, self._items))
 
@@ -45,6 +50,11 @@ class ChildrenContainer(Enumerable['AbstractNode']):
     def __getitem__(self, index: int):
         return self._children[index]
 
+    @property
+    def children(self) -> Sequence['AbstractNode']:
+        """The children in order, not copied; not to be modified."""
+        return self._children
+
     def append(self, child: 'AbstractNode'):
         self._children.append(child)
 
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import re
+from typing import Type, Any
+
+from mast import Terminal
+from mast.node import ConcreteNode, MaskedNode, RootNode
+
+# lexical patterns of terminal tokens, in the order they are tried; these follow the grammars in `parsers`
+TERMINAL_PATTERNS: dict[Terminal, re.Pattern] = {
+    Terminal.BOOLEAN: re.compile(r'true|false'),
+    Terminal.NUMBER: re.compile(r'\d+'),
+    Terminal.IDENTIFIER: re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*'),
+}
+
+Symbol = str | Terminal
+
+
+def terminal_value(terminal: Terminal, token: str) -> Any:
+    if terminal == Terminal.NUMBER:
+        return int(token)
+    if terminal == Terminal.BOOLEAN:
+        return token == 'true'
+    return token
+
+
+def terminal_token(terminal: Terminal, value: Any) -> str:
+    """The token a terminal value is written as, the inverse of `terminal_value`."""
+    if terminal == Terminal.BOOLEAN:
+        return str(value).lower()
+    return str(value)
+
+
+class Grammar:
+    """
+    Token-level view of a language, read off the `token_template` and `is_terminal_node` metadata of its node
+    types and the `mask_down` hierarchy between its masked node types.
+
+    Symbols are literal tokens (`str`) or terminal types (`Terminal`). A masked node type in a template is a
+    slot, whose alternatives are the concrete node types it can be unmasked to.
+    """
+    def __init__(self, root_type: Type[RootNode]):
+        self.root_type = root_type
+        self._alternatives: dict[Type[MaskedNode], list[Type[ConcreteNode]]] = {}
+        self.node_types: list[Type[ConcreteNode]] = []
+        self._collect(root_type)
+        self.keywords: list[str] = sorted({
+            e for t in self.node_types if self.is_templated(t) for e in t.get_token_template() if isinstance(e, str)
+        })
+        self._first: dict[Type[ConcreteNode], set[Symbol]] = {t: set() for t in self.node_types}
+        self._last: dict[Type[ConcreteNode], set[Symbol]] = {t: set() for t in self.node_types}
+        self._solve()
+
+    @staticmethod
+    def is_templated(node_type: type) -> bool:
+        return hasattr(node_type, 'get_token_template')
+
+    @staticmethod
+    def is_terminal(node_type: type) -> bool:
+        return hasattr(node_type, 'get_terminal_type')
+
+    def alternatives(self, slot: Type[MaskedNode]) -> list[Type[ConcreteNode]]:
+        if slot not in self._alternatives:
+            if hasattr(slot, 'get_descendant_mask_types'):
+                alts = [a for d in slot.get_descendant_mask_types() for a in self.alternatives(d)]
+            elif hasattr(slot, 'unmask_target'):
+                alts = [slot.unmask_target()]
+            else:
+                raise TypeError(f'Masked node type {slot.__name__} can neither be unmasked nor masked down.')
+            self._alternatives[slot] = alts
+        return self._alternatives[slot]
+
+    def _collect(self, node_type: Type[ConcreteNode]):
+        if node_type in self.node_types:
+            return
+        if not self.is_templated(node_type) and not self.is_terminal(node_type):
+            raise TypeError(f'Node type {node_type.get_type_name()} has neither a token template nor a terminal type.')
+        self.node_types.append(node_type)
+        if self.is_templated(node_type):
+            for e in node_type.get_token_template():
+                if isinstance(e, list):
+                    e = e[0]
+                if not isinstance(e, str):
+                    for alt in self.alternatives(e):
+                        self._collect(alt)
+
+    def symbol(self, token: str) -> Symbol | None:
+        """The grammar symbol a token is read as, or `None` if the token cannot appear in a program."""
+        if token in self.keywords:
+            return token
+        for terminal, pattern in TERMINAL_PATTERNS.items():
+            if pattern.fullmatch(token):
+                return terminal
+        return None
+
+    def _element_set(self, e: Any, sets: dict[Type[ConcreteNode], set[Symbol]]) -> set[Symbol]:
+        if isinstance(e, str):
+            return {e}
+        if isinstance(e, list):
+            e = e[0]
+        result = set[Symbol]()
+        for alt in self.alternatives(e):
+            result |= sets[alt]
+        return result
+
+    def _edge(self, template: list, sets: dict[Type[ConcreteNode], set[Symbol]]) -> set[Symbol]:
+        result = set[Symbol]()
+        for e in template:
+            result |= self._element_set(e, sets)
+            if not isinstance(e, list):
+                break
+        return result
+
+    def _solve(self):
+        for t in self.node_types:
+            if self.is_terminal(t):
+                self._first[t].add(t.get_terminal_type())
+                self._last[t].add(t.get_terminal_type())
+        changed = True
+        while changed:
+            changed = False
+            for t in self.node_types:
+                if not self.is_templated(t):
+                    continue
+                template = t.get_token_template()
+                first = self._edge(template, self._first)
+                last = self._edge(list(reversed(template)), self._last)
+                if not first <= self._first[t] or not last <= self._last[t]:
+                    self._first[t] |= first
+                    self._last[t] |= last
+                    changed = True
+
+    def first(self, e: Any) -> set[Symbol]:
+        """Symbols a template element, or a node type, can start with."""
+        if isinstance(e, type) and issubclass(e, ConcreteNode):
+            return self._first[e]
+        return self._element_set(e, self._first)
+
+    def last(self, e: Any) -> set[Symbol]:
+        """Symbols a template element, or a node type, can end with."""
+        if isinstance(e, type) and issubclass(e, ConcreteNode):
+            return self._last[e]
+        return self._element_set(e, self._last)
+
+    def bigrams(self) -> set[tuple[Symbol, Symbol]]:
+        """Every pair of symbols that can appear next to each other inside a program."""
+        pairs = set[tuple[Symbol, Symbol]]()
+        for t in self.node_types:
+            if not self.is_templated(t):
+                continue
+            template = t.get_token_template()
+            for i, e in enumerate(template):
+                if isinstance(e, list):
+                    pairs |= {(a, b) for a in self.last(e) for b in self.first(e)}
+                for f in template[i + 1:]:
+                    pairs |= {(a, b) for a in self.last(e) for b in self.first(f)}
+                    if not isinstance(f, list):
+                        break
+        return pairs
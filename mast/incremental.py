@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import sys
+from typing import Type
+
+from tree_sitter import Node as TNode
+from tree_sitter import Parser, Tree
+
+from mast.node import AbstractNode, ConcreteNode, RootNode
+
+
+def collect_rules(root_type: Type[RootNode]) -> dict[str, Type[ConcreteNode]]:
+    """Map tree-sitter rule names to the concrete node types of the language defining `root_type`."""
+    module = sys.modules[root_type.__module__]
+    rules: dict[str, Type[ConcreteNode]] = {}
+    for value in vars(module).values():
+        if isinstance(value, type) and issubclass(value, ConcreteNode) and value.__module__ == module.__name__:
+            rules[value.tree_sitter_rule()] = value
+    return rules
+
+
+def _advance(point: tuple[int, int], text: bytes) -> tuple[int, int]:
+    """The point reached from `point` after `text`, with columns in bytes as tree-sitter counts them."""
+    lines = text.count(b'\n')
+    if lines == 0:
+        return point[0], point[1] + len(text)
+    return point[0] + lines, len(text) - text.rfind(b'\n') - 1
+
+
+def _point(tree: Tree, src: bytes, byte: int) -> tuple[int, int]:
+    # descends to the last node boundary at or before `byte` and counts the bytes from there, so the cost
+    # is the depth of the tree and the gap to the nearest token, not the offset of `byte` in the buffer
+    node = tree.root_node
+    anchor, point = 0, (0, 0)
+    while node.child_count > 0:
+        child = node.first_child_for_byte(byte)
+        before = child.prev_sibling if child is not None else node.child(node.child_count - 1)
+        if before is not None and anchor <= before.end_byte <= byte:
+            anchor, point = before.end_byte, tuple(before.end_point)
+        if child is None or child.start_byte > byte:
+            break
+        if child.start_byte >= anchor:
+            anchor, point = child.start_byte, tuple(child.start_point)
+        node = child
+    return _advance(point, src[anchor:byte])
+
+
+def _common(a: bytes, b: bytes, limit: int, suffix: bool) -> int:
+    # length of the common prefix or suffix, by bisection over slice comparisons that run in C
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        same = a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo] if suffix else a[lo:mid] == b[lo:mid]
+        if same:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _continuation(src: bytes, byte: int) -> bool:
+    return byte < len(src) and src[byte] & 0xC0 == 0x80
+
+
+class IncrementalParser:
+    """
+    Keeps a source buffer, its tree-sitter tree and the mast tree built from it in sync.
+
+    Edits are reported to tree-sitter through `Tree.edit` and the old tree is handed back to `Parser.parse`.
+    The mast tree is then patched in place: only the smallest subtree covering the edited bytes and the
+    `changed_ranges` between the two trees is rebuilt with `from_tsn`, every other mast node is kept as is.
+    Rows and columns of an edit are found from the tokens of the old tree next to it, so `edit` does work
+    proportional to the edit and the depth of the tree rather than to the size of the buffer.
+    This relies on the named children of a tree-sitter node lining up with `enumerate_nodes()` of the
+    corresponding mast node, which holds for every language in `langs`.
+    """
+    def __init__(self, parser: Parser, root_type: Type[RootNode], source: str = ''):
+        self.parser = parser
+        self.root_type = root_type
+        self.rules = collect_rules(root_type)
+        self.source = bytes(source, 'utf-8')
+        self.tree: Tree = parser.parse(self.source)
+        self.program: ConcreteNode | None = root_type.from_tree_sitter(self.tree)
+
+    def text(self) -> str:
+        return self.source.decode('utf-8')
+
+    def update(self, source: str) -> ConcreteNode | None:
+        """
+        Replace the whole buffer, reporting the difference to tree-sitter as a single edit. Finding the
+        difference compares both buffers, call `edit` directly when the edited range is known.
+        """
+        new = bytes(source, 'utf-8')
+        old = self.source
+        start = _common(old, new, min(len(old), len(new)), False)
+        suffix = _common(old, new, min(len(old), len(new)) - start, True)
+        # keep both ends of the edit on character boundaries
+        while _continuation(new, start):
+            start -= 1
+        while _continuation(new, len(new) - suffix):
+            suffix -= 1
+        return self.edit(start, len(old) - suffix, new[start:len(new) - suffix].decode('utf-8'))
+
+    def edit(self, start_byte: int, old_end_byte: int, text: str) -> ConcreteNode | None:
+        """Replace bytes `[start_byte, old_end_byte)` of the buffer with `text` and update both trees."""
+        inserted = bytes(text, 'utf-8')
+        new_end_byte = start_byte + len(inserted)
+        new_source = self.source[:start_byte] + inserted + self.source[old_end_byte:]
+
+        old_tree = self.tree
+        start_point = _point(old_tree, self.source, start_byte)
+        old_tree.edit(
+            start_byte=start_byte,
+            old_end_byte=old_end_byte,
+            new_end_byte=new_end_byte,
+            start_point=start_point,
+            old_end_point=_point(old_tree, self.source, old_end_byte),
+            new_end_point=_advance(start_point, inserted)
+        )
+        self.source = new_source
+        self.tree = self.parser.parse(new_source, old_tree)
+
+        lo, hi = start_byte, new_end_byte
+        for r in old_tree.changed_ranges(self.tree):
+            lo = min(lo, r.start_byte)
+            hi = max(hi, r.end_byte)
+        program, self.program = self.program, None
+        self.program = self._rebuild(program, lo, hi)
+        return self.program
+
+    def _rebuild(self, program: ConcreteNode | None, lo: int, hi: int) -> ConcreteNode | None:
+        root = self.tree.root_node
+        if program is None or root.has_error:
+            return self.root_type.from_tree_sitter(self.tree)
+
+        # named ancestors of the smallest node covering the change, from the root downwards
+        chain: list[TNode] = []
+        n = root.descendant_for_byte_range(lo, hi)
+        while n is not None and n != root:
+            if n.is_named:
+                chain.append(n)
+            n = n.parent
+        chain.reverse()
+
+        tsn, node = root, program
+        for child in chain:
+            named = tsn.named_children
+            subtrees = [c for _, c in node.enumerate_nodes()]
+            if len(named) != len(subtrees):
+                break
+            candidate = subtrees[named.index(child)]
+            if child is chain[-1] or (isinstance(candidate, ConcreteNode) and candidate.tree_sitter_rule() == child.type):
+                tsn, node = child, candidate
+            else:
+                break
+
+        if tsn == root:
+            return self.root_type.from_tree_sitter(self.tree)
+        node_type = self.rules.get(tsn.type)
+        if node_type is None:
+            return self.root_type.from_tree_sitter(self.tree)
+        rebuilt = node_type.from_tsn(tsn)
+        if rebuilt is None:
+            return None
+        parent: AbstractNode = node.parent
+        parent.subtrees.replace(node, rebuilt)
+        rebuilt.parent = parent
+        return program
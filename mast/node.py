@@ -12,6 +12,9 @@ from mast.container import LabeledContainer, ChildrenContainer
 
 
 class AbstractNode(ABC):
+    # slotted throughout, so that node classes declaring `__slots__` themselves carry no `__dict__`
+    __slots__ = ('id', 'parent', 'attributes', 'subtrees')
+
     def __init__(self):
         self.id = uuid4()
         self.parent : ConcreteNode | None = None
@@ -73,6 +76,8 @@ class AbstractNode(ABC):
 
 
 class ConcreteNode(AbstractNode):
+    __slots__ = ()
+
     @classmethod
     @abstractmethod
     def from_tsn(cls, node: TNode) -> ConcreteNode | None:
@@ -84,6 +89,8 @@ class ConcreteNode(AbstractNode):
 
 
 class MaskedNode(AbstractNode):
+    __slots__ = ('_node_type',)
+
     def __init__(self):
         super().__init__()
         self._node_type = AbstractNode
@@ -99,6 +106,8 @@ class MaskedNode(AbstractNode):
 
 
 class RootNode(ABC):
+    __slots__ = ()
+
     @classmethod
     def from_tree_sitter(cls, tree: Tree) -> ConcreteNode | None:
         pass
\ No newline at end of file
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from mast import Terminal
+from mast.container import LabeledContainer, ChildrenContainer
+from mast.node import AbstractNode, MaskedNode, RootNode
+
+
+class TreeStats:
+    def __init__(self):
+        self.depth = 0
+        self.size = 0
+        self.length = 0
+        self.node_types: dict[str, int] = {}
+        self.terminals: dict[Terminal, dict[Any, int]] = {}
+
+
+class _Handler:
+    __slots__ = ('name', 'counted', 'tokens', 'terminal', 'children')
+
+    def __init__(self, name: str, counted: bool, tokens: int | None, terminal: Terminal | None,
+                 children: Callable[[AbstractNode], list[AbstractNode]]):
+        self.name = name
+        self.counted = counted
+        self.tokens = tokens
+        self.terminal = terminal
+        self.children = children
+
+
+def _labeled_children(node: AbstractNode) -> list[AbstractNode]:
+    return node.subtrees.items
+
+
+def _listed_children(node: AbstractNode) -> list[AbstractNode]:
+    return node.subtrees.children
+
+
+def _no_children(_: AbstractNode) -> list[AbstractNode]:
+    return []
+
+
+def _enumerated_children(node: AbstractNode) -> list[AbstractNode]:
+    return [c for _, c in node.enumerate_nodes()]
+
+
+class StatsCollector:
+    """
+    Computes depth, size, per-type counts, token length and terminal histograms of a tree in one iterative
+    pass. Everything that only depends on the node type (type name, number of tokens the node contributes
+    itself, terminal type, how to reach the children) is worked out once per type, the first time a node of
+    that type is met, so the walk itself does no `isinstance` dispatch.
+
+    Root nodes are transparent: they add nothing to depth, size or counts, as in the original assessors.
+    """
+    def __init__(self):
+        self._handlers: dict[type, _Handler] = {}
+
+    def _compile(self, node: AbstractNode) -> _Handler:
+        node_type = type(node)
+        if isinstance(node.subtrees, LabeledContainer):
+            children = _labeled_children
+        elif isinstance(node.subtrees, ChildrenContainer):
+            children = _listed_children
+        elif node.subtrees is None:
+            children = _no_children
+        else:
+            children = _enumerated_children
+
+        terminal = None
+        if isinstance(node, MaskedNode):
+            tokens = 1
+        elif hasattr(node_type, 'get_terminal_type'):
+            terminal = node_type.get_terminal_type()
+            tokens = 1
+        elif hasattr(node_type, 'get_token_template'):
+            tokens = sum(1 for e in node_type.get_token_template() if isinstance(e, str))
+        else:
+            tokens = None
+
+        handler = _Handler(node.get_type_name(), not isinstance(node, RootNode), tokens, terminal, children)
+        self._handlers[node_type] = handler
+        return handler
+
+    def collect(self, root: AbstractNode) -> TreeStats:
+        stats = TreeStats()
+        handlers = self._handlers
+        node_types = stats.node_types
+        stack: list[tuple[AbstractNode, int]] = [(root, 0)]
+        while stack:
+            node, level = stack.pop()
+            h = handlers.get(type(node)) or self._compile(node)
+            children = h.children(node)
+            if h.counted:
+                level += 1
+                stats.size += 1
+                node_types[h.name] = node_types.get(h.name, 0) + 1
+                if level > stats.depth:
+                    stats.depth = level
+            if h.tokens is not None:
+                stats.length += h.tokens
+            else:
+                stats.length += len(node.to_tokens()) - sum(len(c.to_tokens()) for c in children)
+            if h.terminal is not None:
+                values = stats.terminals.setdefault(h.terminal, {})
+                value = node.attributes.items[0]
+                values[value] = values.get(value, 0) + 1
+            for c in children:
+                stack.append((c, level))
+        return stats
+
+
+class StatsSummary:
+    """Running totals of `TreeStats` over many trees, plus the number of trees that failed to parse."""
+    def __init__(self):
+        self.count = 0
+        self.failed = 0
+        self.total_depth = 0
+        self.total_size = 0
+        self.total_length = 0
+        self.depth_dist: dict[int, int] = {}
+        self.node_type_dist: dict[str, int] = {}
+        self.terminal_dist: dict[Terminal, dict[Any, int]] = {}
+
+    def add(self, stats: TreeStats):
+        self.count += 1
+        self.total_depth += stats.depth
+        self.total_size += stats.size
+        self.total_length += stats.length
+        self.depth_dist[stats.depth] = self.depth_dist.get(stats.depth, 0) + 1
+        for name, n in stats.node_types.items():
+            self.node_type_dist[name] = self.node_type_dist.get(name, 0) + n
+        for terminal, values in stats.terminals.items():
+            dist = self.terminal_dist.setdefault(terminal, {})
+            for value, n in values.items():
+                dist[value] = dist.get(value, 0) + n
+
+    def add_failure(self):
+        self.failed += 1
+
+    def parse_rate(self) -> float:
+        total = self.count + self.failed
+        return self.count / total if total > 0 else 0
+
+    def avg_depth(self) -> float:
+        return self.total_depth / self.count if self.count > 0 else 0
+
+    def avg_size(self) -> float:
+        return self.total_size / self.count if self.count > 0 else 0
+
+    def avg_len(self) -> float:
+        return self.total_length / self.count if self.count > 0 else 0
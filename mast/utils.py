@@ -1,5 +1,3 @@
-import graphviz
-
 from mast.node import AbstractNode
 from queue import Queue
 
@@ -40,6 +38,7 @@ def get_node_label(node: AbstractNode):
 
 
 def visualize(root: AbstractNode, filename: str):
+    import graphviz  # only needed here, and slow to import
     dot = graphviz.Digraph()
     q = Queue[AbstractNode]()
     q.put(root)
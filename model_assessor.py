@@ -1,53 +1,4 @@
-from __future__ import annotations
-
 import argparse, json
-from typing import Any, Generator
-
-import torch
-import diffusion.linearized as dl
-import langs.minimp as minimp
-from tree_sitter import Parser, Language
-from parsers import tree_sitter_minimp
-
-def depth(n: minimp.Program | minimp.base.AExprBase) -> int:
-    if isinstance(n, minimp.Program):
-        return depth(n.body())
-    if isinstance(n, minimp.AddExpr) or isinstance(n, minimp.DivExpr):
-        return max(depth(n.left()), depth(n.right())) + 1
-    if isinstance(n, minimp.BracketedAExpr):
-        return depth(n.expr()) + 1
-    return 1
-
-def count_node_type(n: minimp.Program | minimp.base.AExprBase, result: dict):
-    if isinstance(n, minimp.Program):
-        count_node_type(n.body(), result)
-        return
-    result[n.get_type_name()] = result.get(n.get_type_name(), 0) + 1
-    if isinstance(n, minimp.AddExpr) or isinstance(n, minimp.DivExpr):
-        count_node_type(n.left(), result)
-        count_node_type(n.right(), result)
-        return
-    if isinstance(n, minimp.BracketedAExpr):
-        count_node_type(n.expr(), result)
-        return
-
-def sample_from_dataset(path: str) -> Generator[str, Any, None]:
-    ds = dl.LinearizedDataset.from_checkpoint(path)
-    for s in ds.samples:
-        p = ds.tokenizer.decode(s.tolist())
-        eos_pos = p.index('<EOS>')
-        p = p[:eos_pos]
-        yield str.join(' ', p)
-
-def sample_from_model(path: str, steps: int, bs: int, temp: float) -> Generator[str, Any, None]:
-    device = torch.accelerator.current_accelerator()
-    g = dl.inference(path, device, steps=steps, batch_size=bs, temperature=temp)
-    for prog in g:
-        if '<EOS>' in prog:
-            eos_pos = prog.index('<EOS>')
-            prog = prog[:eos_pos]
-        src = str.join(' ', [t for t in prog if t != '<PAD>'])
-        yield src
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -55,44 +6,77 @@ if __name__ == '__main__':
     parser.add_argument('--dataset', type=str)
     parser.add_argument('--steps', type=int, default=20)
     parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--chunk-size', type=int, default=256,
+                        help='Generate in chunks of this many samples, each parsed while the next one is generated')
     parser.add_argument('--temperature', type=float, default=1.0)
     parser.add_argument('--log', type=str, required=True)
+    parser.add_argument('--diversity-error', type=float,
+                        help='Count distinct programs approximately, in bounded memory, with this relative error')
+    parser.add_argument('--train-dataset', type=str,
+                        help='Dataset the model was trained on, to report novelty and memorization of its samples')
+    parser.add_argument('--near-distance', type=float, default=0.1,
+                        help='pq-gram distance to the nearest training program under which a sample is a near-duplicate')
+    parser.add_argument('--trace', type=str, help='Write a Chrome trace of the run to this file')
+    parser.add_argument('--metrics', type=str, help='Write a JSONL metrics stream of the run to this file')
+    parser.add_argument('--parser', type=str, choices=['tree-sitter', 'token'], default='tree-sitter',
+                        help='Parse decoded sources with tree-sitter, or token IDs directly')
+    parser.add_argument('--quantize', action='store_true', help='Sample from a dynamically quantized int8 model on the CPU')
+    parser.add_argument('--compare-quantized', action='store_true',
+                        help='Compare parse rate and depth distribution of the int8 model against fp32 instead')
     args = parser.parse_args()
 
-    if args.model:
-        samples = sample_from_model(args.model, args.steps, args.batch_size, args.temperature)
-    elif args.dataset:
-        samples = sample_from_dataset(args.dataset)
-    else:
-        raise ValueError('Either --model or --dataset must be specified')
+    from itertools import repeat
+
+    import torch
+    import langs.minimp as minimp
+    from diffusion import tracing
+    from diffusion.linearized.assessment import generate_chunks, assess_chunks, assess_samples, \
+        programs_from_dataset, tree_sitter_parser
+    from diffusion.linearized.io import load_model_checkpoint_for_inference
+    from diffusion.linearized.membership import MembershipIndex
+    from diffusion.linearized.neighbors import NeighborIndex
+    from diffusion.linearized.quantization import compare_quantized
+    from mast.grammar import Grammar
 
-    parser = Parser(Language(tree_sitter_minimp.language()))
+    if args.trace or args.metrics:
+        tracing.enable(args.trace, args.metrics, torch.accelerator.current_accelerator())
 
-    depths = dict()
-    node_type_dist = dict()
-    gen_src = set()
-    for s in samples:
-        try:
-            tree = parser.parse(bytes(s, 'utf-8'))
-            program: minimp.Program | None = minimp.Program.from_tree_sitter(tree)
-            d = depth(program)
-            gen_src.add(program.to_source())
-            depths[d] = depths.get(d, 0) + 1
-            count_node_type(program, node_type_dist)
-        except:
-            depths[-1] = depths.get(-1, 0) + 1
+    try:
+        if args.compare_quantized:
+            if not args.model:
+                raise ValueError('--compare-quantized requires --model')
+            cpu = torch.device('cpu')
+            tokenizer, model = load_model_checkpoint_for_inference(args.model, cpu)
+            _, quantized = load_model_checkpoint_for_inference(args.model, cpu, quantize=True)
+            logs = compare_quantized(model, quantized, tokenizer, Grammar(minimp.Program),
+                                     args.steps, args.batch_size, args.temperature)
+            logs['model'] = args.model
+            with open(args.log, 'w') as f:
+                f.write(json.dumps(logs, indent=4))
+            tracing.emit('assess/quantized', **logs)
+        else:
+            index = MembershipIndex.for_dataset(args.train_dataset) if args.model and args.train_dataset else None
+            neighbors = NeighborIndex.for_dataset(args.train_dataset, Grammar(minimp.Program)) \
+                if index is not None else None
+            ts_parser = tree_sitter_parser() if args.parser == 'tree-sitter' else None
+            if args.model:
+                tokenizer, chunks = generate_chunks(args.model, args.steps, args.batch_size, args.temperature,
+                                                    args.quantize, args.chunk_size)
+                samples = assess_chunks(tokenizer, chunks, ts_parser, index)
+            elif args.dataset:
+                samples = zip(programs_from_dataset(args.dataset, ts_parser), repeat(False))
+            else:
+                raise ValueError('Either --model or --dataset must be specified')
 
-    logs = dict()
-    if args.model:
-        logs['model'] = args.model
-    elif args.dataset:
-        logs['dataset'] = args.dataset
-    logs['parse_rate'] = 1 - depths.get(-1, 0) / sum(depths.values())
-    if -1 in depths.keys():
-        depths.pop(-1)
-    logs['diversity'] = len(gen_src) / sum(depths.values())
-    logs['avg_depth'] = sum([d * n for d, n in depths.items()]) / sum(depths.values())
-    logs['depth_dist'] = depths
-    logs['node_type_dist'] = node_type_dist
-    with open(args.log, 'w') as f:
-        f.write(json.dumps(logs, indent=4))
\ No newline at end of file
+            logs = dict()
+            if args.model:
+                logs['model'] = args.model
+            elif args.dataset:
+                logs['dataset'] = args.dataset
+            logs.update(assess_samples(samples, index is not None, args.diversity_error, neighbors, args.near_distance,
+                                       args.chunk_size))
+            with open(args.log, 'w') as f:
+                f.write(json.dumps(logs, indent=4))
+            tracing.emit('assess', **logs)
+    finally:
+        tracing.disable()
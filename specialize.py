@@ -0,0 +1,38 @@
+import argparse
+import os
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Specialize')
+    parser.add_argument('--lang', type=str, required=True, help='Language package, e.g. langs.imp')
+    parser.add_argument('--out', type=str, help='Module to write (default: flat.py in the language package)')
+    parser.add_argument('--check', type=int, default=200,
+                        help='Check the module against the package on this many random programs (0 to skip)')
+    parser.add_argument('--check-size', type=int, default=30, help='Largest number of nodes of a checked program')
+    args = parser.parse_args()
+
+    import random
+    from importlib import import_module, util
+
+    from diffusion.dumb import DumbTerminalGenerator
+    from diffusion.uniform import UniformSampler
+    from mast.codegen import specialize, check_specialized
+    from mast.grammar import Grammar
+
+    package = import_module(args.lang)
+    out = args.out or os.path.join(os.path.dirname(package.__file__), 'flat.py')
+    with open(out, 'w') as f:
+        f.write(specialize(args.lang))
+    print(f'Specialized {args.lang} into {out}')
+
+    if args.check > 0:
+        spec = util.spec_from_file_location(f'{args.lang}.flat', out)
+        module = util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sampler = UniformSampler(Grammar(package.Program), DumbTerminalGenerator(), rng=random.Random(0))
+        programs = [sampler.sample_by_size(1, args.check_size) for _ in range(args.check)]
+        problems = check_specialized(args.lang, module, programs)
+        for problem in problems:
+            print(problem)
+        if problems:
+            raise SystemExit(f'{len(problems)} differences between {args.lang} and {out}')
+        print(f'Equivalent on {args.check} programs')
@@ -0,0 +1,27 @@
+import os
+import random
+from importlib import import_module
+
+import pytest
+
+from diffusion.dumb import DumbTerminalGenerator
+from diffusion.uniform import UniformSampler
+from mast.codegen import specialize, check_specialized
+from mast.grammar import Grammar
+
+LANGS = ['langs.minimp', 'langs.imp']
+
+
+@pytest.mark.parametrize('lang', LANGS)
+def test_flat_module_is_up_to_date(lang):
+    path = os.path.join(os.path.dirname(import_module(lang).__file__), 'flat.py')
+    with open(path) as f:
+        assert f.read() == specialize(lang), f'{path} is stale, regenerate it with specialize.py --lang {lang}'
+
+
+@pytest.mark.parametrize('lang', LANGS)
+def test_flat_module_is_equivalent(lang):
+    package = import_module(lang)
+    sampler = UniformSampler(Grammar(package.Program), DumbTerminalGenerator(), rng=random.Random(0))
+    programs = [sampler.sample_by_size(1, 30) for _ in range(100)]
+    assert check_specialized(lang, import_module(f'{lang}.flat'), programs) == []
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from mast.incremental import IncrementalParser, _advance, _common
+
+
+def _naive_point(src: bytes, byte: int) -> tuple[int, int]:
+    return src.count(b'\n', 0, byte), byte - (src.rfind(b'\n', 0, byte) + 1)
+
+
+def test_advance_matches_counting_from_the_start():
+    rng = random.Random(0)
+    for _ in range(500):
+        head = bytes(rng.choice(b'ab\n') for _ in range(rng.randint(0, 20)))
+        text = bytes(rng.choice(b'ab\n') for _ in range(rng.randint(0, 10)))
+        assert _advance(_naive_point(head, len(head)), text) == _naive_point(head + text, len(head + text))
+
+
+def test_common_prefix_and_suffix():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = bytes(rng.choice(b'ab') for _ in range(rng.randint(0, 12)))
+        b = bytes(rng.choice(b'ab') for _ in range(rng.randint(0, 12)))
+        limit = min(len(a), len(b))
+        prefix = next((i for i in range(limit) if a[i] != b[i]), limit)
+        assert _common(a, b, limit, False) == prefix
+        suffix = next((i for i in range(limit - prefix) if a[-1 - i] != b[-1 - i]), limit - prefix)
+        assert _common(a, b, limit - prefix, True) == suffix
+
+
+@pytest.fixture
+def minimp_parser():
+    binding = pytest.importorskip('parsers.tree_sitter_minimp', reason='tree-sitter binding of minimp not built')
+    from tree_sitter import Language, Parser
+    return Parser(Language(binding.language()))
+
+
+def test_edits_match_parsing_from_scratch(minimp_parser):
+    from langs import minimp
+
+    source = 'a + 3 / b\n+ c / (d + 7)'
+    ip = IncrementalParser(minimp_parser, minimp.Program, source)
+    edits = [
+        (0, 1, 'x'),        # replace a terminal
+        (4, 5, '42'),       # grow a terminal
+        (10, 11, '\n\n'),   # change the lines before the rest of the program
+        (0, 0, '(y / 2) + '),
+        (len('(y / 2) + '), len('(y / 2) + x + 42'), 'z'),
+    ]
+    for start, end, text in edits:
+        ip.edit(start, end, text)
+        scratch = minimp_parser.parse(bytes(ip.text(), 'utf-8'))
+        assert str(ip.tree.root_node) == str(scratch.root_node)
+        assert ip.tree.root_node.end_point == scratch.root_node.end_point
+        expected = minimp.Program.from_tree_sitter(scratch)
+        assert ip.program.to_tokens() == expected.to_tokens()
+
+    ip.update('q / (r + 1)')
+    assert ip.program.to_tokens() == minimp.Program.from_tree_sitter(minimp_parser.parse(b'q / (r + 1)')).to_tokens()
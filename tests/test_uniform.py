@@ -0,0 +1,38 @@
+import random
+from importlib import import_module
+
+import pytest
+
+from diffusion.dumb import DumbTerminalGenerator
+from diffusion.linearized.program_tokenizer import ProgramTokenizer
+from diffusion.linearized.token_parser import TokenParser
+from diffusion.uniform import UniformSampler
+from mast.codegen import _shape
+from mast.grammar import Grammar
+
+LANGS = ['langs.minimp', 'langs.imp']
+
+
+@pytest.mark.parametrize('lang', LANGS)
+@pytest.mark.parametrize('bracketed', [True, False])
+def test_sampled_programs_parse_back_to_themselves(lang, bracketed):
+    package = import_module(lang)
+    grammar, tg = Grammar(package.Program), DumbTerminalGenerator()
+    tokenizer = ProgramTokenizer.from_language(grammar, tg, 512)
+    tp = TokenParser(grammar, tokenizer)
+    sampler = UniformSampler(grammar, tg, [] if bracketed else [package.BracketedAExpr], random.Random(0))
+    programs = [sampler.sample_by_size(1, 30) for _ in range(200)]
+    if lang == 'langs.minimp':
+        programs += [sampler.sample_by_depth(1, 5) for _ in range(200)]
+    for p in programs:
+        assert _shape(tp.parse(tokenizer.encode(p.to_tokens()))) == _shape(p), ' '.join(p.to_tokens())
+
+
+def test_counts_programs_as_written():
+    from langs import minimp
+    tg = DumbTerminalGenerator()
+    sampler = UniformSampler(Grammar(minimp.Program), tg, [minimp.BracketedAExpr])
+    leaves = sum(len(tg.values(t.get_terminal_type())) for t in (minimp.Identifier, minimp.IntLiteral))
+    # n leaves joined by n - 1 operators, read one way only
+    for n in range(1, 5):
+        assert sampler.count_by_size(2 * n - 1) == leaves ** n * 2 ** (n - 1)
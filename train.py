@@ -1,5 +1,6 @@
-import argparse, torch
+import argparse
 import diffusion.linearized as dl
+from diffusion import tracing
 from diffusion.linearized.preserved_tokens import PreservedTokens
 
 if __name__ == '__main__':
@@ -10,32 +11,85 @@ if __name__ == '__main__':
     parser.add_argument('--batch-size', type=int, default=512)
     parser.add_argument('--learning-rate', type=float, default=1e-3)
     parser.add_argument('--sdl', type=float, default=2.0, help='Structured Diffusion Loss weight')
+    parser.add_argument('--embed-dim', type=int, default=512)
+    parser.add_argument('--num-heads', type=int, default=8)
+    parser.add_argument('--num-layers', type=int, default=8)
+    parser.add_argument('--fused', action='store_true',
+                        help='Train with fused attention, which leaves the padding out of the forward')
+    parser.add_argument('--checkpointing', action='store_true',
+                        help='Recompute the activations of every layer in the backward pass instead of keeping them')
+    parser.add_argument('--micro-batch-size', type=int,
+                        help='Accumulate the gradients of each batch over slices of this many samples')
+    parser.add_argument('--memory-budget', type=float,
+                        help='Device memory to fit training in, in GiB; picks the largest micro batch that fits')
+    parser.add_argument('--stratify', type=str, choices=['depth', 'length', 'size'],
+                        help='Draw every batch across the strata of this metadata column in proportion to their sizes')
+    parser.add_argument('--strata', type=int, help='Stratify by this many quantile ranges instead of by distinct values')
+    parser.add_argument('--curriculum', type=int, default=0,
+                        help='Start on the lowest strata and add the others over this many epochs (requires --stratify)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--trace', type=str, help='Write a Chrome trace of the run to this file')
+    parser.add_argument('--metrics', type=str, help='Write a JSONL metrics stream of the run to this file')
     args = parser.parse_args()
+    if args.curriculum > 0 and args.stratify is None:
+        parser.error('--curriculum requires --stratify')
+
+    import torch
 
     device = torch.accelerator.current_accelerator()
     print('Using torch device: ', device)
 
-    dataset = dl.LinearizedDataset.from_checkpoint(args.dataset)
-
-    print(f'Loaded dataset with {len(dataset)} samples')
-    print(f'Vocab size: {dataset.tokenizer.vocab_size}, Max length: {dataset.tokenizer.max_len}')
-
-    model = dl.DiffusionTransformer(
-        dataset.tokenizer.vocab_size,
-        dataset.tokenizer.max_len,
-        embed_dim=512,
-        num_heads=8,
-        num_layers=8
-    ).to(device)
-    criterion = dl.StructuredDiffusionLoss(
-        eos_id=dataset.tokenizer.token_to_index[PreservedTokens.EOS],
-        pad_id=dataset.tokenizer.token_to_index[PreservedTokens.PAD],
-        lambda_struct=args.sdl
-    ).to(device)
-    optimizer = torch.optim.AdamW(model.parameters(), lr=args.learning_rate)
-
-    dl.train(
-        dataset, model, optimizer, criterion, device,
-        args.epochs, args.batch_size,
-        args.model
-    )
\ No newline at end of file
+    if args.trace or args.metrics:
+        tracing.enable(args.trace, args.metrics, device)
+
+    try:
+        dataset = dl.LinearizedDataset.from_checkpoint(args.dataset)
+
+        print(f'Loaded dataset with {len(dataset)} samples')
+        print(f'Vocab size: {dataset.tokenizer.vocab_size}, Max length: {dataset.tokenizer.max_len}')
+
+        model_type = dl.FusedDiffusionTransformer if args.fused else dl.DiffusionTransformer
+        model = model_type(
+            dataset.tokenizer.vocab_size,
+            dataset.tokenizer.max_len,
+            embed_dim=args.embed_dim,
+            num_heads=args.num_heads,
+            num_layers=args.num_layers,
+            checkpointing=args.checkpointing
+        ).to(device)
+        criterion = dl.StructuredDiffusionLoss(
+            eos_id=dataset.tokenizer.token_to_index[PreservedTokens.EOS],
+            pad_id=dataset.tokenizer.token_to_index[PreservedTokens.PAD],
+            lambda_struct=args.sdl
+        ).to(device)
+        optimizer = torch.optim.AdamW(model.parameters(), lr=args.learning_rate)
+
+        micro_batch_size = args.micro_batch_size
+        if args.memory_budget is not None:
+            from diffusion.linearized.training import probe_batch_size
+            # AdamW keeps two moments per parameter, allocated on its first step
+            reserved = 2 * sum(p.numel() * p.element_size() for p in model.parameters())
+            fitting = probe_batch_size(model, dataset.tokenizer, criterion, device, int(args.memory_budget * 2 ** 30),
+                                       reserved, limit=args.batch_size)
+            micro_batch_size = min(fitting, micro_batch_size or fitting)
+            print(f'Micro batch size: {micro_batch_size} (fits {fitting})')
+
+        batch_sampler = None
+        if args.stratify is not None:
+            from diffusion.linearized.metadata import SampleMetadata, StratifiedBatchSampler
+            from langs import minimp
+            from mast.grammar import Grammar
+            metadata = dataset.metadata or SampleMetadata.for_dataset(args.dataset, Grammar(minimp.Program))
+            batch_sampler = StratifiedBatchSampler(getattr(metadata, args.stratify), args.batch_size, args.strata,
+                                                   args.curriculum, metadata.where(), args.seed)
+            print(f'Stratified by {args.stratify} into {batch_sampler.n_strata} strata')
+
+        dl.train(
+            dataset, model, optimizer, criterion, device,
+            args.epochs, args.batch_size,
+            args.model,
+            micro_batch_size,
+            batch_sampler
+        )
+    finally:
+        tracing.disable()